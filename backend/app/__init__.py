@@ -1,18 +1,3 @@
-# Import and initialize your app components
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
-# Create the FastAPI application
-app = FastAPI(title="Code Review Platform")
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Import routes at the end to avoid circular imports
-from app.routes import auth, review
\ No newline at end of file
+# backend/app/__init__.py
+# The application is built by app.main.create_app; keep this package free
+# of imports so loading any app module stays cheap.
@@ -0,0 +1,345 @@
+# backend/app/admission.py
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import math
+import time
+from fastapi import HTTPException, Request
+from app.config import (
+    ANALYSIS_MAX_CONCURRENT,
+    ANALYSIS_MAX_QUEUED,
+    ANALYSIS_MAX_PER_USER,
+    ANALYSIS_QUEUE_TIMEOUT_SECONDS,
+    REVIEW_MAX_CODE_BYTES,
+    REVIEW_MAX_CODE_LINES,
+    REVIEW_MAX_BODY_BYTES,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bounds for the Retry-After hint, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis can't be admitted right now"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionLease:
+    """
+    Slots held by one request
+    
+    release frees them the first time it is called and does nothing
+    after that, so every path that may end a request can call it.
+    """
+
+    def __init__(self, controller: "AdmissionController", client: str, slots: int):
+        self.controller = controller
+        self.client = client
+        self.slots = slots
+        self.started = time.monotonic()
+
+    def release(self) -> None:
+        slots, self.slots = self.slots, 0
+        held = time.monotonic() - self.started
+        for _ in range(slots):
+            self.controller.release(self.client, held)
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded, per-user fair wait queue
+    
+    At most max_concurrent analyses run at once. Further requests wait
+    in one FIFO per client, and freed slots go to the clients in
+    round-robin order, so a client submitting a burst can't push everyone
+    else back. Requests are rejected right away when max_queued requests
+    are already waiting or the client already holds max_per_user running
+    or waiting requests, and after waiting queue_timeout seconds.
+    Rejecting early keeps the latency of admitted requests flat under
+    overload instead of slowing every request down.
+    
+    Args:
+        max_concurrent: Analyses allowed to run at once
+        max_queued: Requests allowed to wait for a slot
+        max_per_user: Running plus waiting requests allowed per client
+        queue_timeout: Seconds a request may wait for a slot
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, max_per_user: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._queued = 0
+        # Client key -> futures of its waiting requests; key order is the round-robin order
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._per_client: Dict[str, int] = {}
+        # Moving average of how long a slot is held, for Retry-After
+        self._avg_hold = 1.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a new request would get a slot"""
+        backlog = (self._queued + 1) / max(1, self.max_concurrent)
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(self._avg_hold * backlog)))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self, client: str) -> None:
+        """
+        Wait for a slot for client
+        
+        Raises:
+            AdmissionRejected: The service or the client is saturated
+        """
+        if self._per_client.get(client, 0) >= self.max_per_user:
+            raise self._reject("Too many concurrent analyses for this user")
+        if self._active < self.max_concurrent and not self._waiting:
+            self._admit(client)
+            return
+        if self._queued >= self.max_queued:
+            raise self._reject("Analysis queue is full")
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client, deque()).append(future)
+        self._queued += 1
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release(client)
+            else:
+                future.cancel()
+                self._remove_waiter(client, future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            raise self._reject("Timed out waiting for an analysis slot")
+
+    def _try_admit(self, client: str) -> bool:
+        """Take a slot for client only if one is free and nobody is waiting for it"""
+        if (
+            self._per_client.get(client, 0) >= self.max_per_user
+            or self._active >= self.max_concurrent
+            or self._waiting
+        ):
+            return False
+        self._admit(client)
+        return True
+
+    async def lease(self, client: str, wanted: int = 1) -> AdmissionLease:
+        """
+        Wait for a slot for client, then take up to wanted slots in all
+        
+        Slots beyond the first are only taken while they are free, so a
+        request fanning out into several analyses runs them in parallel
+        on an idle service and one at a time on a busy one, and never
+        holds more than the client's max_per_user share.
+        
+        Raises:
+            AdmissionRejected: The service or the client is saturated
+        """
+        await self.acquire(client)
+        slots = 1
+        while slots < wanted and self._try_admit(client):
+            slots += 1
+        return AdmissionLease(self, client, slots)
+
+    def _admit(self, client: str) -> None:
+        self._active += 1
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        self.admitted += 1
+
+    def _remove_waiter(self, client: str, future: "asyncio.Future") -> None:
+        waiters = self._waiting.get(client)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[client]
+        self._release_client(client)
+
+    def _release_client(self, client: str) -> None:
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    def release(self, client: str, held: Optional[float] = None) -> None:
+        """Free client's slot and hand it to the next waiting client in turn"""
+        if held is not None:
+            self._avg_hold = 0.9 * self._avg_hold + 0.1 * held
+        self._active -= 1
+        self._release_client(client)
+        while self._waiting and self._active < self.max_concurrent:
+            next_client, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting.move_to_end(next_client)
+            else:
+                del self._waiting[next_client]
+            if future.cancelled():
+                continue
+            # The waiter's count already includes this request
+            self._active += 1
+            self.admitted += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, client: str, wanted: int = 1):
+        """Hold a lease of up to wanted analysis slots for the duration of the block"""
+        lease = await self.lease(client, wanted)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and admission counters"""
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "clients": len(self._per_client),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+        }
+
+# Shared controller for all review routes
+admission = AdmissionController(
+    max_concurrent=ANALYSIS_MAX_CONCURRENT,
+    max_queued=ANALYSIS_MAX_QUEUED,
+    max_per_user=ANALYSIS_MAX_PER_USER,
+    queue_timeout=ANALYSIS_QUEUE_TIMEOUT_SECONDS,
+)
+
+def client_key(request: Request, user_sub: Optional[str]) -> str:
+    """Fair-share key: the Auth0 sub, or the client address for anonymous callers"""
+    if user_sub:
+        return f"sub:{user_sub}"
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+def too_busy(e: AdmissionRejected) -> HTTPException:
+    """429 response for a rejected request"""
+    return HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+def code_limit_error(code: str) -> Optional[str]:
+    """
+    Check a snippet against the size and line-count limits
+    
+    Args:
+        code (str): Submitted code
+        
+    Returns:
+        str: Why the snippet is rejected, or None if it is within limits
+    """
+    size = len(code.encode("utf-8"))
+    if size > REVIEW_MAX_CODE_BYTES:
+        return f"Code is too large: {size} bytes, at most {REVIEW_MAX_CODE_BYTES} allowed"
+    lines = code.count("\n") + 1
+    if lines > REVIEW_MAX_CODE_LINES:
+        return f"Code is too long: {lines} lines, at most {REVIEW_MAX_CODE_LINES} allowed"
+    return None
+
+def check_code_limits(code: str) -> None:
+    """Raise a 413 if a snippet exceeds the size or line-count limits"""
+    error = code_limit_error(code)
+    if error:
+        raise HTTPException(status_code=413, detail=error)
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware rejecting oversized request bodies under a path prefix
+    
+    Requests whose Content-Length exceeds the limit get a 413 before the
+    body is read. Bodies without a Content-Length (chunked uploads) are
+    read into memory up to the limit before the app sees them, and get a
+    413 as soon as they pass it; the ASGI server already holds bodies
+    with a Content-Length to that length. path_limits overrides the
+    limit for paths that accept larger uploads.
+    """
+
+    def __init__(
+        self,
+        app,
+        path_prefix: str = "/review",
+        max_bytes: int = REVIEW_MAX_BODY_BYTES,
+        path_limits: Optional[Dict[str, int]] = None
+    ):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        
+        max_bytes = self.path_limits.get(scope["path"].rstrip("/"), self.max_bytes)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit():
+            if int(content_length) > max_bytes:
+                await self._reject(send, max_bytes)
+                return
+            await self.app(scope, receive, send)
+            return
+        
+        # No usable Content-Length: buffer the body, counting it as it arrives
+        chunks: List[bytes] = []
+        received = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # The client went away; let the app see the disconnect
+                break
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > max_bytes:
+                await self._reject(send, max_bytes)
+                return
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                message = {"type": "http.request", "body": b"".join(chunks), "more_body": False}
+                break
+        
+        replayed = False
+        
+        async def buffered_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return message
+            return await receive()
+        
+        await self.app(scope, buffered_receive, send)
+
+    async def _reject(self, send, max_bytes: int) -> None:
+        body = json.dumps({"detail": f"Request body too large: at most {max_bytes} bytes allowed"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,274 @@
+# backend/app/ai/archive.py
+from typing import Dict, Any, AsyncIterator, Callable, Iterator, List, NamedTuple, Optional, Tuple
+import asyncio
+import io
+import logging
+import posixpath
+import tarfile
+import zipfile
+from app.ai.pybughunt_integration import DEFAULT_ANALYSIS_MODE
+from app.ai.result_cache import analyze_code_cached
+from app.admission import code_limit_error
+from app.config import ANALYSIS_WORKERS, ARCHIVE_MAX_FILES, ARCHIVE_MAX_TOTAL_BYTES, REVIEW_MAX_CODE_BYTES
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directories holding third-party or generated code, skipped wherever they appear
+VENDORED_DIRS = {
+    "venv", ".venv", "env", ".env", "virtualenv", "site-packages", "dist-packages",
+    "node_modules", "vendor", "vendored", "third_party", "thirdparty", "external",
+    "__pycache__", "build", "dist", ".eggs", ".tox", ".nox", ".git", ".hg", ".svn",
+    ".mypy_cache", ".pytest_cache",
+}
+
+# Files analyzed concurrently per worker; enough to keep every worker busy
+IN_FLIGHT_PER_WORKER = 2
+
+# Number of files listed under "worst_files" in the report
+WORST_FILES_LIMIT = 10
+
+class ArchiveError(ValueError):
+    """The upload is not a readable zip or tar archive"""
+
+class ArchiveEntry(NamedTuple):
+    """A Python file read from an archive, or a file that was skipped"""
+    path: str
+    code: Optional[str]
+    skip_reason: Optional[str] = None
+
+def is_vendored(path: str) -> bool:
+    """Whether any directory in path is a vendored, packaging or generated-code directory"""
+    return any(
+        part in VENDORED_DIRS or part.endswith((".egg-info", ".dist-info"))
+        for part in path.split("/")[:-1]
+    )
+
+def _normalize_path(name: str) -> Optional[str]:
+    """Archive member name as a relative POSIX path, or None if it escapes the root"""
+    path = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if path in ("", ".") or path.startswith("../"):
+        return None
+    return path
+
+def _iter_members(data: bytes) -> Iterator[Tuple[str, int, Any]]:
+    """
+    Yield (name, size, read) for each regular file in a zip or tar archive
+    
+    read(limit) decompresses at most limit bytes of the member, so
+    members are only inflated one at a time and never written to disk.
+    """
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                yield info.filename, info.file_size, lambda limit, info=info: _read_zip_member(archive, info, limit)
+        return
+    try:
+        archive = tarfile.open(fileobj=io.BytesIO(data), mode="r:*")
+    except tarfile.TarError:
+        raise ArchiveError("Not a zip or tar archive")
+    with archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            yield member.name, member.size, lambda limit, member=member: archive.extractfile(member).read(limit)
+
+def _read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> bytes:
+    with archive.open(info) as f:
+        return f.read(limit)
+
+def iter_archive_sources(data: bytes) -> Iterator[ArchiveEntry]:
+    """
+    Read the Python files of an archive one at a time
+    
+    Non-Python files, vendored directories and paths escaping the archive
+    root are ignored. Python files that are too large, not UTF-8, beyond
+    ARCHIVE_MAX_FILES or beyond ARCHIVE_MAX_TOTAL_BYTES uncompressed are
+    reported as skipped.
+    
+    Args:
+        data (bytes): Zip or tar (optionally compressed) archive
+    
+    Yields:
+        ArchiveEntry: One entry per Python file
+    
+    Raises:
+        ArchiveError: The data is not a readable archive
+    """
+    files = 0
+    total_bytes = 0
+    try:
+        for name, size, read in _iter_members(data):
+            path = _normalize_path(name)
+            if path is None or not path.endswith(".py") or is_vendored(path):
+                continue
+            files += 1
+            if files > ARCHIVE_MAX_FILES:
+                yield ArchiveEntry(path, None, f"More than {ARCHIVE_MAX_FILES} Python files in archive")
+                continue
+            if size > REVIEW_MAX_CODE_BYTES:
+                yield ArchiveEntry(path, None, f"File is too large: {size} bytes")
+                continue
+            # Member sizes come from the archive headers, so cap what is actually inflated too
+            raw = read(REVIEW_MAX_CODE_BYTES + 1)
+            total_bytes += len(raw)
+            if total_bytes > ARCHIVE_MAX_TOTAL_BYTES:
+                yield ArchiveEntry(path, None, f"Archive exceeds {ARCHIVE_MAX_TOTAL_BYTES} bytes of Python code")
+                continue
+            try:
+                code = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                yield ArchiveEntry(path, None, "File is not valid UTF-8")
+                continue
+            error = code_limit_error(code)
+            if error:
+                yield ArchiveEntry(path, None, error)
+            elif not code.strip():
+                yield ArchiveEntry(path, None, "File is empty")
+            else:
+                yield ArchiveEntry(path, code)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ArchiveError(f"Corrupt archive: {str(e)}")
+
+def summarize_file(path: str, code: str, review: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-file entry of an archive report"""
+    entry = {
+        "path": path,
+        "lines": code.count("\n") + 1,
+        "prediction": review.get("prediction", 0.5),
+        "issues_count": review.get("issues_count", 0),
+        "overall_feedback": review.get("overall_feedback", ""),
+        "syntax_errors": review.get("syntax_errors", []),
+        "logic_errors": review.get("logic_errors", []),
+        "code_quality_issues": review.get("code_quality_issues", []),
+        "fix_suggestions": review.get("fix_suggestions", {}),
+    }
+    if review.get("limit_exceeded"):
+        entry["limit_exceeded"] = review["limit_exceeded"]
+    return entry
+
+def aggregate_report(files: List[Dict[str, Any]], skipped: List[Dict[str, Any]], mode: str) -> Dict[str, Any]:
+    """
+    Combine per-file results into a repository report
+    
+    The repository score is the mean file prediction weighted by line
+    count, so large files count for more than stubs.
+    
+    Args:
+        files (list): Entries from summarize_file
+        skipped (list): {"path", "reason"} of files that were not analyzed
+        mode (str): Analysis mode used
+    
+    Returns:
+        dict: Totals, score, worst files and the per-file entries by path
+    """
+    files = sorted(files, key=lambda f: f["path"])
+    total_lines = sum(f["lines"] for f in files)
+    score = sum(f["prediction"] * f["lines"] for f in files) / total_lines if total_lines else 0.0
+    issues = {
+        field: sum(len(f[field]) for f in files)
+        for field in ("syntax_errors", "logic_errors", "code_quality_issues")
+    }
+    worst = sorted(
+        (f for f in files if f["issues_count"]),
+        key=lambda f: (-f["issues_count"], f["prediction"], f["path"])
+    )[:WORST_FILES_LIMIT]
+    return {
+        "mode": mode,
+        "score": score,
+        "files_analyzed": len(files),
+        "files_skipped": len(skipped),
+        "files_with_syntax_errors": sum(1 for f in files if f["syntax_errors"]),
+        "total_lines": total_lines,
+        "issues_count": sum(issues.values()),
+        "issues_by_type": issues,
+        "worst_files": [
+            {"path": f["path"], "issues_count": f["issues_count"], "prediction": f["prediction"]}
+            for f in worst
+        ],
+        "files": files,
+        "skipped": sorted(skipped, key=lambda f: f["path"]),
+    }
+
+async def analyze_archive(
+    data: bytes,
+    format_review: Callable[[Dict[str, Any]], Dict[str, Any]],
+    mode: str = DEFAULT_ANALYSIS_MODE,
+    max_in_flight: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Analyze every Python file of an archive across the worker pool
+    
+    Files are read one at a time off the event loop and analyzed
+    concurrently, by default keeping IN_FLIGHT_PER_WORKER analyses per
+    worker so all workers stay busy without holding the whole repository
+    in memory. Identical files are served from the result cache.
+    
+    Args:
+        data (bytes): Zip or tar archive
+        format_review: Builds a review from an analysis result
+        mode (str): One of ANALYSIS_MODES
+        max_in_flight (int): Files analyzed at once, e.g. the admission
+            slots the caller holds
+    
+    Yields:
+        tuple: ("file", entry) as each file finishes, ("skipped", entry)
+        for files that were not analyzed, and finally ("complete", report)
+    
+    Raises:
+        ArchiveError: The data is not a readable archive
+    """
+    entries = iter_archive_sources(data)
+    # Reading the first entry up front surfaces unreadable archives before anything is sent
+    first = await asyncio.to_thread(next, entries, None)
+
+    async def read_entries() -> AsyncIterator[ArchiveEntry]:
+        entry = first
+        while entry is not None:
+            yield entry
+            entry = await asyncio.to_thread(next, entries, None)
+
+    async def analyze_entry(entry: ArchiveEntry) -> Tuple[str, Dict[str, Any]]:
+        try:
+            review = format_review(await analyze_code_cached(entry.code, mode))
+        except Exception as e:
+            logger.error(f"Archive analysis of {entry.path} failed: {str(e)}")
+            return "skipped", {"path": entry.path, "reason": f"Code analysis failed: {str(e)}"}
+        return "file", summarize_file(entry.path, entry.code, review)
+
+    files: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, Any]] = []
+    pending = set()
+    max_in_flight = max(1, max_in_flight or ANALYSIS_WORKERS * IN_FLIGHT_PER_WORKER)
+
+    async def drain(return_when):
+        nonlocal pending
+        done, pending = await asyncio.wait(pending, return_when=return_when)
+        for task in done:
+            stage, payload = task.result()
+            (files if stage == "file" else skipped).append(payload)
+            yield stage, payload
+
+    try:
+        async for entry in read_entries():
+            if entry.code is None:
+                payload = {"path": entry.path, "reason": entry.skip_reason}
+                skipped.append(payload)
+                yield "skipped", payload
+                continue
+            pending.add(asyncio.ensure_future(analyze_entry(entry)))
+            if len(pending) >= max_in_flight:
+                async for stage, payload in drain(asyncio.FIRST_COMPLETED):
+                    yield stage, payload
+        while pending:
+            async for stage, payload in drain(asyncio.FIRST_COMPLETED):
+                yield stage, payload
+    finally:
+        for task in pending:
+            task.cancel()
+        entries.close()
+
+    yield "complete", aggregate_report(files, skipped, mode)
@@ -0,0 +1,173 @@
+# backend/app/ai/incremental.py
+from typing import Dict, Any, List, NamedTuple
+import ast
+import asyncio
+import logging
+import re
+from app.ai.limits import AnalysisLimitExceeded
+from app.ai.pybughunt_integration import (
+    DEFAULT_ANALYSIS_MODE,
+    add_prepass_findings,
+    analyze_code_unit,
+    limit_exceeded_analysis,
+    needs_detector,
+    prepass_analysis,
+    run_prepass,
+)
+from app.ai.result_cache import analyze_code_cached, cache_key, get_or_analyze
+from app.ai.worker_pool import analyze_code_async, run_in_pool
+from app.metrics import ANALYSIS_STAGE_DURATION
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ISSUE_FIELDS = ("syntax_errors", "logic_errors", "code_quality_issues")
+FIX_FIELDS = ("syntax_fixes", "logic_fixes", "quality_fixes")
+
+# Keys that hold line numbers when the detector reports issues as dicts
+_LINE_KEYS = ("line", "lineno", "line_number", "end_line", "end_lineno")
+_LINE_PATTERN = re.compile(r"\b([Ll]ine\s+)(\d+)")
+
+class CodeUnit(NamedTuple):
+    """A top-level definition or run of module-level statements"""
+    kind: str
+    name: str
+    start_line: int
+    end_line: int
+    source: str
+
+def split_units(code: str) -> List[CodeUnit]:
+    """
+    Split a module into top-level units
+    
+    Each function and class (with its decorators) is its own unit, and
+    consecutive module-level statements between them are grouped into a
+    single "module" unit.
+    
+    Args:
+        code (str): Python code that parses
+        
+    Returns:
+        list: Units in source order
+    """
+    tree = ast.parse(code)
+    lines = code.splitlines(keepends=True)
+    units: List[CodeUnit] = []
+    block: List[ast.stmt] = []
+
+    def unit_for(kind: str, name: str, start: int, end: int) -> CodeUnit:
+        return CodeUnit(kind, name, start, end, "".join(lines[start - 1:end]))
+
+    def flush_block():
+        if block:
+            start, end = block[0].lineno, block[-1].end_lineno
+            units.append(unit_for("module", f"<module:{start}>", start, end))
+            block.clear()
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            flush_block()
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            units.append(unit_for(kind, node.name, start, node.end_lineno))
+        else:
+            block.append(node)
+    flush_block()
+    return units
+
+def _shift_issue(issue: Any, offset: int) -> Any:
+    """Move an issue reported against a unit to its line in the whole module"""
+    if not offset:
+        return issue
+    if isinstance(issue, dict):
+        shifted = dict(issue)
+        for key in _LINE_KEYS:
+            if isinstance(shifted.get(key), int):
+                shifted[key] += offset
+        return shifted
+    if isinstance(issue, str):
+        return _LINE_PATTERN.sub(lambda m: f"{m.group(1)}{int(m.group(2)) + offset}", issue)
+    return issue
+
+def merge_unit_results(units: List[CodeUnit], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-unit analyses into one module-level result
+    
+    Issues are remapped to module line numbers, and the quality
+    prediction is the mean of unit predictions weighted by line count.
+    """
+    merged: Dict[str, Any] = {field: [] for field in ISSUE_FIELDS}
+    fixes: Dict[str, List[Any]] = {field: [] for field in FIX_FIELDS}
+    weighted_score, total_lines = 0.0, 0
+
+    for unit, result in zip(units, results):
+        offset = unit.start_line - 1
+        for field in ISSUE_FIELDS:
+            merged[field].extend(_shift_issue(issue, offset) for issue in result.get(field, []))
+        for field in FIX_FIELDS:
+            fixes[field].extend(
+                _shift_issue(fix, offset)
+                for fix in result.get("fix_suggestions", {}).get(field, [])
+            )
+        unit_lines = unit.end_line - unit.start_line + 1
+        weighted_score += result.get("prediction", 0.5) * unit_lines
+        total_lines += unit_lines
+
+    merged["prediction"] = weighted_score / total_lines if total_lines else 0.5
+    merged["fix_suggestions"] = fixes
+    errors = [result["error"] for result in results if "error" in result]
+    if errors:
+        merged["error"] = errors[0]
+    limits = [result["limit_exceeded"] for result in results if "limit_exceeded" in result]
+    if limits:
+        merged["limit_exceeded"] = limits[0]
+    return merged
+
+async def analyze_code_incremental(code: str, mode: str = DEFAULT_ANALYSIS_MODE) -> Dict[str, Any]:
+    """
+    Analyze Python code one top-level unit at a time
+    
+    The rule pre-pass runs once over the whole module, since rules such
+    as unused names need to see every unit. The detector and fix
+    suggestion stages run per unit and are content-addressed, so only
+    units that changed since a previous submission reach the detector;
+    the rest come from the result cache. Code that does not parse, and
+    fast analyses, which are cheap enough already, are analyzed as a
+    whole.
+    
+    Args:
+        code (str): Python code to analyze
+        mode (str): One of ANALYSIS_MODES
+        
+    Returns:
+        dict: Analysis results, same shape as analyze_user_code
+    """
+    if mode == "fast":
+        return await analyze_code_cached(code, mode)
+    try:
+        units = split_units(code)
+    except SyntaxError:
+        return await analyze_code_cached(code, mode)
+    if len(units) <= 1:
+        return await analyze_code_cached(code, mode)
+
+    async def analyze_unit(unit: CodeUnit) -> Dict[str, Any]:
+        key = cache_key(unit.source, variant=f"unit-detector:{mode}")
+        return await get_or_analyze(key, lambda: analyze_code_async(unit.source, mode, analyze_code_unit))
+
+    async def analyze_all() -> Dict[str, Any]:
+        try:
+            with ANALYSIS_STAGE_DURATION.time(stage="prepass"):
+                prepass = await run_in_pool(run_prepass, code)
+        except AnalysisLimitExceeded as e:
+            logger.warning(f"Analysis stopped: {e.detail}")
+            return limit_exceeded_analysis(e, mode)
+        if not needs_detector(prepass, mode):
+            return prepass_analysis(prepass, mode)
+        results = await asyncio.gather(*[analyze_unit(unit) for unit in units])
+        merged = merge_unit_results(units, results)
+        merged["logic_errors"] = add_prepass_findings(merged["logic_errors"], prepass)
+        return dict(merged, mode=mode)
+
+    return await get_or_analyze(cache_key(code, variant=f"incremental:{mode}"), analyze_all)
@@ -0,0 +1,141 @@
+# backend/app/ai/limits.py
+from contextlib import contextmanager
+from typing import Any, Callable, Tuple
+import logging
+import os
+import signal
+from app.config import ANALYSIS_TIME_LIMIT_SECONDS, ANALYSIS_MEMORY_LIMIT_MB
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AnalysisLimitExceeded(Exception):
+    """An analysis ran past its time or memory budget and was stopped"""
+
+    def __init__(self, kind: str, detail: str):
+        super().__init__(kind, detail)
+        self.kind = kind
+        self.detail = detail
+
+    def __str__(self) -> str:
+        return self.detail
+
+class _TimeBudgetExpired(BaseException):
+    # A BaseException, so the detector's own `except Exception` blocks can't swallow it
+    pass
+
+# Whether apply_memory_limit capped this process
+_memory_limited = False
+
+# Whether an analysis is running under the time budget; an alarm arriving after it finished is ignored
+_armed = False
+
+def _on_alarm(signum, frame):
+    if _armed:
+        raise _TimeBudgetExpired()
+
+def time_budget_exceeded() -> AnalysisLimitExceeded:
+    return AnalysisLimitExceeded("timeout", f"Analysis exceeded its time budget of {ANALYSIS_TIME_LIMIT_SECONDS:g}s")
+
+def _can_time_out() -> bool:
+    return ANALYSIS_TIME_LIMIT_SECONDS > 0 and hasattr(signal, "setitimer")
+
+def rss_bytes() -> int:
+    """Resident memory of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak rather than current RSS, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _address_space_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+
+def apply_memory_limit() -> None:
+    """
+    Cap this worker's address space at its current size plus the memory budget
+    
+    Called once the worker is warm, so the detector and its libraries
+    are part of the baseline and only what an analysis allocates counts
+    against ANALYSIS_MEMORY_LIMIT_MB. An allocation beyond it raises
+    MemoryError in the worker instead of growing the pod until it is
+    OOM-killed.
+    """
+    global _memory_limited
+    if ANALYSIS_MEMORY_LIMIT_MB <= 0:
+        return
+    try:
+        import resource
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = _address_space_bytes() + ANALYSIS_MEMORY_LIMIT_MB * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        _memory_limited = True
+    except (ImportError, OSError, ValueError) as e:
+        logger.warning(f"Memory budget not enforced in process {os.getpid()}: {str(e)}")
+
+@contextmanager
+def budget_suspended():
+    """
+    Lift the time and memory budgets for one-time setup inside an analysis
+    
+    Loading a model on the first deep analysis is not the submission's
+    fault, so it neither counts against the time budget nor is limited
+    by the memory budget, which is then recomputed from the new baseline.
+    """
+    remaining = signal.setitimer(signal.ITIMER_REAL, 0)[0] if _can_time_out() else 0
+    limited = _memory_limited
+    if limited:
+        import resource
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (hard, hard))
+    try:
+        yield
+    finally:
+        if limited:
+            apply_memory_limit()
+        if remaining > 0:
+            signal.setitimer(signal.ITIMER_REAL, remaining)
+
+def run_with_budget(func: Callable[..., Any], *args: Any) -> Tuple[Any, int]:
+    """
+    Run func in a pool worker under the per-analysis time budget
+    
+    Only for use inside pool workers, whose tasks run on the main thread
+    where SIGALRM is delivered. The memory budget is the address-space
+    limit set by apply_memory_limit.
+    
+    Args:
+        func: Picklable module-level function to run
+        *args: Arguments for func
+    
+    Returns:
+        tuple: func's result and this worker's resident memory in bytes
+    
+    Raises:
+        AnalysisLimitExceeded: The time or memory budget ran out
+    """
+    global _armed
+    timed = _can_time_out()
+    if timed:
+        _armed = True
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, ANALYSIS_TIME_LIMIT_SECONDS)
+    try:
+        result = func(*args)
+    except _TimeBudgetExpired:
+        raise time_budget_exceeded()
+    except MemoryError:
+        raise AnalysisLimitExceeded(
+            "memory", f"Analysis exceeded its memory budget of {ANALYSIS_MEMORY_LIMIT_MB} MB"
+        )
+    finally:
+        _armed = False
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return result, rss_bytes()
@@ -1,51 +1,327 @@
 # backend/app/ai/pybughunt_integration.py
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 import logging
-import pybughunt  # Import the actual PyBugHunt library
-from pybughunt import CodeErrorDetector  # Import the analyzer component
+import os
+import time
+from app.ai.limits import AnalysisLimitExceeded, apply_memory_limit, budget_suspended
+from app.config import DEEP_ANALYSIS_MODEL, DEEP_ANALYSIS_MODEL_PATH
+from model_training.rules import check_code
+
+if TYPE_CHECKING:
+    from pybughunt import CodeErrorDetector
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def analyze_user_code(code: str) -> Dict[str, Any]:
+# Analysis depth, cheapest first:
+#   fast      parse and rule checks only, no detector
+#   standard  rule checks, static detector and fix suggestions
+#   deep      standard plus the model-backed detector
+ANALYSIS_MODES = ("fast", "standard", "deep")
+DEFAULT_ANALYSIS_MODE = "standard"
+
+# Analyzed by every worker at startup, so the first real request finds a warm detector
+WARM_UP_SNIPPET = """
+def mean(values=[]):
+    total = 0
+    for value in values:
+        total += value
+    return total / len(values)
+"""
+
+# Detector instances owned by the current process (one per pool worker).
+# PyBugHunt is only imported here, so processes that never analyze (the
+# API process itself, auth-only deployments) don't pay for loading it.
+_detector: Optional["CodeErrorDetector"] = None
+_deep_detector: Optional["CodeErrorDetector"] = None
+_deep_detector_failed = False
+
+def get_detector() -> "CodeErrorDetector":
+    """Get or create the detector for this process"""
+    global _detector
+    if _detector is None:
+        from pybughunt import CodeErrorDetector
+        logger.info(f"Initializing CodeErrorDetector in process {os.getpid()}")
+        _detector = CodeErrorDetector()
+    return _detector
+
+def get_deep_detector() -> Optional["CodeErrorDetector"]:
+    """
+    Get or create the model-backed detector for this process
+    
+    The model is only loaded by the first deep analysis a worker runs.
+    If it can't be loaded (e.g. torch is not installed), deep analyses
+    fall back to the static detector.
+    """
+    global _deep_detector, _deep_detector_failed
+    if _deep_detector is None and not _deep_detector_failed:
+        logger.info(f"Initializing {DEEP_ANALYSIS_MODEL} detector in process {os.getpid()}")
+        try:
+            from pybughunt import CodeErrorDetector
+            with budget_suspended():
+                _deep_detector = CodeErrorDetector(model_type=DEEP_ANALYSIS_MODEL, model_path=DEEP_ANALYSIS_MODEL_PATH)
+        except Exception as e:
+            _deep_detector_failed = True
+            logger.warning(f"Deep analysis model unavailable, using static analysis only: {str(e)}")
+    return _deep_detector
+
+def init_worker() -> None:
+    """
+    Pool worker initializer: build the detector and run a canned analysis
+    
+    The first analysis in a process also pays for lazy imports and
+    caches inside PyBugHunt, so that cost is taken here rather than by a
+    user's request. The memory budget is applied afterwards, on top of
+    the warm worker's footprint.
+    """
+    get_detector()
+    result = analyze_user_code(WARM_UP_SNIPPET)
+    if "error" in result:
+        logger.warning(f"Warm-up analysis failed in process {os.getpid()}: {result['error']}")
+    apply_memory_limit()
+
+def run_prepass(code: str) -> Dict[str, List[str]]:
+    """
+    Fast pre-pass with the shared rule engine: one parse, one tree walk
+    
+    Args:
+        code (str): Python code to check
+        
+    Returns:
+        dict: Syntax errors, or rule findings if the code parses
+    """
+    report = check_code(code)
+    return {"syntax_errors": report.syntax_errors, "logic_errors": report.logical_errors}
+
+def detect_issues(code: str) -> Dict[str, Any]:
+    """
+    Run the PyBugHunt detector on code
+    
+    Args:
+        code (str): Python code to analyze
+        
+    Returns:
+        dict: Raw detector results
+    """
+    return get_detector().analyze(code)
+
+def detect_issues_deep(code: str) -> Dict[str, Any]:
+    """
+    Run the static and model-backed detectors on code
+    
+    Args:
+        code (str): Python code to analyze
+        
+    Returns:
+        dict: Raw detector results with the model's logic errors added
+    """
+    results = detect_issues(code)
+    deep_detector = get_deep_detector()
+    if deep_detector is not None and not results.get("syntax_errors"):
+        logic_errors = list(results.get("logic_errors", []))
+        logic_errors.extend(
+            e for e in deep_detector.analyze(code).get("logic_errors", []) if e not in logic_errors
+        )
+        results = dict(results, logic_errors=logic_errors)
+    return results
+
+def suggest_fixes(code: str, results: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Get fix suggestions for previously detected issues
+    
+    Args:
+        code (str): Python code that was analyzed
+        results (dict): Raw detector results from detect_issues
+        
+    Returns:
+        dict: Syntax, logic and quality fixes
+    """
+    suggestions = get_detector().fix_suggestions(code, results)
+    return {
+        "syntax_fixes": suggestions.get("syntax_fixes", []),
+        "logic_fixes": suggestions.get("logic_fixes", []),
+        "quality_fixes": suggestions.get("quality_fixes", [])
+    }
+
+def _issue_message(issue: Any) -> str:
+    """Message of a detector issue or rule finding, normalized for comparison"""
+    message = issue.get("message", "") if isinstance(issue, dict) else str(issue)
+    return " ".join(message.split()).rstrip(".").lower()
+
+def add_prepass_findings(logic_errors: List[Any], prepass: Dict[str, List[str]]) -> List[Any]:
+    """Logic errors followed by the rule engine findings the detector didn't already report"""
+    logic_errors = list(logic_errors)
+    reported = {_issue_message(issue) for issue in logic_errors}
+    for finding in prepass["logic_errors"]:
+        message = _issue_message(finding)
+        if message not in reported:
+            reported.add(message)
+            logic_errors.append(finding)
+    return logic_errors
+
+def format_issues(results: Dict[str, Any], prepass: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """
+    Map raw detector results to the issue fields of an analysis result
+    
+    Args:
+        results (dict): Raw detector results
+        prepass (dict): Rule engine findings to add to the logic errors,
+            except those the detector already reported
+        
+    Returns:
+        dict: Syntax, logic and quality issues and the quality prediction
+    """
+    logic_errors = list(results.get("logic_errors", []))
+    if prepass:
+        logic_errors = add_prepass_findings(logic_errors, prepass)
+    return {
+        "syntax_errors": results.get("syntax_errors", []),
+        "logic_errors": logic_errors,
+        "code_quality_issues": results.get("code_quality_issues", []),
+        "prediction": results.get("quality_score", 0.5)
+    }
+
+def no_fix_suggestions() -> Dict[str, List[Any]]:
+    """Fix suggestions of an analysis that skipped the fix stage"""
+    return {"syntax_fixes": [], "logic_fixes": [], "quality_fixes": []}
+
+def needs_detector(prepass: Dict[str, List[str]], mode: str) -> bool:
+    """Whether the detector stages can add anything after the pre-pass"""
+    return mode != "fast" and not prepass["syntax_errors"]
+
+def prepass_analysis(prepass: Dict[str, List[str]], mode: str) -> Dict[str, Any]:
+    """
+    Analysis result built from the pre-pass alone
+    
+    Used for fast analyses, and for code that doesn't parse, where the
+    detector and fix suggestions have nothing to work with. Without the
+    detector there is no quality score, so the result is marked
+    "scored": False and its prediction is only a placeholder.
+    """
+    issues = format_issues({"syntax_errors": prepass["syntax_errors"]}, prepass)
+    return dict(issues, fix_suggestions=no_fix_suggestions(), mode=mode, scored=False)
+
+def analyze_fast(code: str) -> Dict[str, Any]:
+    """
+    Parse and run the rule checks only, without the detector
+    
+    Args:
+        code (str): Python code to analyze
+        
+    Returns:
+        dict: Analysis results, same shape as analyze_user_code
+    """
+    return prepass_analysis(run_prepass(code), "fast")
+
+def failed_analysis(e: Exception) -> Dict[str, Any]:
+    """Analysis result reported when the detector raises"""
+    return {
+        "error": str(e),
+        "syntax_errors": [f"Analysis error: {str(e)}"],
+        "logic_errors": [],
+        "code_quality_issues": [],
+        "prediction": 0.0,
+        "fix_suggestions": no_fix_suggestions()
+    }
+
+def limit_exceeded_analysis(e: AnalysisLimitExceeded, mode: str) -> Dict[str, Any]:
+    """
+    Analysis result reported when an analysis ran out of time or memory
+    
+    It carries no findings and is never cached: the budget may have run
+    out because the pool was busy or the worker was already large, and
+    the next attempt may well finish.
+    """
+    return {
+        "limit_exceeded": {"kind": e.kind, "detail": e.detail},
+        "syntax_errors": [],
+        "logic_errors": [],
+        "code_quality_issues": [],
+        "prediction": 0.5,
+        "fix_suggestions": no_fix_suggestions(),
+        "mode": mode
+    }
+
+def run_detector_stages(code: str, mode: str, timings: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Detector and fix suggestion stages, without the pre-pass findings
+    
+    Args:
+        code (str): Python code that parses
+        mode (str): "standard" or "deep"
+        timings (dict): Filled with the seconds each stage took
+        
+    Returns:
+        dict: Analysis results, same shape as analyze_user_code
+    """
+    # Analyze the code
+    started = time.perf_counter()
+    results = detect_issues_deep(code) if mode == "deep" else detect_issues(code)
+    timings["detect"] = time.perf_counter() - started
+    
+    # Get fix suggestions
+    started = time.perf_counter()
+    suggestions = suggest_fixes(code, results)
+    timings["fix_suggestions"] = time.perf_counter() - started
+    
+    # Format the response to match expected structure
+    return dict(format_issues(results), fix_suggestions=suggestions, mode=mode)
+
+def analyze_code_unit(code: str, mode: str = DEFAULT_ANALYSIS_MODE) -> Dict[str, Any]:
+    """
+    Run the detector stages on one top-level unit of a module
+    
+    The rule pre-pass is left out: it needs the whole module, e.g. to
+    see that a module-level name is used by a function in another unit,
+    so the caller runs it once over the module instead.
+    
+    Args:
+        code (str): Source of the unit
+        mode (str): "standard" or "deep"
+        
+    Returns:
+        dict: Detector findings and fix suggestions, plus "timings"
+    """
+    timings = {}
+    try:
+        return dict(run_detector_stages(code, mode, timings), timings=timings)
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in code analysis: {str(e)}")
+        return failed_analysis(e)
+
+def analyze_user_code(code: str, mode: str = DEFAULT_ANALYSIS_MODE) -> Dict[str, Any]:
     """
     Analyze Python code using PyBugHunt
     
+    Code that doesn't parse skips the detector and fix suggestions and
+    only reports its syntax errors.
+    
     Args:
         code (str): Python code to analyze
+        mode (str): One of ANALYSIS_MODES
         
     Returns:
-        dict: Analysis results with suggestions
+        dict: Analysis results with suggestions, plus per-stage "timings"
+        in seconds for the caller's metrics
     """
+    timings = {}
     try:
-        # Create analyzer instance
-        analyzer = CodeErrorDetector()
-        
-        # Analyze the code
-        results = analyzer.analyze(code)
-        
-        # Get fix suggestions
-        suggestions = analyzer.fix_suggestions(code, results)
-        
-        # Format the response to match expected structure
-        return {
-            "syntax_errors": results.get("syntax_errors", []),
-            "logic_errors": results.get("logic_errors", []),
-            "code_quality_issues": results.get("code_quality_issues", []),
-            "prediction": results.get("quality_score", 0.5),
-            "fix_suggestions": {
-                "syntax_fixes": suggestions.get("syntax_fixes", []),
-                "logic_fixes": suggestions.get("logic_fixes", []),
-                "quality_fixes": suggestions.get("quality_fixes", [])
-            }
-        }
+        # Cheap rule checks first
+        started = time.perf_counter()
+        prepass = run_prepass(code)
+        timings["prepass"] = time.perf_counter() - started
+        if not needs_detector(prepass, mode):
+            return dict(prepass_analysis(prepass, mode), timings=timings)
+        
+        analysis = run_detector_stages(code, mode, timings)
+        analysis["logic_errors"] = add_prepass_findings(analysis["logic_errors"], prepass)
+        return dict(analysis, timings=timings)
+    except MemoryError:
+        # Out of memory budget; reported by the worker rather than as a detector failure
+        raise
     except Exception as e:
         logger.error(f"Error in code analysis: {str(e)}")
-        return {
-            "syntax_errors": [f"Analysis error: {str(e)}"],
-            "logic_errors": [],
-            "code_quality_issues": [],
-            "prediction": 0.0,
-            "fix_suggestions": {"syntax_fixes": [], "logic_fixes": [], "quality_fixes": []}
-        }
\ No newline at end of file
+        return failed_analysis(e)
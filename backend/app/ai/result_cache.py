@@ -0,0 +1,169 @@
+# backend/app/ai/result_cache.py
+from importlib import metadata
+from typing import Dict, Any, Awaitable, Callable, Optional
+import asyncio
+import hashlib
+import logging
+from app.cache import LRUCache
+from app.config import (
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_TTL_SECONDS,
+    ANALYSIS_CACHE_PERSISTENT,
+)
+from app.database import get_cached_analysis, save_cached_analysis
+from app.ai.pybughunt_integration import analyze_fast, DEFAULT_ANALYSIS_MODE
+from app.ai.worker_pool import analyze_code_async
+from app.metrics import ANALYSIS_STAGE_DURATION
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the shape or content of analyze_user_code results changes
+RESULT_FORMAT_VERSION = "6"
+
+try:
+    ANALYZER_VERSION = metadata.version("pybughunt")
+except metadata.PackageNotFoundError:
+    ANALYZER_VERSION = "unknown"
+
+# First tier: in-process LRU
+_memory_cache = LRUCache(
+    max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS
+)
+
+# Second tier counters (MongoDB)
+_db_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+# Analyses currently running, so concurrent identical submissions share one run
+_in_flight: Dict[str, "asyncio.Future"] = {}
+
+def normalize_code(code: str) -> str:
+    """
+    Normalize line endings and trailing whitespace, which don't affect analysis
+    
+    Leading blank lines are kept: they shift the line numbers of every
+    reported issue.
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip("\n")
+
+def cache_key(code: str, variant: str = "") -> str:
+    """
+    Build the content address of an analysis
+    
+    Args:
+        code (str): Python code to analyze
+        variant (str): Extra discriminator for analyses of the same code
+        
+    Returns:
+        str: Hex digest of the normalized code and analyzer version
+    """
+    digest = hashlib.sha256()
+    for part in (ANALYZER_VERSION, RESULT_FORMAT_VERSION, variant, normalize_code(code)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def is_cacheable(result: Dict[str, Any]) -> bool:
+    """Failed analyses, and analyses stopped by their budget, are never cached"""
+    return "error" not in result and "limit_exceeded" not in result
+
+async def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """Find a cached result in memory, then in MongoDB"""
+    result = _memory_cache.get(key)
+    if result is not None or not ANALYSIS_CACHE_PERSISTENT:
+        return result
+    try:
+        result = await get_cached_analysis(key)
+    except Exception as e:
+        _db_stats["errors"] += 1
+        logger.warning(f"Analysis cache lookup failed: {str(e)}")
+        return None
+    if result is None:
+        _db_stats["misses"] += 1
+        return None
+    _db_stats["hits"] += 1
+    _memory_cache.set(key, result)
+    return result
+
+async def store(key: str, result: Dict[str, Any]) -> None:
+    """Save a result in both cache tiers"""
+    _memory_cache.set(key, result)
+    if not ANALYSIS_CACHE_PERSISTENT:
+        return
+    try:
+        await save_cached_analysis(key, result)
+    except Exception as e:
+        _db_stats["errors"] += 1
+        logger.warning(f"Analysis cache write failed: {str(e)}")
+
+async def get_or_analyze(
+    key: str,
+    analyze: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    Return the cached result for key, running analyze() on a miss
+    
+    Args:
+        key (str): Content address from cache_key
+        analyze: Coroutine factory producing the analysis result
+        
+    Returns:
+        dict: Analysis results
+    """
+    result = await lookup(key)
+    if result is not None:
+        return result
+
+    pending = _in_flight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        result = await analyze()
+        if is_cacheable(result):
+            await store(key, result)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved when nobody else is waiting
+        future.exception()
+        raise
+    finally:
+        del _in_flight[key]
+
+async def analyze_code_cached(code: str, mode: str = DEFAULT_ANALYSIS_MODE) -> Dict[str, Any]:
+    """
+    Analyze Python code in the worker pool, reusing cached results
+    
+    Fast analyses are a parse and the rule checks, which is cheaper than
+    handing the code to a worker and not worth a cache entry; they run in
+    a thread so a large snippet doesn't stall the event loop.
+    
+    Args:
+        code (str): Python code to analyze
+        mode (str): One of ANALYSIS_MODES
+        
+    Returns:
+        dict: Analysis results, same shape as analyze_user_code
+    """
+    if mode == "fast":
+        with ANALYSIS_STAGE_DURATION.time(stage="prepass"):
+            return await asyncio.to_thread(analyze_fast, code)
+    return await get_or_analyze(cache_key(code, variant=mode), lambda: analyze_code_async(code, mode))
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for both cache tiers"""
+    return {
+        "analyzer_version": ANALYZER_VERSION,
+        "memory": _memory_cache.stats(),
+        "database": dict(_db_stats, enabled=ANALYSIS_CACHE_PERSISTENT),
+    }
@@ -0,0 +1,111 @@
+# backend/app/ai/staged_analysis.py
+from typing import Dict, Any, AsyncIterator, Tuple
+import asyncio
+import logging
+from app.ai.pybughunt_integration import (
+    DEFAULT_ANALYSIS_MODE,
+    run_prepass,
+    detect_issues,
+    detect_issues_deep,
+    suggest_fixes,
+    format_issues,
+    failed_analysis,
+    limit_exceeded_analysis,
+    needs_detector,
+    prepass_analysis,
+)
+from app.ai.limits import AnalysisLimitExceeded
+from app.ai.result_cache import cache_key, lookup, store
+from app.ai.worker_pool import run_in_pool
+from app.metrics import ANALYSIS_STAGE_DURATION
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stage names, in the order they are emitted
+STAGES = ("syntax", "logic", "quality", "fixes")
+
+def _stage_payloads(analysis_result: Dict[str, Any]):
+    yield "syntax", {"syntax_errors": analysis_result.get("syntax_errors", [])}
+    yield "logic", {"logic_errors": analysis_result.get("logic_errors", [])}
+    yield "quality", {
+        "code_quality_issues": analysis_result.get("code_quality_issues", []),
+        "prediction": analysis_result.get("prediction", 0.5)
+    }
+    yield "fixes", {"fix_suggestions": analysis_result.get("fix_suggestions", {})}
+
+async def analyze_in_stages(
+    code: str,
+    mode: str = DEFAULT_ANALYSIS_MODE
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Analyze Python code, yielding each stage's results as soon as they are ready
+    
+    The syntax stage comes from the rule engine pre-pass and is sent
+    before the detector runs. Logic and quality results follow the
+    detector pass, and fix suggestions follow last. The final item is
+    ("complete", analysis_result) with the full result, which is cached.
+    
+    Fast analyses, and code that doesn't parse, stop after the pre-pass;
+    the remaining stages are still sent, with empty results. Fast
+    analyses skip admission control, so their pre-pass runs in a thread
+    rather than queueing on the worker pool.
+    
+    Args:
+        code (str): Python code to analyze
+        mode (str): One of ANALYSIS_MODES
+        
+    Yields:
+        tuple: (stage name, partial results)
+    """
+    key = cache_key(code, variant=mode)
+    cached = await lookup(key) if mode != "fast" else None
+    if cached is not None:
+        for stage, payload in _stage_payloads(cached):
+            yield stage, payload
+        yield "complete", cached
+        return
+
+    try:
+        with ANALYSIS_STAGE_DURATION.time(stage="prepass"):
+            if mode == "fast":
+                prepass = await asyncio.to_thread(run_prepass, code)
+            else:
+                prepass = await run_in_pool(run_prepass, code)
+        yield "syntax", {"syntax_errors": prepass["syntax_errors"]}
+
+        if not needs_detector(prepass, mode):
+            analysis_result = prepass_analysis(prepass, mode)
+            for stage, payload in _stage_payloads(analysis_result):
+                if stage != "syntax":
+                    yield stage, payload
+            if mode != "fast":
+                await store(key, analysis_result)
+            yield "complete", analysis_result
+            return
+
+        with ANALYSIS_STAGE_DURATION.time(stage="detect"):
+            results = await run_in_pool(detect_issues_deep if mode == "deep" else detect_issues, code)
+        issues = format_issues(results, prepass)
+        yield "logic", {"logic_errors": issues["logic_errors"]}
+        yield "quality", {
+            "code_quality_issues": issues["code_quality_issues"],
+            "prediction": issues["prediction"]
+        }
+
+        with ANALYSIS_STAGE_DURATION.time(stage="fix_suggestions"):
+            suggestions = await run_in_pool(suggest_fixes, code, results)
+        yield "fixes", {"fix_suggestions": suggestions}
+    except AnalysisLimitExceeded as e:
+        logger.warning(f"Staged code analysis stopped: {e.detail}")
+        yield "complete", limit_exceeded_analysis(e, mode)
+        return
+    except Exception as e:
+        logger.error(f"Error in staged code analysis: {str(e)}")
+        yield "complete", failed_analysis(e)
+        return
+
+    analysis_result = dict(issues, fix_suggestions=suggestions, mode=mode)
+    await store(key, analysis_result)
+    yield "complete", analysis_result
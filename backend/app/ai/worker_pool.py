@@ -0,0 +1,268 @@
+# backend/app/ai/worker_pool.py
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional, Set
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import weakref
+from app.ai.limits import AnalysisLimitExceeded, run_with_budget, time_budget_exceeded
+from app.ai.pybughunt_integration import (
+    analyze_user_code,
+    init_worker,
+    limit_exceeded_analysis,
+    DEFAULT_ANALYSIS_MODE,
+)
+from app.config import (
+    ANALYSIS_WORKERS,
+    ANALYSIS_TIME_LIMIT_SECONDS,
+    ANALYSIS_KILL_GRACE_SECONDS,
+    ANALYSIS_WORKER_MAX_TASKS,
+    ANALYSIS_WORKER_MAX_RSS_MB,
+)
+from app.metrics import (
+    ANALYSIS_LIMITS_EXCEEDED,
+    ANALYSIS_POOL_RECYCLES,
+    ANALYSIS_STAGE_DURATION,
+    observe_stage_timings,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Global executor - worker processes are started on first use
+_executor: Optional[ProcessPoolExecutor] = None
+
+# Tasks submitted to the pool that haven't finished yet
+_pending_tasks = 0
+
+# Tasks the current pool has completed, and times the pool was replaced, by reason
+_executor_tasks = 0
+_recycles: Dict[str, int] = {}
+
+# Pools whose workers were terminated; their tasks are about to fail with BrokenProcessPool
+_killed_pools: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+# Queue each pool's workers report their PID on as they start, and the PIDs read from it so far
+_pid_queues: "weakref.WeakKeyDictionary[ProcessPoolExecutor, Any]" = weakref.WeakKeyDictionary()
+_worker_pids: "weakref.WeakKeyDictionary[ProcessPoolExecutor, Set[int]]" = weakref.WeakKeyDictionary()
+
+# How often a task is checked for having been dispatched to a worker
+DISPATCH_POLL_SECONDS = 0.25
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get or create the pool of analysis worker processes"""
+    global _executor, _executor_tasks
+    if _executor is None:
+        logger.info(f"Starting analysis pool with {ANALYSIS_WORKERS} workers")
+        pid_queue = multiprocessing.SimpleQueue()
+        _executor = ProcessPoolExecutor(
+            max_workers=ANALYSIS_WORKERS,
+            initializer=_init_pool_worker,
+            initargs=(pid_queue,)
+        )
+        _pid_queues[_executor] = pid_queue
+        _worker_pids[_executor] = set()
+        _executor_tasks = 0
+    return _executor
+
+def _init_pool_worker(pid_queue) -> None:
+    # Report first, so a worker that hangs while warming up can still be killed
+    pid_queue.put(os.getpid())
+    init_worker()
+
+def recycle_executor(reason: str, kill: bool = False) -> None:
+    """
+    Replace the pool; the next task starts fresh workers
+    
+    The old pool normally finishes the tasks it already has and then
+    exits, so for a moment both pools may have workers. With kill, its
+    workers are terminated at once: a worker stuck in native code doesn't
+    see the time budget's signal, and this is the only way to stop it.
+    Tasks the old pool was running or still had queued then fail with
+    BrokenProcessPool and are retried by run_in_pool; queued tasks are
+    not cancelled, which would bypass that retry.
+    
+    Args:
+        reason (str): Why the pool is replaced, for logs and metrics
+        kill (bool): Terminate the old workers instead of draining them
+    """
+    global _executor
+    executor, _executor = _executor, None
+    if executor is None:
+        return
+    _recycles[reason] = _recycles.get(reason, 0) + 1
+    ANALYSIS_POOL_RECYCLES.inc(reason=reason)
+    logger.warning(f"Recycling analysis pool ({reason})")
+    if kill:
+        _terminate_workers(executor)
+    executor.shutdown(wait=False)
+
+def _terminate_workers(executor: ProcessPoolExecutor) -> None:
+    # ProcessPoolExecutor has no public way to stop a running task, so
+    # its workers are signalled directly, by the PIDs they reported
+    _killed_pools.add(executor)
+    pids = _worker_pids.get(executor, set())
+    pid_queue = _pid_queues.get(executor)
+    while pid_queue is not None and not pid_queue.empty():
+        pids.add(pid_queue.get())
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+async def warm_up_pool() -> None:
+    """
+    Start every worker and wait until they are warm
+    
+    Each worker runs init_worker (detector build and a canned analysis)
+    before its first task, so once these no-op tasks return the pool is
+    ready for real analyses.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    pids = await asyncio.gather(*[
+        loop.run_in_executor(executor, os.getpid)
+        for _ in range(ANALYSIS_WORKERS)
+    ])
+    logger.info(f"Analysis pool warm ({len(set(pids))} workers answered)")
+
+def shutdown_executor() -> None:
+    """Stop the worker processes, waiting for running analyses to finish"""
+    global _executor
+    if _executor is not None:
+        logger.info("Shutting down analysis pool")
+        _executor.shutdown(wait=True)
+        _executor = None
+
+async def analyze_code_async(
+    code: str,
+    mode: str = DEFAULT_ANALYSIS_MODE,
+    analyze: Callable[[str, str], Dict[str, Any]] = analyze_user_code
+) -> Dict[str, Any]:
+    """
+    Analyze Python code in the worker pool without blocking the event loop
+    
+    Args:
+        code (str): Python code to analyze
+        mode (str): One of ANALYSIS_MODES
+        analyze: Picklable analysis function run in the worker, e.g.
+            analyze_code_unit for one unit of a module
+        
+    Returns:
+        dict: Analysis results, same shape as analyze_user_code
+    """
+    started = time.perf_counter()
+    try:
+        result = await run_in_pool(analyze, code, mode)
+    except AnalysisLimitExceeded as e:
+        logger.warning(f"Analysis stopped: {e.detail}")
+        return limit_exceeded_analysis(e, mode)
+    elapsed = time.perf_counter() - started
+    
+    timings = result.pop("timings", None) or {}
+    observe_stage_timings(timings)
+    # Whatever the worker didn't spend analyzing was queueing and transfer
+    ANALYSIS_STAGE_DURATION.observe(max(0.0, elapsed - sum(timings.values())), stage="pool_wait")
+    return result
+
+async def _run_once(executor: ProcessPoolExecutor, func: Callable[..., Any], *args: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    task = executor.submit(run_with_budget, func, *args)
+    future = asyncio.wrap_future(task)
+    # The worker enforces the time budget itself; this deadline only
+    # catches workers that can't be interrupted. It only counts once the
+    # task was dispatched to a worker, so a long queue isn't mistaken
+    # for a stuck worker, and leaves room for one-time model loading.
+    deadline = None
+    if ANALYSIS_TIME_LIMIT_SECONDS > 0:
+        deadline = ANALYSIS_TIME_LIMIT_SECONDS + ANALYSIS_KILL_GRACE_SECONDS
+    running_since = None
+    while True:
+        if deadline is None or executor in _killed_pools:
+            timeout = None
+        elif running_since is None:
+            timeout = DISPATCH_POLL_SECONDS
+        else:
+            timeout = max(0.0, running_since + deadline - loop.time())
+        done, _ = await asyncio.wait({future}, timeout=timeout)
+        if done:
+            break
+        if running_since is None:
+            if task.running():
+                running_since = loop.time()
+            continue
+        if executor not in _killed_pools:
+            # Running for a whole deadline. A task counts as running once
+            # it is handed to the workers' call queue, so it may be
+            # waiting behind another stuck one: only the first to get
+            # here times out, the others fail with the killed pool and
+            # are retried.
+            future.cancel()
+            if executor is _executor:
+                recycle_executor("stuck", kill=True)
+            else:
+                _terminate_workers(executor)
+            ANALYSIS_LIMITS_EXCEEDED.inc(kind="timeout")
+            raise time_budget_exceeded()
+        was_running = task.running()
+    if future.cancelled():
+        # Dropped by a pool that was shut down before running it
+        raise BrokenProcessPool("Analysis pool was replaced before the task ran")
+    try:
+        result, rss = future.result()
+    except AnalysisLimitExceeded as e:
+        ANALYSIS_LIMITS_EXCEEDED.inc(kind=e.kind)
+        if e.kind == "memory" and executor is _executor:
+            # The failed allocation may have left the worker's heap fragmented
+            recycle_executor("memory")
+        raise
+    if executor is _executor:
+        _count_task(rss)
+    return result
+
+def _count_task(rss: int) -> None:
+    """Recycle the pool once its workers grew too large or ran their share of tasks"""
+    global _executor_tasks
+    _executor_tasks += 1
+    if ANALYSIS_WORKER_MAX_RSS_MB > 0 and rss > ANALYSIS_WORKER_MAX_RSS_MB * 1024 * 1024:
+        recycle_executor("rss")
+    elif ANALYSIS_WORKER_MAX_TASKS > 0 and _executor_tasks >= ANALYSIS_WORKER_MAX_TASKS * ANALYSIS_WORKERS:
+        # ProcessPoolExecutor's max_tasks_per_child can deadlock before
+        # Python 3.12, so workers are replaced a whole pool at a time
+        recycle_executor("max_tasks")
+
+async def run_in_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a picklable module-level function in the worker pool
+    
+    The call runs under the per-analysis time and memory budgets. The
+    pool is replaced when a worker grows past ANALYSIS_WORKER_MAX_RSS_MB,
+    after ANALYSIS_WORKER_MAX_TASKS tasks per worker, or when a worker
+    has to be killed.
+    
+    Raises:
+        AnalysisLimitExceeded: The call ran out of time or memory
+    """
+    global _pending_tasks
+    _pending_tasks += 1
+    try:
+        executor = get_executor()
+        try:
+            return await _run_once(executor, func, *args)
+        except BrokenProcessPool:
+            # Lost to another task's stuck worker being killed, or a worker crash; try once more on a fresh pool
+            if executor is _executor:
+                recycle_executor("broken")
+            return await _run_once(get_executor(), func, *args)
+    finally:
+        _pending_tasks -= 1
+
+def pool_stats() -> Dict[str, Any]:
+    """Worker count, tasks waiting for or running on a worker, and pool recycles"""
+    return {"workers": ANALYSIS_WORKERS, "pending_tasks": _pending_tasks, "recycles": dict(_recycles)}
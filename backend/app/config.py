@@ -10,10 +10,90 @@ AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")
 AUTH0_CLIENT_ID = os.getenv("AUTH0_CLIENT_ID")
 AUTH0_CLIENT_SECRET = os.getenv("AUTH0_CLIENT_SECRET")
 AUTH0_CALLBACK_URL = os.getenv("AUTH0_CALLBACK_URL") or "http://localhost:8000/auth/callback"
+# Set to the Auth0 API identifier so access tokens are JWTs that can be verified locally
+AUTH0_AUDIENCE = os.getenv("AUTH0_AUDIENCE")
+AUTH0_JWKS_REFRESH_SECONDS = int(os.getenv("AUTH0_JWKS_REFRESH_SECONDS", "3600"))
+USERINFO_CACHE_TTL_SECONDS = int(os.getenv("USERINFO_CACHE_TTL_SECONDS", "300"))
+# How long a token that couldn't be resolved is treated as anonymous without asking Auth0 again
+USERINFO_NEGATIVE_CACHE_TTL_SECONDS = int(os.getenv("USERINFO_NEGATIVE_CACHE_TTL_SECONDS", "60"))
+
+# Review history write-behind buffer
+HISTORY_FLUSH_BATCH_SIZE = int(os.getenv("HISTORY_FLUSH_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", "2"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+# Entries carry the reviewed code, so the buffer is also bounded by their total size
+HISTORY_MAX_PENDING_BYTES = int(os.getenv("HISTORY_MAX_PENDING_BYTES", str(64 * 1024 * 1024)))
+HISTORY_PAGE_MAX_SIZE = int(os.getenv("HISTORY_PAGE_MAX_SIZE", "100"))
+
+# Routers this process serves; e.g. "auth" for pods that never analyze code
+APP_ROUTERS = [name.strip() for name in os.getenv("APP_ROUTERS", "auth,review").split(",") if name.strip()]
+
+# Instrumentation: profile a sample of requests and keep profiles of slow ones
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "1000"))
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+# Responses at least this large are gzip-compressed for clients that accept it
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+
+# Outbound HTTP client configuration
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+
+# Analysis worker pool configuration
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS") or os.cpu_count() or 1)
+ANALYSIS_BATCH_MAX_SNIPPETS = int(os.getenv("ANALYSIS_BATCH_MAX_SNIPPETS", "1000"))
+
+# Budgets of one analysis, and when pool workers are replaced (0 disables a limit)
+ANALYSIS_TIME_LIMIT_SECONDS = float(os.getenv("ANALYSIS_TIME_LIMIT_SECONDS", "30"))
+ANALYSIS_KILL_GRACE_SECONDS = float(os.getenv("ANALYSIS_KILL_GRACE_SECONDS", "30"))
+ANALYSIS_MEMORY_LIMIT_MB = int(os.getenv("ANALYSIS_MEMORY_LIMIT_MB", "1024"))
+ANALYSIS_WORKER_MAX_TASKS = int(os.getenv("ANALYSIS_WORKER_MAX_TASKS", "500"))
+ANALYSIS_WORKER_MAX_RSS_MB = int(os.getenv("ANALYSIS_WORKER_MAX_RSS_MB", "1536"))
+
+# Admission control for the review routes
+ANALYSIS_MAX_CONCURRENT = int(os.getenv("ANALYSIS_MAX_CONCURRENT") or 2 * ANALYSIS_WORKERS)
+ANALYSIS_MAX_QUEUED = int(os.getenv("ANALYSIS_MAX_QUEUED", "64"))
+ANALYSIS_MAX_PER_USER = int(os.getenv("ANALYSIS_MAX_PER_USER", "8"))
+ANALYSIS_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_QUEUE_TIMEOUT_SECONDS", "5"))
+REVIEW_MAX_CODE_BYTES = int(os.getenv("REVIEW_MAX_CODE_BYTES", str(256 * 1024)))
+REVIEW_MAX_CODE_LINES = int(os.getenv("REVIEW_MAX_CODE_LINES", "10000"))
+REVIEW_MAX_BODY_BYTES = int(os.getenv("REVIEW_MAX_BODY_BYTES", str(4 * 1024 * 1024)))
+
+# Project archives: upload size, and how much Python code one may contain
+ARCHIVE_MAX_UPLOAD_BYTES = int(os.getenv("ARCHIVE_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+ARCHIVE_MAX_FILES = int(os.getenv("ARCHIVE_MAX_FILES", "5000"))
+ARCHIVE_MAX_TOTAL_BYTES = int(os.getenv("ARCHIVE_MAX_TOTAL_BYTES", str(200 * 1024 * 1024)))
+
+# Live review sessions: quiet time before analyzing, and the longest an update may wait
+LIVE_DEBOUNCE_SECONDS = float(os.getenv("LIVE_DEBOUNCE_SECONDS", "0.3"))
+LIVE_MAX_DELAY_SECONDS = float(os.getenv("LIVE_MAX_DELAY_SECONDS", "2"))
+
+# Review jobs: durable queue in MongoDB worked by `python -m app.worker`
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY") or ANALYSIS_WORKERS)
+JOB_IDLE_POLL_SECONDS = float(os.getenv("JOB_IDLE_POLL_SECONDS", "1"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", str(7 * 24 * 3600)))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "30"))
+JOB_WAIT_POLL_SECONDS = float(os.getenv("JOB_WAIT_POLL_SECONDS", "0.5"))
+
+# Model-backed detector used by "deep" analyses ("codebert" or "t5")
+DEEP_ANALYSIS_MODEL = os.getenv("DEEP_ANALYSIS_MODEL", "codebert")
+DEEP_ANALYSIS_MODEL_PATH = os.getenv("DEEP_ANALYSIS_MODEL_PATH")
+
+# Analysis result cache configuration
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+ANALYSIS_CACHE_PERSISTENT = os.getenv("ANALYSIS_CACHE_PERSISTENT", "true").lower() == "true"
+ANALYSIS_CACHE_DB_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_DB_TTL_SECONDS", str(7 * 24 * 3600)))
 
 # Database configuration
 USE_LOCAL_DB = os.getenv("USE_LOCAL_DB", "false").lower() == "true"
 DATABASE_NAME = os.getenv("DATABASE_NAME")
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
 
 if not DATABASE_NAME:
     print("❌ ERROR: DATABASE_NAME not set in .env")
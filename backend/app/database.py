@@ -1,6 +1,22 @@
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
-from app.config import MONGO_URI, DATABASE_NAME, USE_LOCAL_DB
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.cache import LRUCache
+from app.metrics import track_outbound
+from app.config import (
+    MONGO_URI,
+    DATABASE_NAME,
+    USE_LOCAL_DB,
+    ANALYSIS_CACHE_DB_TTL_SECONDS,
+    JOB_RESULT_TTL_SECONDS,
+    USER_CACHE_MAX_ENTRIES,
+    USER_CACHE_TTL_SECONDS,
+)
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
 import logging
+import uuid
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -9,6 +25,9 @@ logger = logging.getLogger(__name__)
 # Global client variable - connection is only established when needed
 _client = None
 
+# Recently looked-up users by Auth0 sub, invalidated on write
+_user_cache = LRUCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
 async def get_database():
     """Get or create the database connection"""
     global _client
@@ -31,23 +50,284 @@ async def get_database():
             raise
     return _client[DATABASE_NAME]
 
+def user_cache_stats():
+    """Hit/miss counters for the user lookup cache"""
+    return _user_cache.stats()
+
+async def ensure_indexes():
+    """Create the indexes the queries in this module rely on"""
+    db = await get_database()
+    await db.users.create_index("sub", unique=True)
+    # GitHub users may hide their email, so only index real addresses
+    await db.users.create_index(
+        "email",
+        unique=True,
+        partialFilterExpression={"email": {"$type": "string"}}
+    )
+    await db.review_history.create_index([("sub", 1), ("created_at", -1), ("_id", -1)])
+    # Expired entries are removed by MongoDB's TTL monitor
+    await db.analysis_cache.create_index(
+        "created_at", expireAfterSeconds=ANALYSIS_CACHE_DB_TTL_SECONDS
+    )
+    # Queued jobs are claimed oldest first; expired leases are found by expiry
+    await db.review_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.review_jobs.create_index([("status", 1), ("lease_expires_at", 1)])
+    # Finished jobs carry expires_at and are removed once it passes
+    await db.review_jobs.create_index("expires_at", expireAfterSeconds=0)
+    logger.debug("MongoDB indexes ensured")
+
 async def get_user(email: str):
     """Get a user by email"""
     db = await get_database()
-    return await db.users.find_one({"email": email})
+    with track_outbound("mongo", "get_user"):
+        return await db.users.find_one({"email": email})
 
 async def get_user_by_sub(sub: str):
     """Get a user by Auth0 sub ID"""
+    user = _user_cache.get(sub)
+    if user is not None:
+        return dict(user)
     db = await get_database()
-    return await db.users.find_one({"sub": sub})
+    with track_outbound("mongo", "get_user_by_sub"):
+        user = await db.users.find_one({"sub": sub})
+    if user is not None:
+        _user_cache.set(sub, user)
+        return dict(user)
+    return None
+
+def _duplicate_key_fields(e: DuplicateKeyError) -> List[str]:
+    """Fields of the unique index a write collided on"""
+    key_pattern = (e.details or {}).get("keyPattern")
+    if key_pattern:
+        return list(key_pattern)
+    # Servers older than 4.2 only name the index in the message
+    return ["email"] if "email_1" in str(e) else ["sub"]
 
 async def save_user(user_data: dict):
-    """Save or update a user"""
+    """
+    Save or update a user in a single atomic upsert
+    
+    If another user already has the email address, e.g. the same person
+    logging in through a second identity provider, the user is saved
+    without it and "email_conflict" is set in the result.
+    """
+    db = await get_database()
+    sub = user_data.get("sub")
+    update = {"$set": user_data}
+    email_conflict = False
+    with track_outbound("mongo", "save_user"):
+        try:
+            result = await db.users.update_one({"sub": sub}, update, upsert=True)
+        except DuplicateKeyError as e:
+            if "email" in _duplicate_key_fields(e):
+                logger.warning(f"Email of user {sub} belongs to another user; saving it without the email")
+                email_conflict = True
+                update = {
+                    "$set": {key: value for key, value in user_data.items() if key != "email"},
+                    "$unset": {"email": ""},
+                }
+                result = await db.users.update_one({"sub": sub}, update, upsert=True)
+            else:
+                # A concurrent login inserted the same user first; update that document
+                result = await db.users.update_one({"sub": sub}, update)
+    # Dropped after the write, so a concurrent read can't cache the old document again
+    _user_cache.delete(sub)
+    if result.upserted_id is not None:
+        saved = {"inserted_id": str(result.upserted_id), "is_new": True}
+    else:
+        saved = {"matched_count": result.matched_count, "modified_count": result.modified_count, "is_new": False}
+    if email_conflict:
+        saved["email_conflict"] = True
+    return saved
+
+async def get_cached_analysis(key: str):
+    """Get a cached analysis result by its content key"""
+    db = await get_database()
+    with track_outbound("mongo", "get_cached_analysis"):
+        doc = await db.analysis_cache.find_one({"_id": key}, {"result": 1})
+    return doc["result"] if doc else None
+
+async def save_cached_analysis(key: str, result: dict):
+    """Save an analysis result under its content key"""
+    db = await get_database()
+    with track_outbound("mongo", "save_cached_analysis"):
+        await db.analysis_cache.replace_one(
+            {"_id": key},
+            {"_id": key, "result": result, "created_at": datetime.now(timezone.utc)},
+            upsert=True
+        )
+
+async def insert_review_history(reviews: List[dict]):
+    """Insert a batch of review history entries"""
     db = await get_database()
-    existing_user = await db.users.find_one({"sub": user_data.get("sub")})
-    if not existing_user:
-        result = await db.users.insert_one(user_data)
-        return {"inserted_id": str(result.inserted_id), "is_new": True}
+    with track_outbound("mongo", "insert_review_history"):
+        result = await db.review_history.insert_many(reviews, ordered=False)
+    return len(result.inserted_ids)
+
+async def get_review_history(
+    sub: str,
+    limit: int,
+    before: Optional[datetime] = None,
+    before_id: Optional[ObjectId] = None
+):
+    """
+    Get a user's most recent reviews, newest first
+    
+    Reviews are ordered by (created_at, _id), so entries flushed in the
+    same batch with equal timestamps keep a stable order. Given a cursor,
+    only reviews after it in that order are returned; without before_id
+    the cursor is just the timestamp.
+    """
+    db = await get_database()
+    query: Dict[str, Any] = {"sub": sub}
+    if before is not None and before_id is not None:
+        query["$or"] = [
+            {"created_at": {"$lt": before}},
+            {"created_at": before, "_id": {"$lt": before_id}},
+        ]
+    elif before is not None:
+        query["created_at"] = {"$lt": before}
+    cursor = db.review_history.find(query).sort([("created_at", -1), ("_id", -1)]).limit(limit)
+    with track_outbound("mongo", "get_review_history"):
+        return await cursor.to_list(length=limit)
+
+async def create_review_job(sub: Optional[str], request: Dict[str, Any]) -> str:
+    """
+    Queue a review job
+    
+    Args:
+        sub (str): Auth0 sub of the submitter, if authenticated
+        request (dict): Analysis request (code, language, mode, incremental)
+        
+    Returns:
+        str: Job id, random so it can't be guessed
+    """
+    db = await get_database()
+    now = datetime.now(timezone.utc)
+    job = {
+        "_id": uuid.uuid4().hex,
+        "sub": sub,
+        "request": request,
+        "status": "queued",
+        "attempts": 0,
+        "worker_id": None,
+        "lease_expires_at": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    with track_outbound("mongo", "create_review_job"):
+        await db.review_jobs.insert_one(job)
+    return job["_id"]
+
+async def claim_review_job(worker_id: str, lease_seconds: float, max_attempts: int):
+    """
+    Atomically claim the oldest queued job, or a running job whose lease expired
+    
+    Only one worker can win a claim, since each is a single
+    find_one_and_update. Jobs whose worker crashed are claimed again once
+    their lease runs out, up to max_attempts times.
+    
+    Returns:
+        dict: The claimed job, or None if there is nothing to do
+    """
+    db = await get_database()
+    now = datetime.now(timezone.utc)
+    update = {
+        "$set": {
+            "status": "running",
+            "worker_id": worker_id,
+            "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            "updated_at": now,
+        },
+        "$inc": {"attempts": 1},
+    }
+    for query, sort in (
+        ({"status": "queued"}, [("created_at", 1)]),
+        (
+            {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$lt": max_attempts}},
+            [("lease_expires_at", 1)]
+        ),
+    ):
+        with track_outbound("mongo", "claim_review_job"):
+            job = await db.review_jobs.find_one_and_update(
+                query, update, sort=sort, return_document=ReturnDocument.AFTER
+            )
+        if job is not None:
+            return job
+    return None
+
+async def renew_review_job_lease(job_id: str, worker_id: str, lease_seconds: float) -> bool:
+    """Extend a job's lease; False if the worker no longer holds it"""
+    db = await get_database()
+    now = datetime.now(timezone.utc)
+    with track_outbound("mongo", "renew_review_job_lease"):
+        result = await db.review_jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds), "updated_at": now}}
+        )
+    return result.matched_count == 1
+
+async def finish_review_job(
+    job_id: str,
+    worker_id: str,
+    result: Optional[dict] = None,
+    error: Optional[str] = None,
+    retry: bool = False
+) -> bool:
+    """
+    Record the outcome of a job held by worker_id
+    
+    Args:
+        job_id (str): Job id
+        worker_id (str): Worker holding the lease
+        result (dict): Review, for a successful job
+        error (str): Failure reason, for a failed job
+        retry (bool): Put a failed job back in the queue instead
+        
+    Returns:
+        bool: False if the lease was lost and another worker owns the job
+    """
+    db = await get_database()
+    now = datetime.now(timezone.utc)
+    if retry:
+        update = {"status": "queued", "worker_id": None, "lease_expires_at": None, "error": error}
     else:
-        result = await db.users.update_one({"sub": user_data.get("sub")}, {"$set": user_data})
-        return {"matched_count": result.matched_count, "modified_count": result.modified_count, "is_new": False}
\ No newline at end of file
+        update = {
+            "status": "done" if error is None else "failed",
+            "result": result,
+            "error": error,
+            "lease_expires_at": None,
+            "finished_at": now,
+            "expires_at": now + timedelta(seconds=JOB_RESULT_TTL_SECONDS),
+        }
+    update["updated_at"] = now
+    with track_outbound("mongo", "finish_review_job"):
+        result = await db.review_jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": update}
+        )
+    return result.matched_count == 1
+
+async def fail_abandoned_review_jobs(max_attempts: int) -> int:
+    """Fail jobs whose lease expired after their last allowed attempt"""
+    db = await get_database()
+    now = datetime.now(timezone.utc)
+    with track_outbound("mongo", "fail_abandoned_review_jobs"):
+        result = await db.review_jobs.update_many(
+            {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": max_attempts}},
+            {"$set": {
+                "status": "failed",
+                "error": f"Job abandoned after {max_attempts} attempts",
+                "lease_expires_at": None,
+                "finished_at": now,
+                "updated_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RESULT_TTL_SECONDS),
+            }}
+        )
+    return result.modified_count
+
+async def get_review_job(job_id: str):
+    """Get a job's status and result, without the submitted code"""
+    db = await get_database()
+    with track_outbound("mongo", "get_review_job"):
+        return await db.review_jobs.find_one({"_id": job_id}, {"request.code": 0})
@@ -0,0 +1,131 @@
+# backend/app/history.py
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+from app.config import (
+    HISTORY_FLUSH_BATCH_SIZE,
+    HISTORY_FLUSH_INTERVAL_SECONDS,
+    HISTORY_MAX_PENDING,
+    HISTORY_MAX_PENDING_BYTES,
+)
+from app.database import insert_review_history
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HistoryBuffer:
+    """
+    In-process write-behind buffer for review history
+    
+    Entries are appended without awaiting MongoDB and written with
+    insert_many once HISTORY_FLUSH_BATCH_SIZE entries are pending or
+    HISTORY_FLUSH_INTERVAL_SECONDS have passed. At most
+    HISTORY_MAX_PENDING entries, and HISTORY_MAX_PENDING_BYTES of code
+    and review, are held; beyond that the oldest are dropped and counted.
+    """
+
+    def __init__(self, max_entries: int = HISTORY_MAX_PENDING, max_bytes: int = HISTORY_MAX_PENDING_BYTES):
+        # (entry, approximate size in bytes), oldest first
+        self._pending: deque = deque()
+        self._pending_bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """Queue an entry; never blocks or touches the database"""
+        size = _entry_size(entry)
+        if size > self.max_bytes:
+            self.dropped += 1
+            return
+        self._pending.append((entry, size))
+        self._pending_bytes += size
+        self._drop_oldest()
+        if len(self._pending) >= HISTORY_FLUSH_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _drop_oldest(self) -> None:
+        while len(self._pending) > self.max_entries or self._pending_bytes > self.max_bytes:
+            _, size = self._pending.popleft()
+            self._pending_bytes -= size
+            self.dropped += 1
+
+    def _take(self, count: int) -> List[Tuple[Dict[str, Any], int]]:
+        batch = [self._pending.popleft() for _ in range(count)]
+        self._pending_bytes -= sum(size for _, size in batch)
+        return batch
+
+    async def flush(self) -> None:
+        """Write all pending entries"""
+        while self._pending:
+            batch = self._take(min(HISTORY_FLUSH_BATCH_SIZE, len(self._pending)))
+            try:
+                self.written += await insert_review_history([entry for entry, _ in batch])
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Review history flush failed: {str(e)}")
+                # Put the batch back in front; newer entries win if it no longer fits
+                self._pending.extendleft(reversed(batch))
+                self._pending_bytes += sum(size for _, size in batch)
+                self._drop_oldest()
+                return
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=HISTORY_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background flusher and write what is left"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Buffer counters"""
+        return {
+            "pending": len(self._pending),
+            "pending_bytes": self._pending_bytes,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    """Approximate memory held by an entry: its code plus its serialized review"""
+    return len(entry["code"].encode()) + len(json.dumps(entry["review"], default=str))
+
+history_buffer = HistoryBuffer()
+
+def record_review(sub: str, code: str, code_hash: str, language: str, review: Dict[str, Any]) -> None:
+    """Add a completed review to the user's history"""
+    history_buffer.add({
+        "sub": sub,
+        "created_at": datetime.now(timezone.utc),
+        "language": language,
+        "code": code,
+        "code_hash": code_hash,
+        "review": review,
+    })
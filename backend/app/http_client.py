@@ -0,0 +1,32 @@
+# backend/app/http_client.py
+from typing import Optional
+import httpx
+import logging
+from app.config import HTTP_TIMEOUT_SECONDS, HTTP_MAX_CONNECTIONS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Global client variable - connections are pooled and reused across requests
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared async HTTP client"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS
+            )
+        )
+    return _client
+
+async def close_http_client() -> None:
+    """Close pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
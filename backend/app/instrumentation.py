@@ -0,0 +1,170 @@
+# backend/app/instrumentation.py
+from typing import Any, Dict
+import logging
+import os
+import random
+import time
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from app.config import PROFILE_SAMPLE_RATE, PROFILE_SLOW_REQUEST_MS, PROFILE_DIR
+from app.database import user_cache_stats
+from app.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_SIZE,
+    HTTP_REQUESTS_IN_FLIGHT,
+    register_collector,
+    render_metrics,
+)
+from app.security import userinfo_cache_stats
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, request size and in-flight count per route
+    
+    Routes are labeled by their full path template, router prefix
+    included (e.g. /review/history), so path parameters don't create new
+    series. Streaming responses are timed until their last body chunk is
+    sent. When PROFILE_SAMPLE_RATE is set and pyinstrument is installed,
+    that share of requests is profiled and profiles of requests slower
+    than PROFILE_SLOW_REQUEST_MS are logged (or written to PROFILE_DIR).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        if PROFILE_SAMPLE_RATE and Profiler is None:
+            logger.warning("PROFILE_SAMPLE_RATE is set but pyinstrument is not installed")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        profiler = None
+        if Profiler is not None and PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+        
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            
+            route_path = _route_label(scope)
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.observe(elapsed, method=method, route=route_path, status=str(status["code"]))
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if content_length and content_length.isdigit():
+                HTTP_REQUEST_SIZE.observe(int(content_length), method=method, route=route_path)
+            
+            if profiler is not None:
+                profiler.stop()
+                if elapsed * 1000 >= PROFILE_SLOW_REQUEST_MS:
+                    _save_profile(profiler, method, route_path, elapsed)
+
+def _route_label(scope) -> str:
+    """
+    Full path template of the matched route, e.g. /review/history
+    
+    scope["route"] only knows its path relative to the router it was
+    declared on, so the router prefix is recovered from the request path:
+    it is whatever comes before the first segment boundary where the
+    route's own pattern matches the rest of the path.
+    """
+    route = scope.get("route")
+    route_path = getattr(route, "path", None)
+    if not route_path:
+        return "<unmatched>"
+    path_regex = getattr(route, "path_regex", None)
+    path = scope["path"]
+    if path_regex is None or path_regex.match(path):
+        return route_path
+    for index, char in enumerate(path):
+        if char == "/" and path_regex.match(path[index:]):
+            return path[:index] + route_path
+    return route_path
+
+def _save_profile(profiler, method: str, route_path: str, elapsed: float) -> None:
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{method}-{route_path.strip('/').replace('/', '_') or 'root'}.html"
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            f.write(profiler.output_html())
+        logger.warning(f"Slow request {method} {route_path} ({elapsed * 1000:.0f} ms), profile saved to {name}")
+    else:
+        logger.warning(f"Slow request {method} {route_path} ({elapsed * 1000:.0f} ms):\n{profiler.output_text()}")
+
+def _stat_samples(stats: Dict[str, Any], **labels: str):
+    return [
+        (dict(labels, stat=name), value)
+        for name, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+def _user_cache_samples():
+    return (
+        _stat_samples(user_cache_stats(), cache="user", tier="memory")
+        + _stat_samples(userinfo_cache_stats(), cache="userinfo", tier="memory")
+    )
+
+def register_review_collectors() -> None:
+    """Expose the analysis cache, pool, admission, live session and history counters"""
+    from app.admission import admission
+    from app.ai.result_cache import cache_stats
+    from app.ai.worker_pool import pool_stats
+    from app.history import history_buffer
+    from app.routes.live import live_stats
+    
+    def analysis_cache_samples():
+        stats = cache_stats()
+        return (
+            _stat_samples(stats["memory"], cache="analysis", tier="memory")
+            + _stat_samples(stats["database"], cache="analysis", tier="database")
+            + _user_cache_samples()
+        )
+    
+    register_collector("cache_stat", "Cache counters and sizes", analysis_cache_samples)
+    register_collector("analysis_pool_stat", "Analysis worker pool state", lambda: _stat_samples(pool_stats()))
+    register_collector("analysis_admission_stat", "Review admission control load and counters",
+                       lambda: _stat_samples(admission.stats()))
+    register_collector("live_review_stat", "Live review session counters", lambda: _stat_samples(live_stats()))
+    register_collector("review_history_buffer_stat", "Review history write-behind buffer counters",
+                       lambda: _stat_samples(history_buffer.stats()))
+
+def instrument_app(app: FastAPI, review: bool = True) -> None:
+    """
+    Add request metrics and the Prometheus /metrics endpoint to the app
+    
+    Args:
+        app (FastAPI): Application to instrument
+        review (bool): Whether the app serves the review routes, whose
+            counters are only imported and exposed when it does
+    """
+    app.add_middleware(MetricsMiddleware)
+    
+    if review:
+        register_review_collectors()
+    else:
+        register_collector("cache_stat", "Cache counters and sizes", _user_cache_samples)
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
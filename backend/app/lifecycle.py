@@ -0,0 +1,128 @@
+# backend/app/lifecycle.py
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+import asyncio
+import logging
+import os
+import time
+from fastapi import FastAPI
+from app.database import ensure_indexes
+from app.http_client import close_http_client
+from app.metrics import STARTUP_SECONDS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _process_age() -> float:
+    """Seconds since this process started, from /proc where available"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks since boot; the command name may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+# Monotonic time at which the process started, so milestones include interpreter and import time
+_process_started = time.monotonic() - _process_age()
+
+def seconds_since_start() -> float:
+    return time.monotonic() - _process_started
+
+def mark_startup(phase: str) -> float:
+    """Record how long after process start a startup milestone was reached"""
+    elapsed = seconds_since_start()
+    STARTUP_SECONDS.set(elapsed, phase=phase)
+    logger.info(f"Startup milestone '{phase}' reached after {elapsed:.2f}s")
+    return elapsed
+
+class Readiness:
+    """
+    Named startup checks that must pass before the process takes traffic
+    
+    Liveness only says the process is up; readiness waits for every
+    registered check (e.g. a warm analysis pool) so a load balancer
+    doesn't route requests to a pod that would answer them slowly.
+    """
+
+    def __init__(self):
+        self.checks: Dict[str, str] = {}
+
+    def expect(self, name: str) -> None:
+        self.checks[name] = "pending"
+
+    def passed(self, name: str) -> None:
+        self.checks[name] = "ok"
+        if self.ready:
+            mark_startup("ready")
+
+    def failed(self, name: str, error: str) -> None:
+        self.checks[name] = f"failed: {error}"
+
+    @property
+    def ready(self) -> bool:
+        return all(status == "ok" for status in self.checks.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {"status": "ready" if self.ready else "starting", "checks": dict(self.checks)}
+
+readiness = Readiness()
+
+async def _ensure_indexes_in_background() -> None:
+    # Indexes already exist on every start but the first, so don't hold up startup for them
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Could not ensure MongoDB indexes: {str(e)}")
+
+async def _warm_up_analysis_pool() -> None:
+    from app.ai.worker_pool import warm_up_pool
+    started = time.monotonic()
+    try:
+        await warm_up_pool()
+    except Exception as e:
+        logger.error(f"Analysis pool warm-up failed: {str(e)}")
+        readiness.failed("analysis_pool", str(e))
+        return
+    STARTUP_SECONDS.set(time.monotonic() - started, phase="pool_warm_up_duration")
+    readiness.passed("analysis_pool")
+
+def build_lifespan(routers: List[str]):
+    """
+    Create the lifespan handler for an app serving the given routers
+    
+    Startup only schedules work: index creation and, when the review
+    routes are served, the analysis pool warm-up run in the background,
+    so the process is live at once and turns ready when the pool is warm.
+    Review-only components are imported here rather than at module load,
+    so an auth-only process never loads them.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        mark_startup("lifespan_start")
+        background = [asyncio.ensure_future(_ensure_indexes_in_background())]
+        review = "review" in routers
+        if review:
+            from app.history import history_buffer
+            history_buffer.start()
+            readiness.expect("analysis_pool")
+            background.append(asyncio.ensure_future(_warm_up_analysis_pool()))
+        mark_startup("live")
+        if readiness.ready:
+            mark_startup("ready")
+        try:
+            yield
+        finally:
+            for task in background:
+                task.cancel()
+            if review:
+                from app.ai.worker_pool import shutdown_executor
+                from app.history import history_buffer
+                await history_buffer.stop()
+                shutdown_executor()
+            await close_http_client()
+
+    return lifespan
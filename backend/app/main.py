@@ -1,27 +1,25 @@
-from fastapi import FastAPI, HTTPException, Response
-from fastapi.security import OAuth2AuthorizationCodeBearer
-from fastapi.responses import RedirectResponse
-from fastapi import APIRouter
-
-import requests
-from app.config import AUTH0_DOMAIN, AUTH0_CLIENT_ID, AUTH0_CLIENT_SECRET, AUTH0_CALLBACK_URL
-from app.database import save_user
+from typing import List, Optional
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, review
-
-app = FastAPI(title="AI Code Review Platform")
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.security import OAuth2AuthorizationCodeBearer
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from app.lifecycle import build_lifespan, mark_startup, readiness
+from app.admission import BodySizeLimitMiddleware
+from app.config import (
+    AUTH0_DOMAIN,
+    ARCHIVE_MAX_UPLOAD_BYTES,
+    APP_ROUTERS,
+    RESPONSE_GZIP_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
 )
+from app.instrumentation import instrument_app
+import logging
 
-# Include routers from the auth and review modules
-app.include_router(auth.router, prefix="/auth", tags=["Auth"])
-app.include_router(review.router, prefix="/review", tags=["Review"])
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # OAuth2 scheme (if used elsewhere in your app)
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
@@ -29,77 +27,74 @@ oauth2_scheme = OAuth2AuthorizationCodeBearer(
     tokenUrl=f"https://{AUTH0_DOMAIN}/oauth/token"
 )
 
-@app.get("/")
-async def root():
-    return {"message": "Welcome to AI Code Review Platform"}
-
+def create_app(routers: Optional[List[str]] = None) -> FastAPI:
+    """
+    Build the FastAPI application
+    
+    Routers are imported only when served, so a process started with
+    APP_ROUTERS=auth never imports the analysis stack.
+    
+    Args:
+        routers (list): Routers to serve ("auth", "review"); defaults to APP_ROUTERS
+    
+    Returns:
+        FastAPI: The configured application
+    """
+    routers = APP_ROUTERS if routers is None else routers
+    review = "review" in routers
+    app = FastAPI(title="AI Code Review Platform", lifespan=build_lifespan(routers))
 
-router = APIRouter()
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-@router.get("/github")
-async def github_login():
-    auth_url = (
-        f"https://{AUTH0_DOMAIN}/authorize"
-        f"?client_id={AUTH0_CLIENT_ID}"
-        f"&response_type=code"
-        f"&redirect_uri={AUTH0_CALLBACK_URL}"
+    # Compress large responses; streamed frames must reach the client as they are sent
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=RESPONSE_GZIP_MIN_BYTES,
+        compresslevel=RESPONSE_GZIP_LEVEL,
+        exclude_content_types=("text/event-stream", "application/x-ndjson")
     )
-    return RedirectResponse(url=auth_url)
 
-# Endpoint to generate Auth0 authorization URL
-@app.get("/auth/callback")
-async def github_callback(code: str):
-    token_url = f"https://{AUTH0_DOMAIN}/oauth/token"
-    payload = {
-        "grant_type": "authorization_code",
-        "client_id": AUTH0_CLIENT_ID,
-        "client_secret": AUTH0_CLIENT_SECRET,
-        "code": code,
-        "redirect_uri": AUTH0_CALLBACK_URL,
-    }
-    
-    try:
-        response = requests.post(token_url, json=payload)
-        response.raise_for_status()  # Raise exception for HTTP errors
-        
-        token_data = response.json()
-        access_token = token_data.get("access_token")
-        if not access_token:
-            raise HTTPException(status_code=400, detail="Access token not found in the response.")
-        
-        user_info_url = f"https://{AUTH0_DOMAIN}/userinfo"
-        headers = {"Authorization": f"Bearer {access_token}"}
-        user_response = requests.get(user_info_url, headers=headers)
-        user_response.raise_for_status()  # Raise exception for HTTP errors
-        
-        user_info = user_response.json()
-        
-        # Store/Update user data in MongoDB using async function
-        user_data = {
-            "name": user_info.get("name"),
-            "email": user_info.get("email"),
-            "sub": user_info.get("sub"),
-            "picture": user_info.get("picture"),
-        }
-        
-        # Use the async save_user function from database.py
-        result = await save_user(user_data)
-        if result.get("is_new"):
-            print("Inserted new user:", user_data["email"])
-        else:
-            print("Updated existing user:", user_data["email"])
-        
-        # Set a cookie with user information (optional but useful)
-        frontend_url = "http://localhost:3000"
-        redirect_url = f"{frontend_url}?auth=success&token={access_token}"
-        
-        # Return a redirect response to the frontend
-        return RedirectResponse(url=redirect_url)
-        
-    except requests.exceptions.RequestException as e:
-        error_details = str(e)
-        print("Error in OAuth flow:", error_details)
-        raise HTTPException(status_code=500, detail=f"OAuth flow error: {error_details}")
-    except Exception as e:
-        print("Unexpected error during authentication:", str(e))
-        raise HTTPException(status_code=500, detail="Internal Server Error during authentication")
\ No newline at end of file
+    if review:
+        # Reject oversized review payloads before they are read
+        app.add_middleware(
+            BodySizeLimitMiddleware,
+            path_prefix="/review",
+            path_limits={"/review/analyze/archive": ARCHIVE_MAX_UPLOAD_BYTES}
+        )
+
+    # Request metrics and the Prometheus /metrics endpoint
+    instrument_app(app, review=review)
+
+    if "auth" in routers:
+        from app.routes import auth
+        app.include_router(auth.router, prefix="/auth", tags=["Auth"])
+    if review:
+        from app.routes import review as review_routes, live
+        app.include_router(review_routes.router, prefix="/review", tags=["Review"])
+        app.include_router(live.router, prefix="/review", tags=["Review"])
+
+    @app.get("/")
+    async def root():
+        return {"message": "Welcome to AI Code Review Platform"}
+
+    @app.get("/healthz", include_in_schema=False)
+    async def healthz():
+        """Liveness: the process is up and serving requests"""
+        return {"status": "ok"}
+
+    @app.get("/readyz", include_in_schema=False)
+    async def readyz():
+        """Readiness: every startup check passed, e.g. the analysis pool is warm"""
+        status = readiness.status()
+        return JSONResponse(status, status_code=200 if readiness.ready else 503)
+
+    mark_startup("app_created")
+    return app
+
+app = create_app()
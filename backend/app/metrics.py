@@ -0,0 +1,198 @@
+# backend/app/metrics.py
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import bisect
+import math
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond cache hits to minute-long analyses
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()
+            ]
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()
+            ]
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the enclosed block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            for key, entry in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(entry[-2])}")
+                lines.append(f"{self.name}_count{labels} {entry[-1]}")
+        return lines
+
+REGISTRY: List[_Metric] = []
+
+# Collectors by gauge name; called at scrape time and return (labels, value) samples
+_collectors: Dict[str, Tuple[str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = {}
+
+def register_collector(name: str, documentation: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+    """Expose a gauge whose samples are computed when /metrics is scraped; replaces one of the same name"""
+    _collectors[name] = (documentation, collect)
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for name, (documentation, collect) in _collectors.items():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in collect():
+            label_names = sorted(labels)
+            lines.append(f"{name}{_format_labels(label_names, [labels[n] for n in label_names])} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "HTTP request body size by route", ("method", "route"), buckets=SIZE_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+ANALYSIS_STAGE_DURATION = Histogram(
+    "analysis_stage_duration_seconds", "Time spent in each analysis stage", ("stage",)
+)
+ANALYSIS_LIMITS_EXCEEDED = Counter(
+    "analysis_limits_exceeded_total", "Analyses stopped for exceeding their time or memory budget", ("kind",)
+)
+ANALYSIS_POOL_RECYCLES = Counter(
+    "analysis_pool_recycles_total", "Times the analysis pool was replaced", ("reason",)
+)
+STARTUP_SECONDS = Gauge(
+    "app_startup_seconds", "Seconds from process start to each startup milestone", ("phase",)
+)
+OUTBOUND_DURATION = Histogram(
+    "outbound_request_duration_seconds", "Latency of calls to external services", ("target", "operation", "outcome")
+)
+
+@contextmanager
+def track_outbound(target: str, operation: str):
+    """Time a call to MongoDB, Auth0 or another external service"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        OUTBOUND_DURATION.observe(time.perf_counter() - started, target=target, operation=operation, outcome=outcome)
+
+def observe_stage_timings(timings: Optional[Dict[str, float]]) -> None:
+    """Record per-stage durations reported by an analysis worker"""
+    for stage, seconds in (timings or {}).items():
+        ANALYSIS_STAGE_DURATION.observe(seconds, stage=stage)
@@ -0,0 +1,171 @@
+# backend/app/response_encoding.py
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from typing import Any, Dict, List, Optional
+import json
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Top-level fields of a review, as built by format_review
+REVIEW_FIELDS = (
+    "prediction",
+    "overall_feedback",
+    "detailed_feedback",
+    "issues_count",
+    "syntax_errors",
+    "logic_errors",
+    "code_quality_issues",
+    "fix_suggestions",
+    "mode",
+    "limit_exceeded",
+)
+
+# Review fields holding lists of issues, replaced by indexes in the compact shape
+ISSUE_LIST_FIELDS = ("syntax_errors", "logic_errors", "code_quality_issues", "detailed_feedback")
+
+REVIEW_SHAPES = ("full", "compact")
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+class IssueTable:
+    """Distinct issues of one response, referenced by index from its reviews"""
+
+    def __init__(self):
+        self.issues: List[Any] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, issue: Any) -> int:
+        key = issue if isinstance(issue, str) else json.dumps(issue, sort_keys=True, default=str)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.issues)
+            self.issues.append(issue)
+        return index
+
+class ReviewView:
+    """
+    The parts of a review a client asked for, and in which shape
+    
+    With fields, only those review fields are returned. The compact
+    shape returns every issue once, in an "issues" list, and each issue
+    list of the review (detailed_feedback included, which otherwise
+    repeats the other three) as indexes into it. Entries that are not
+    reviews, such as batch errors, are left alone.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None, shape: str = "full"):
+        self.fields = fields
+        self.shape = shape
+
+    @property
+    def is_default(self) -> bool:
+        return self.fields is None and self.shape == "full"
+
+    def _select(self, review: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fields is None or "error" in review:
+            return review
+        return {field: review[field] for field in self.fields if field in review}
+
+    def _compact(self, review: Dict[str, Any], table: IssueTable) -> Dict[str, Any]:
+        if self.shape != "compact" or "error" in review:
+            return review
+        return {
+            field: [table.add(issue) for issue in value] if field in ISSUE_LIST_FIELDS else value
+            for field, value in review.items()
+        }
+
+    def review(self, review: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the view to one review"""
+        if self.is_default:
+            return review
+        table = IssueTable()
+        view = self._compact(self._select(review), table)
+        if self.shape == "compact":
+            view = dict(view, shape="compact", issues=table.issues)
+        return view
+
+    def reviews(self, reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply the view to the results of a batch
+        
+        In the compact shape all results share one issue list, so an
+        issue reported for many snippets is sent once.
+        
+        Returns:
+            dict: "results", plus "shape" and "issues" in the compact shape
+        """
+        if self.is_default:
+            return {"results": reviews}
+        table = IssueTable()
+        results = [self._compact(self._select(review), table) for review in reviews]
+        if self.shape == "compact":
+            return {"results": results, "shape": "compact", "issues": table.issues}
+        return {"results": results}
+
+def review_view(
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated review fields to return: {', '.join(REVIEW_FIELDS)}"
+    ),
+    shape: str = Query("full", description="'full', or 'compact' to list each issue once and reference it by index")
+) -> ReviewView:
+    """Dependency reading the fields and shape query parameters of a review route"""
+    selected = None
+    if fields:
+        selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+        unknown = [field for field in selected if field not in REVIEW_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown review fields: {', '.join(unknown)}. Use any of: {', '.join(REVIEW_FIELDS)}"
+            )
+    if shape not in REVIEW_SHAPES:
+        raise HTTPException(status_code=400, detail=f"Unknown shape '{shape}'. Use one of: {', '.join(REVIEW_SHAPES)}")
+    return ReviewView(selected, shape)
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True, default=str)
+
+# Whether the missing msgpack package was already reported
+_msgpack_warned = False
+
+def wants_msgpack(request: Request) -> bool:
+    """Whether the client asked for MessagePack in its Accept header"""
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+def encode_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Encode a response body as the client asked for
+    
+    MessagePack is used when the Accept header lists it and the msgpack
+    package is installed; otherwise the body is JSON. Large bodies are
+    gzip-compressed by the app's GZipMiddleware either way.
+    
+    Args:
+        request (Request): Incoming request, used for content negotiation
+        content: JSON-serializable body
+        status_code (int): Response status
+        
+    Returns:
+        Response: MessagePack or JSON response
+    """
+    global _msgpack_warned
+    if wants_msgpack(request):
+        if msgpack is not None:
+            return MsgPackResponse(content, status_code=status_code)
+        if not _msgpack_warned:
+            _msgpack_warned = True
+            logger.warning("MessagePack requested but msgpack is not installed; answering with JSON")
+    return JSONResponse(content, status_code=status_code)
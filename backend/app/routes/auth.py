@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Header
 from fastapi.responses import JSONResponse, RedirectResponse
-import requests
+import httpx
+import time
 from app.config import AUTH0_DOMAIN, AUTH0_CLIENT_ID, AUTH0_CLIENT_SECRET, AUTH0_CALLBACK_URL
 from app.database import save_user
+from app.http_client import get_http_client
+from app.metrics import track_outbound
+from app.security import cache_user_info, fetch_user_info
 from urllib.parse import urlencode
 
 router = APIRouter()
@@ -32,7 +36,9 @@ async def github_callback(code: str, request: Request):
     }
 
     try:
-        response = requests.post(token_url, json=payload)
+        client = get_http_client()
+        with track_outbound("auth0", "token"):
+            response = await client.post(token_url, json=payload)
         response.raise_for_status()
         
         token_data = response.json()
@@ -42,11 +48,16 @@ async def github_callback(code: str, request: Request):
         
         user_info_url = f"https://{AUTH0_DOMAIN}/userinfo"
         headers = {"Authorization": f"Bearer {access_token}"}
-        user_response = requests.get(user_info_url, headers=headers)
+        with track_outbound("auth0", "userinfo"):
+            user_response = await client.get(user_info_url, headers=headers)
         user_response.raise_for_status()
 
         user_info = user_response.json()
 
+        # The frontend asks for /auth/userinfo with this token right after the redirect
+        expires_in = token_data.get("expires_in")
+        cache_user_info(access_token, user_info, time.time() + expires_in if expires_in else None)
+
         user_data = {
             "name": user_info.get("name"),
             "email": user_info.get("email"),
@@ -71,7 +82,7 @@ async def github_callback(code: str, request: Request):
         # Return a redirect response to the frontend
         return RedirectResponse(url=f"{frontend_url}?{redirect_params}")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"OAuth flow error: {str(e)}")
     except KeyError as e:
         raise HTTPException(status_code=500, detail=f"Unexpected response structure: {str(e)}")
@@ -80,17 +91,14 @@ async def github_callback(code: str, request: Request):
 
 # Route to fetch user info
 @router.get("/userinfo")
-async def get_user_info(authorization: str):
+async def get_user_info(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid or missing authorization token")
     
     token = authorization.split(" ")[1]
     try:
-        user_info_url = f"https://{AUTH0_DOMAIN}/userinfo"
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(user_info_url, headers=headers)
-        response.raise_for_status()
-        
-        return response.json()
+        return await fetch_user_info(token)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving user info: {str(e)}")
\ No newline at end of file
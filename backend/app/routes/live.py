@@ -0,0 +1,186 @@
+# backend/app/routes/live.py
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Optional, Dict, Any
+from app.ai.pybughunt_integration import ANALYSIS_MODES, DEFAULT_ANALYSIS_MODE
+from app.ai.result_cache import analyze_code_cached
+from app.admission import AdmissionRejected, admission, code_limit_error
+from app.config import LIVE_DEBOUNCE_SECONDS, LIVE_MAX_DELAY_SECONDS
+from app.routes.review import format_review
+from app.security import get_optional_user_sub
+import asyncio
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Counters across all live sessions
+_live_stats = {"active_sessions": 0, "updates": 0, "analyses": 0, "cancelled": 0, "dropped": 0}
+
+class LiveReviewSession:
+    """
+    Review state of one editor connected over a WebSocket
+    
+    Only the newest document version is ever analyzed. Updates are
+    coalesced until the editor has been quiet for LIVE_DEBOUNCE_SECONDS,
+    or at most LIVE_MAX_DELAY_SECONDS after the first unanalyzed update,
+    so continuous typing still gets results. At most one analysis runs
+    per session: when a newer version arrives, an analysis still waiting
+    for admission is cancelled, and a running one finishes but its
+    stale result is dropped instead of sent.
+    """
+
+    def __init__(self, websocket: WebSocket, client: str):
+        self.websocket = websocket
+        self.client = client
+        self.latest_version = -1
+        self._pending: Optional[Dict[str, Any]] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._superseded = False
+        self._closed = False
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def submit(self, message: Dict[str, Any]) -> None:
+        """Accept an update message from the editor"""
+        version = message.get("version")
+        code = message.get("code")
+        mode = message.get("mode") or DEFAULT_ANALYSIS_MODE
+        if not isinstance(version, int) or not isinstance(code, str):
+            await self.send({"type": "error", "version": version, "detail": "Updates need an integer version and code"})
+            return
+        if version <= self.latest_version:
+            # Out-of-order or repeated update; a newer version is already known
+            return
+        if mode not in ANALYSIS_MODES:
+            await self.send({"type": "error", "version": version, "detail": f"Unknown analysis mode '{mode}'"})
+            return
+        error = code_limit_error(code)
+        if error:
+            await self.send({"type": "error", "version": version, "detail": error})
+            return
+
+        _live_stats["updates"] += 1
+        self.latest_version = version
+        self._pending = {"version": version, "code": code, "mode": mode}
+        self._changed.set()
+        if self._task is not None and not self._task.done() and not self._running:
+            # Still waiting for a slot: nothing was computed yet, so give up the wait
+            _live_stats["cancelled"] += 1
+            self._superseded = True
+            self._task.cancel()
+
+    async def run(self) -> None:
+        """Analyze the newest pending version whenever the editor pauses"""
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            await self._changed.wait()
+            first_seen = loop.time()
+            while True:
+                self._changed.clear()
+                timeout = min(LIVE_DEBOUNCE_SECONDS, first_seen + LIVE_MAX_DELAY_SECONDS - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            update, self._pending = self._pending, None
+            if update is None:
+                continue
+            self._task = asyncio.ensure_future(self._analyze(update))
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                # Superseded while queued: the newer version is already pending
+                if not self._superseded or self._closed:
+                    raise
+            finally:
+                self._running = False
+                self._superseded = False
+
+    def close(self) -> None:
+        """Stop analyzing; called when the editor disconnects"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _analyze(self, update: Dict[str, Any]) -> None:
+        version = update["version"]
+        try:
+            if update["mode"] == "fast":
+                self._running = True
+                analysis_result = await analyze_code_cached(update["code"], "fast")
+            else:
+                async with admission.slot(self.client):
+                    self._running = True
+                    analysis_result = await analyze_code_cached(update["code"], update["mode"])
+        except AdmissionRejected as e:
+            await self.send({"type": "busy", "version": version, "detail": e.reason, "retry_after": e.retry_after})
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Live code analysis error: {str(e)}")
+            await self.send({"type": "error", "version": version, "detail": f"Code analysis failed: {str(e)}"})
+            return
+
+        _live_stats["analyses"] += 1
+        if version != self.latest_version:
+            _live_stats["dropped"] += 1
+            return
+        await self.send({"type": "result", "version": version, "review": format_review(analysis_result)})
+
+def live_stats() -> Dict[str, int]:
+    """Counters for live review sessions"""
+    return dict(_live_stats)
+
+@router.websocket("/live")
+async def live_review(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Live review channel for an editor
+    
+    The editor sends {"type": "update", "version": n, "code": ..., "mode": ...}
+    whenever the document changes, with increasing versions. The server
+    answers with {"type": "result", "version": n, "review": {...}} for
+    the newest version once typing pauses; older versions are skipped.
+    "busy" (with retry_after) and "error" messages carry the version
+    they refer to. Browsers can't set headers on WebSockets, so an
+    access token may be passed as the token query parameter.
+    
+    Args:
+        websocket (WebSocket): Connection to the editor
+        token (str): Auth0 access token, if the user is logged in
+    """
+    # Like the other review routes, unverifiable tokens review anonymously
+    user_sub = await get_optional_user_sub(f"Bearer {token}") if token else None
+    await websocket.accept()
+
+    host = websocket.client.host if websocket.client else "unknown"
+    session = LiveReviewSession(websocket, f"sub:{user_sub}" if user_sub else f"ip:{host}")
+    runner = asyncio.ensure_future(session.run())
+    _live_stats["active_sessions"] += 1
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict) or message.get("type", "update") != "update":
+                await session.send({"type": "error", "detail": "Expected an update message"})
+                continue
+            await session.submit(message)
+    except WebSocketDisconnect:
+        pass
+    except ValueError:
+        # Not JSON; a protocol error ends the session
+        await websocket.close(code=1003)
+    finally:
+        _live_stats["active_sessions"] -= 1
+        session.close()
+        runner.cancel()
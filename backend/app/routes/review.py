@@ -1,8 +1,38 @@
 # backend/app/routes/review.py
-from fastapi import APIRouter, HTTPException, Request, Body
-from fastapi.responses import JSONResponse
-from typing import Optional, List
-from app.ai.pybughunt_integration import analyze_user_code
+from fastapi import APIRouter, HTTPException, Request, Body, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from bson import ObjectId
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from app.ai.result_cache import analyze_code_cached, cache_key, cache_stats
+from app.ai.staged_analysis import analyze_in_stages
+from app.ai.incremental import analyze_code_incremental
+from app.ai.archive import IN_FLIGHT_PER_WORKER, ArchiveError, analyze_archive
+from app.ai.pybughunt_integration import ANALYSIS_MODES, DEFAULT_ANALYSIS_MODE
+from app.admission import (
+    AdmissionLease,
+    AdmissionRejected,
+    admission,
+    check_code_limits,
+    client_key,
+    code_limit_error,
+    too_busy,
+)
+from app.config import (
+    ANALYSIS_BATCH_MAX_SNIPPETS,
+    ANALYSIS_WORKERS,
+    HISTORY_PAGE_MAX_SIZE,
+    JOB_MAX_WAIT_SECONDS,
+    JOB_WAIT_POLL_SECONDS,
+)
+from app.database import get_review_history, create_review_job, get_review_job
+from app.history import record_review, history_buffer
+from app.metrics import ANALYSIS_STAGE_DURATION
+from app.response_encoding import ReviewView, encode_response, review_view
+from app.security import get_optional_user_sub, get_current_user_sub
+from datetime import datetime
+import asyncio
+import json
 import logging
 
 # Set up logging
@@ -11,13 +41,203 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+UNSUPPORTED_LANGUAGE_RESPONSE = {
+    "prediction": 0.0,
+    "overall_feedback": "Unsupported language. Currently only Python is supported.",
+    "detailed_feedback": ["This tool currently only supports Python code analysis."],
+    "issues_count": 1,
+    "syntax_errors": [],
+    "logic_errors": [],
+    "code_quality_issues": []
+}
+
+def format_review(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the review response from raw analysis results
+    
+    Args:
+        analysis_result (dict): Results from analyze_user_code
+    
+    Returns:
+        dict: Review response with overall and detailed feedback
+    """
+    total_issues = len(analysis_result.get('syntax_errors', [])) + \
+                   len(analysis_result.get('logic_errors', [])) + \
+                   len(analysis_result.get('code_quality_issues', []))
+    
+    # Generate overall feedback based on issues found, and on the quality
+    # score unless the analysis has none (fast analyses skip the detector)
+    limit_exceeded = analysis_result.get('limit_exceeded')
+    scored = analysis_result.get('scored', True)
+    prediction = analysis_result.get('prediction', 0)
+    if limit_exceeded:
+        overall = f"{limit_exceeded['detail']}. Try splitting the code into smaller parts."
+    elif analysis_result.get('syntax_errors', []):
+        overall = "Syntax errors detected. Fix these issues before proceeding."
+    elif (scored and prediction < 0.4) or total_issues > 2:
+        overall = "Significant issues detected. Review recommended."
+    elif (scored and prediction < 0.7) or total_issues > 0:
+        overall = "Minor issues found. Consider the suggestions below."
+    else:
+        overall = "Code looks good! No major issues detected."
+    
+    # Combine all feedback into detailed_feedback
+    detailed_feedback = []
+    detailed_feedback.extend(analysis_result.get('syntax_errors', []))
+    detailed_feedback.extend(analysis_result.get('logic_errors', []))
+    detailed_feedback.extend(analysis_result.get('code_quality_issues', []))
+    
+    if limit_exceeded:
+        detailed_feedback.append(f"{limit_exceeded['detail']}; results are incomplete.")
+    elif not detailed_feedback:
+        detailed_feedback.append("No specific issues detected.")
+    
+    review = {
+        "prediction": analysis_result.get('prediction', 0.5),
+        "overall_feedback": overall,
+        "detailed_feedback": detailed_feedback,
+        "issues_count": total_issues,
+        "syntax_errors": analysis_result.get('syntax_errors', []),
+        "logic_errors": analysis_result.get('logic_errors', []),
+        "code_quality_issues": analysis_result.get('code_quality_issues', []),
+        "fix_suggestions": analysis_result.get('fix_suggestions', {}),
+        "mode": analysis_result.get('mode', DEFAULT_ANALYSIS_MODE)
+    }
+    if limit_exceeded:
+        review["limit_exceeded"] = limit_exceeded
+    return review
+
+def _snippet_type_error(code: Any, language: Any) -> Optional[str]:
+    """Why a snippet's code or language is rejected for its type, or None if both are strings"""
+    if not isinstance(code, str):
+        return "\"code\" must be a string"
+    if not isinstance(language, str):
+        return "\"language\" must be a string"
+    return None
+
+def _analysis_mode_error(mode: Any) -> Optional[str]:
+    """Why a requested analysis mode is rejected, or None if it is valid"""
+    if mode not in ANALYSIS_MODES:
+        return f"Unknown analysis mode '{mode}'. Use one of: {', '.join(ANALYSIS_MODES)}"
+    return None
+
+def _analysis_mode(data: dict, default: str = DEFAULT_ANALYSIS_MODE) -> str:
+    """Read and validate the requested analysis mode"""
+    mode = data.get('mode') or default
+    error = _analysis_mode_error(mode)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return mode
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+def _stream_media_type(request: Request) -> Optional[str]:
+    """Pick a streaming format from the Accept header, if the client asked for one"""
+    accept = request.headers.get("accept", "")
+    for media_type in (NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE):
+        if media_type in accept:
+            return media_type
+    return None
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response holding an admission lease until it ends
+    
+    The lease is released however the response ends, including when the
+    client disconnects before the body is iterated, which never runs the
+    body generator's cleanup.
+    """
+
+    def __init__(self, content: AsyncIterator[str], lease: Optional[AdmissionLease], media_type: str):
+        super().__init__(content, media_type=media_type)
+        self.lease = lease
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.lease is not None:
+                self.lease.release()
+
+def _encode_frame(media_type: str, event: str, payload: Dict[str, Any]) -> str:
+    if media_type == SSE_MEDIA_TYPE:
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"stage": event, **payload}) + "\n"
+
+async def _stream_review(
+    code_snippet: str,
+    mode: str,
+    media_type: str,
+    user_sub: Optional[str],
+    lease: Optional[AdmissionLease],
+    view: ReviewView
+) -> AsyncIterator[str]:
+    """
+    Encode each analysis stage as a frame, ending with the full review
+    
+    The caller takes the admission lease before the response starts; it
+    is released as soon as the analysis ends, and otherwise by
+    AdmittedStreamingResponse.
+    """
+    try:
+        async for stage, payload in analyze_in_stages(code_snippet, mode):
+            if stage == "complete":
+                payload = format_review(payload)
+                if user_sub:
+                    record_review(user_sub, code_snippet, cache_key(code_snippet), "python", payload)
+                payload = view.review(payload)
+            yield _encode_frame(media_type, stage, payload)
+    except Exception as e:
+        logger.error(f"Code analysis error: {str(e)}")
+        yield _encode_frame(media_type, "error", {"detail": f"Code analysis failed: {str(e)}"})
+    finally:
+        if lease is not None:
+            lease.release()
+
 @router.post("/analyze")
-async def review_code(data: dict = Body(...)):
+async def review_code(
+    request: Request,
+    data: dict = Body(...),
+    user_sub: Optional[str] = Depends(get_optional_user_sub),
+    view: ReviewView = Depends(review_view)
+):
     """
     Analyze the submitted code snippet using PyBugHunt for Python code
     
+    Clients that send "Accept: application/x-ndjson" or
+    "Accept: text/event-stream" receive one frame per analysis stage
+    (syntax, logic, quality, fixes) as soon as it is ready, followed by a
+    "complete" frame holding the usual response.
+    
+    "mode" picks the analysis depth: "fast" (parse and rule checks
+    only, meant for checking on every keystroke), "standard" (the
+    default) or "deep" (adds the model-backed detector, e.g. on save).
+    Code that doesn't parse only gets its syntax errors reported, in
+    any mode.
+    
+    With "incremental": true, the snippet is analyzed per top-level
+    definition and only definitions that changed since earlier
+    submissions are re-analyzed.
+    
+    Reviews by logged-in users are added to their history in the
+    background.
+    
+    Analyses other than "fast" ones go through admission control: when
+    the service or the caller is saturated the request gets a 429 with a
+    Retry-After header. Snippets over the size or line limits get a 413.
+    
+    The fields query parameter limits the response to the listed review
+    fields, and shape=compact lists each issue once under "issues" with
+    the issue lists holding indexes into it. Clients that accept
+    application/msgpack get MessagePack instead of JSON, and large
+    responses are gzip-compressed for clients that accept it.
+    
     Args:
+        request (Request): Incoming request, used for content negotiation
         data (dict): A dictionary containing the code snippet and language
+        user_sub (str): Auth0 sub of the caller, if authenticated
+        view (ReviewView): Requested fields and shape of the review
     
     Returns:
         dict: Code analysis results
@@ -28,57 +248,380 @@ async def review_code(data: dict = Body(...)):
         
         if not code_snippet:
             raise HTTPException(status_code=400, detail="No code snippet provided")
+        type_error = _snippet_type_error(code_snippet, language)
+        if type_error:
+            raise HTTPException(status_code=400, detail=type_error)
+        check_code_limits(code_snippet)
+        mode = _analysis_mode(data)
         
         # Only analyze Python code
         if language.lower() != 'python':
-            return {
-                "prediction": 0.0,
-                "overall_feedback": "Unsupported language. Currently only Python is supported.",
-                "detailed_feedback": ["This tool currently only supports Python code analysis."],
-                "issues_count": 1,
-                "syntax_errors": [],
-                "logic_errors": [],
-                "code_quality_issues": []
-            }
+            return encode_response(request, view.review(dict(UNSUPPORTED_LANGUAGE_RESPONSE)))
         
-        # Analyze using PyBugHunt
-        analysis_result = analyze_user_code(code_snippet)
+        # Fast analyses take milliseconds and run in a thread, never on the worker pool,
+        # so they skip admission control
+        client = client_key(request, user_sub) if mode != "fast" else None
         
-        # Format response
-        total_issues = len(analysis_result.get('syntax_errors', [])) + \
-                       len(analysis_result.get('logic_errors', [])) + \
-                       len(analysis_result.get('code_quality_issues', []))
+        media_type = _stream_media_type(request)
+        if media_type:
+            lease = await admission.lease(client) if client is not None else None
+            return AdmittedStreamingResponse(
+                _stream_review(code_snippet, mode, media_type, user_sub, lease, view),
+                lease,
+                media_type=media_type
+            )
         
-        # Generate overall feedback based on issues found
-        if analysis_result.get('syntax_errors', []):
-            overall = "Syntax errors detected. Fix these issues before proceeding."
-        elif analysis_result.get('prediction', 0) < 0.4 or total_issues > 2:
-            overall = "Significant issues detected. Review recommended."
-        elif analysis_result.get('prediction', 0) < 0.7 or total_issues > 0:
-            overall = "Minor issues found. Consider the suggestions below."
+        # Analyze using PyBugHunt in the worker pool, unless already cached
+        if client is None:
+            analysis_result = await analyze_code_cached(code_snippet, mode)
         else:
-            overall = "Code looks good! No major issues detected."
-        
-        # Combine all feedback into detailed_feedback
-        detailed_feedback = []
-        detailed_feedback.extend(analysis_result.get('syntax_errors', []))
-        detailed_feedback.extend(analysis_result.get('logic_errors', []))
-        detailed_feedback.extend(analysis_result.get('code_quality_issues', []))
+            async with admission.slot(client):
+                if data.get('incremental'):
+                    analysis_result = await analyze_code_incremental(code_snippet, mode)
+                else:
+                    analysis_result = await analyze_code_cached(code_snippet, mode)
         
-        if not detailed_feedback:
-            detailed_feedback.append("No specific issues detected.")
-        
-        return {
-            "prediction": analysis_result.get('prediction', 0.5),
-            "overall_feedback": overall,
-            "detailed_feedback": detailed_feedback,
-            "issues_count": total_issues,
-            "syntax_errors": analysis_result.get('syntax_errors', []),
-            "logic_errors": analysis_result.get('logic_errors', []),
-            "code_quality_issues": analysis_result.get('code_quality_issues', []),
-            "fix_suggestions": analysis_result.get('fix_suggestions', {})
-        }
+        with ANALYSIS_STAGE_DURATION.time(stage="format"):
+            review = format_review(analysis_result)
+        if user_sub:
+            record_review(user_sub, code_snippet, cache_key(code_snippet), language, review)
+        return encode_response(request, view.review(review))
     
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise too_busy(e)
     except Exception as e:
         logger.error(f"Code analysis error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Code analysis failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Code analysis failed: {str(e)}")
+
+async def _stream_archive_review(
+    archive: AsyncIterator[Tuple[str, Dict[str, Any]]],
+    media_type: str,
+    lease: AdmissionLease
+) -> AsyncIterator[str]:
+    """Encode archive results as frames; releases the admission lease when done"""
+    try:
+        async for stage, payload in archive:
+            yield _encode_frame(media_type, stage, payload)
+    except Exception as e:
+        logger.error(f"Archive analysis error: {str(e)}")
+        yield _encode_frame(media_type, "error", {"detail": f"Archive analysis failed: {str(e)}"})
+    finally:
+        await archive.aclose()
+        lease.release()
+
+@router.post("/analyze/archive")
+async def review_archive(
+    request: Request,
+    mode: str = Query(DEFAULT_ANALYSIS_MODE),
+    user_sub: Optional[str] = Depends(get_optional_user_sub)
+):
+    """
+    Review every Python file of a project archive
+    
+    The request body is a zip file or a tarball (plain, gzip, bzip2 or
+    xz). Files are decompressed one at a time in memory, and
+    non-Python files and vendored directories (virtualenvs,
+    site-packages, node_modules, build output, ...) are skipped. Files
+    are analyzed in parallel across the worker pool.
+    
+    Clients that send "Accept: application/x-ndjson" or
+    "Accept: text/event-stream" get a "file" frame as each file finishes
+    and a "skipped" frame for each file that was not analyzed, then a
+    "complete" frame with the repository report. Other clients get the
+    report alone, as JSON or, if accepted, MessagePack. The archive
+    takes one admission slot, plus any free ones up to the caller's
+    share, and analyzes as many files at once as it holds slots.
+    
+    Args:
+        request (Request): Incoming request holding the archive
+        mode (str): Analysis mode for every file
+        user_sub (str): Auth0 sub of the caller, if authenticated
+    
+    Returns:
+        dict: Repository report with a line-weighted score and per-file results
+    """
+    mode = _analysis_mode({"mode": mode})
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="No archive provided")
+    
+    try:
+        lease = await admission.lease(client_key(request, user_sub), ANALYSIS_WORKERS * IN_FLIGHT_PER_WORKER)
+    except AdmissionRejected as e:
+        raise too_busy(e)
+    
+    archive = analyze_archive(data, format_review, mode, max_in_flight=lease.slots)
+    try:
+        # Reading the first entry validates the archive before a response starts
+        first = await archive.__anext__()
+    except ArchiveError as e:
+        await archive.aclose()
+        lease.release()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await archive.aclose()
+        lease.release()
+        raise
+    
+    async def frames() -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        try:
+            yield first
+            async for item in archive:
+                yield item
+        finally:
+            await archive.aclose()
+    
+    media_type = _stream_media_type(request)
+    if media_type:
+        return AdmittedStreamingResponse(
+            _stream_archive_review(frames(), media_type, lease),
+            lease,
+            media_type=media_type
+        )
+    
+    try:
+        async for stage, payload in frames():
+            if stage == "complete":
+                return encode_response(request, payload)
+    except Exception as e:
+        logger.error(f"Archive analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Archive analysis failed: {str(e)}")
+    finally:
+        lease.release()
+
+@router.post("/analyze/batch")
+async def review_code_batch(
+    request: Request,
+    data: dict = Body(...),
+    user_sub: Optional[str] = Depends(get_optional_user_sub),
+    view: ReviewView = Depends(review_view)
+):
+    """
+    Analyze many code snippets in one request
+    
+    Identical snippets are analyzed once and all unique snippets run
+    concurrently in the worker pool. A failing snippet produces an error
+    entry at its position instead of failing the whole batch, as does a
+    snippet whose code or language is not a string, that is over the
+    size or line limits, or that asks for an unknown mode.
+    The batch takes one admission slot, so a saturated service answers
+    with a 429, plus any free ones up to the caller's share, and runs as
+    many analyses at once as it holds slots.
+    
+    fields, shape and the Accept header work as for POST /review/analyze;
+    in the compact shape all results share one "issues" list.
+    
+    Args:
+        request (Request): Incoming request
+        data (dict): A dictionary with a "snippets" list of {"code", "language", "mode"}
+            items and an optional default "mode" for all of them
+        user_sub (str): Auth0 sub of the caller, if authenticated
+        view (ReviewView): Requested fields and shape of each review
+    
+    Returns:
+        dict: One result per snippet, in request order
+    """
+    snippets = data.get('snippets')
+    if not isinstance(snippets, list) or not snippets:
+        raise HTTPException(status_code=400, detail="No code snippets provided")
+    if len(snippets) > ANALYSIS_BATCH_MAX_SNIPPETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many snippets: at most {ANALYSIS_BATCH_MAX_SNIPPETS} per batch"
+        )
+    batch_mode = _analysis_mode(data)
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(snippets)
+    # Cache key -> (code, mode, positions sharing that code and mode)
+    unique: Dict[str, tuple] = {}
+    
+    for index, item in enumerate(snippets):
+        code_snippet = item.get('code', '') if isinstance(item, dict) else ''
+        language = item.get('language', 'python') if isinstance(item, dict) else 'python'
+        mode = (item.get('mode') if isinstance(item, dict) else None) or batch_mode
+        type_error = _snippet_type_error(code_snippet, language)
+        limit_error = code_limit_error(code_snippet) if code_snippet and not type_error else None
+        mode_error = _analysis_mode_error(mode)
+        
+        if not code_snippet:
+            results[index] = {"error": "No code snippet provided"}
+        elif type_error:
+            results[index] = {"error": type_error}
+        elif limit_error:
+            results[index] = {"error": limit_error}
+        elif mode_error:
+            results[index] = {"error": mode_error}
+        elif language.lower() != 'python':
+            results[index] = dict(UNSUPPORTED_LANGUAGE_RESPONSE)
+        else:
+            key = cache_key(code_snippet, variant=mode)
+            unique.setdefault(key, (code_snippet, mode, []))[2].append(index)
+    
+    try:
+        async with admission.slot(client_key(request, user_sub), len(unique)) as lease:
+            fan_out = asyncio.Semaphore(lease.slots)
+            
+            async def analyze(code: str, mode: str) -> Dict[str, Any]:
+                async with fan_out:
+                    return await analyze_code_cached(code, mode)
+            
+            analyses = await asyncio.gather(
+                *[analyze(code, mode) for code, mode, _ in unique.values()],
+                return_exceptions=True
+            )
+    except AdmissionRejected as e:
+        raise too_busy(e)
+    
+    for (_, _, positions), analysis_result in zip(unique.values(), analyses):
+        if isinstance(analysis_result, BaseException):
+            logger.error(f"Batch code analysis error: {str(analysis_result)}")
+            item_result = {"error": f"Code analysis failed: {str(analysis_result)}"}
+        else:
+            item_result = format_review(analysis_result)
+        for index in positions:
+            results[index] = item_result
+    
+    return encode_response(request, {
+        **view.reviews(results),
+        "count": len(results),
+        "unique_count": len(unique)
+    })
+
+# Job states after which a job no longer changes
+FINISHED_JOB_STATES = ("done", "failed")
+
+def _job_response(job: Dict[str, Any], view: ReviewView) -> Dict[str, Any]:
+    response = {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "done":
+        response["result"] = view.review(job["result"])
+    elif job.get("error"):
+        response["error"] = job["error"]
+    return response
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    data: dict = Body(...),
+    user_sub: Optional[str] = Depends(get_optional_user_sub)
+):
+    """
+    Queue an analysis and return its job id right away
+    
+    Takes the same body as POST /review/analyze. The job is stored in
+    MongoDB and run by a `python -m app.worker` process; fetch the
+    result with GET /review/jobs/{job_id}. Use this for code that may
+    take longer to analyze than the load balancer lets a request run.
+    
+    Args:
+        data (dict): A dictionary containing the code snippet, language,
+            mode and incremental flag
+        user_sub (str): Auth0 sub of the caller, if authenticated
+    
+    Returns:
+        dict: Job id and status
+    """
+    code_snippet = data.get('code', '')
+    language = data.get('language', 'python')
+    if not code_snippet:
+        raise HTTPException(status_code=400, detail="No code snippet provided")
+    type_error = _snippet_type_error(code_snippet, language)
+    if type_error:
+        raise HTTPException(status_code=400, detail=type_error)
+    check_code_limits(code_snippet)
+    if language.lower() != 'python':
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_LANGUAGE_RESPONSE["overall_feedback"])
+    
+    job_id = await create_review_job(user_sub, {
+        "code": code_snippet,
+        "language": language,
+        "mode": _analysis_mode(data),
+        "incremental": bool(data.get('incremental')),
+    })
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    request: Request,
+    job_id: str,
+    wait: float = Query(0, ge=0, le=JOB_MAX_WAIT_SECONDS),
+    user_sub: Optional[str] = Depends(get_optional_user_sub),
+    view: ReviewView = Depends(review_view)
+):
+    """
+    Get a job's status, and its review once it is done
+    
+    With wait > 0 the request long-polls: it returns as soon as the job
+    finishes, or with the current status after wait seconds. fields,
+    shape and the Accept header apply to the review as for
+    POST /review/analyze.
+    
+    Args:
+        request (Request): Incoming request, used for content negotiation
+        job_id (str): Id returned by POST /review/jobs
+        wait (float): Seconds to wait for the job to finish
+        user_sub (str): Auth0 sub of the caller, if authenticated
+        view (ReviewView): Requested fields and shape of the review
+    
+    Returns:
+        dict: Job status, plus "result" when done or "error" when failed
+    """
+    deadline = asyncio.get_running_loop().time() + wait
+    while True:
+        job = await get_review_job(job_id)
+        # Jobs of logged-in users are only visible to them
+        if job is None or (job.get("sub") and job["sub"] != user_sub):
+            raise HTTPException(status_code=404, detail="Job not found")
+        remaining = deadline - asyncio.get_running_loop().time()
+        if job["status"] in FINISHED_JOB_STATES or remaining <= 0:
+            return encode_response(request, jsonable_encoder(_job_response(job, view)))
+        await asyncio.sleep(min(JOB_WAIT_POLL_SECONDS, remaining))
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the analysis result cache"""
+    return cache_stats()
+
+@router.get("/history")
+async def get_history(
+    limit: int = Query(20, ge=1, le=HISTORY_PAGE_MAX_SIZE),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+    user_sub: str = Depends(get_current_user_sub)
+):
+    """
+    Page through the caller's past reviews, newest first
+    
+    Args:
+        limit (int): Page size
+        before (datetime): Only return reviews older than this; pass the
+            previous page's next_before to get the next page
+        before_id (str): Pass the previous page's next_before_id along
+            with next_before, so reviews sharing its timestamp aren't skipped
+        user_sub (str): Auth0 sub of the caller
+    
+    Returns:
+        dict: Reviews and the cursor for the next page
+    """
+    if before_id is not None and (before is None or not ObjectId.is_valid(before_id)):
+        raise HTTPException(status_code=400, detail="before_id must be a review id given together with before")
+    items = await get_review_history(user_sub, limit, before, ObjectId(before_id) if before_id else None)
+    for item in items:
+        item["_id"] = str(item["_id"])
+    last = items[-1] if len(items) == limit else None
+    return {
+        "items": items,
+        "next_before": last["created_at"] if last else None,
+        "next_before_id": last["_id"] if last else None,
+    }
+
+@router.get("/history/stats")
+async def get_history_stats():
+    """Counters for the review history write-behind buffer"""
+    return history_buffer.stats()
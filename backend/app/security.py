@@ -0,0 +1,185 @@
+# backend/app/security.py
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import logging
+import time
+import jwt
+from fastapi import HTTPException, Header
+from app.cache import LRUCache
+from app.config import (
+    AUTH0_DOMAIN,
+    AUTH0_AUDIENCE,
+    AUTH0_JWKS_REFRESH_SECONDS,
+    USERINFO_CACHE_TTL_SECONDS,
+    USERINFO_NEGATIVE_CACHE_TTL_SECONDS,
+)
+from app.database import get_user_by_sub
+from app.http_client import get_http_client
+from app.metrics import track_outbound
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Signing keys by key id, refreshed periodically and when an unknown kid shows up
+_jwks: Dict[str, Any] = {}
+_jwks_fetched_at = 0.0
+_jwks_lock = asyncio.Lock()
+# Don't hammer Auth0 when tokens carry unknown key ids
+JWKS_MIN_REFRESH_SECONDS = 60
+
+# Userinfo responses keyed by token hash
+_userinfo_cache = LRUCache(max_entries=10000, ttl_seconds=USERINFO_CACHE_TTL_SECONDS)
+
+# Hashes of tokens that couldn't be resolved, so they don't cost a /userinfo call per request
+_unresolved_tokens = LRUCache(max_entries=10000, ttl_seconds=USERINFO_NEGATIVE_CACHE_TTL_SECONDS)
+
+def userinfo_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the userinfo cache"""
+    return _userinfo_cache.stats()
+
+def token_hash(token: str) -> str:
+    """Cache key for a token that doesn't keep the token itself in memory"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+async def _refresh_jwks(force: bool = False) -> None:
+    global _jwks, _jwks_fetched_at
+    async with _jwks_lock:
+        age = time.monotonic() - _jwks_fetched_at
+        if age < JWKS_MIN_REFRESH_SECONDS or (not force and age < AUTH0_JWKS_REFRESH_SECONDS):
+            return
+        with track_outbound("auth0", "jwks"):
+            response = await get_http_client().get(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
+        response.raise_for_status()
+        _jwks = {
+            key["kid"]: jwt.PyJWK(key).key
+            for key in response.json().get("keys", [])
+            if key.get("kid")
+        }
+        _jwks_fetched_at = time.monotonic()
+        logger.debug(f"Loaded {len(_jwks)} signing keys from Auth0")
+
+async def _signing_key(kid: str):
+    await _refresh_jwks()
+    if kid not in _jwks:
+        await _refresh_jwks(force=True)
+    return _jwks.get(kid)
+
+async def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify an Auth0 access token locally against the cached JWKS
+    
+    Args:
+        token (str): Bearer token
+        
+    Returns:
+        dict: Token claims, or None if the token is not a verifiable JWT
+        (e.g. an opaque token issued without an API audience)
+        
+    Raises:
+        HTTPException: 401 if the token is a JWT that fails verification
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError:
+        return None
+    if header.get("alg") != "RS256" or not header.get("kid"):
+        return None
+
+    key = await _signing_key(header["kid"])
+    if key is None:
+        raise HTTPException(status_code=401, detail="Unknown token signing key")
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=AUTH0_AUDIENCE,
+            issuer=f"https://{AUTH0_DOMAIN}/",
+            options={"verify_aud": AUTH0_AUDIENCE is not None}
+        )
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+
+def cache_user_info(token: str, user_info: Dict[str, Any], expires_at: Optional[float] = None) -> None:
+    """Remember the profile for a token, never past the token's own expiry"""
+    ttl = USERINFO_CACHE_TTL_SECONDS
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        _userinfo_cache.set(token_hash(token), user_info, ttl_seconds=ttl)
+        _unresolved_tokens.delete(token_hash(token))
+
+async def fetch_user_info(token: str) -> Dict[str, Any]:
+    """
+    Resolve the profile for an access token
+    
+    Cached profiles are served first. Tokens that verify locally are
+    resolved from the stored user record, and Auth0's /userinfo is only
+    called when neither is available.
+    
+    Args:
+        token (str): Bearer token
+        
+    Returns:
+        dict: User profile
+    """
+    key = token_hash(token)
+    cached = _userinfo_cache.get(key)
+    if cached is not None:
+        return cached
+
+    claims = await verify_access_token(token)
+    expires_at = claims.get("exp") if claims else None
+    if claims and claims.get("sub"):
+        user = await get_user_by_sub(claims["sub"])
+        if user:
+            user_info = {k: v for k, v in user.items() if k != "_id"}
+            cache_user_info(token, user_info, expires_at)
+            return user_info
+
+    with track_outbound("auth0", "userinfo"):
+        response = await get_http_client().get(
+            f"https://{AUTH0_DOMAIN}/userinfo",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+    response.raise_for_status()
+    user_info = response.json()
+    cache_user_info(token, user_info, expires_at)
+    return user_info
+
+async def get_optional_user_sub(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """
+    Dependency resolving the Auth0 sub of the caller, if any
+    
+    Anonymous callers and tokens that can't be resolved yield None, so
+    routes that work without login are not failed by auth problems.
+    Unresolved tokens are remembered for USERINFO_NEGATIVE_CACHE_TTL_SECONDS,
+    so a client resending a bad token doesn't cost a call to Auth0 on
+    every request.
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    token = authorization.split(" ")[1]
+    key = token_hash(token)
+    if _unresolved_tokens.get(key) is not None:
+        return None
+    try:
+        claims = await verify_access_token(token)
+        if claims and claims.get("sub"):
+            return claims["sub"]
+        sub = (await fetch_user_info(token)).get("sub")
+    except Exception as e:
+        logger.debug(f"Ignoring unresolved authorization: {str(e)}")
+        sub = None
+    if sub is None and USERINFO_NEGATIVE_CACHE_TTL_SECONDS > 0:
+        _unresolved_tokens.set(key, True)
+    return sub
+
+async def get_current_user_sub(authorization: Optional[str] = Header(None)) -> str:
+    """Dependency requiring an authenticated caller"""
+    sub = await get_optional_user_sub(authorization)
+    if sub is None:
+        raise HTTPException(status_code=401, detail="Invalid or missing authorization token")
+    return sub
@@ -0,0 +1,160 @@
+# backend/app/worker.py
+from typing import Any, Dict
+import asyncio
+import logging
+import os
+import signal
+import socket
+from app.ai.incremental import analyze_code_incremental
+from app.ai.result_cache import analyze_code_cached, cache_key
+from app.ai.worker_pool import warm_up_pool, shutdown_executor
+from app.config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_WORKER_CONCURRENCY,
+    JOB_IDLE_POLL_SECONDS,
+)
+from app.database import (
+    ensure_indexes,
+    claim_review_job,
+    renew_review_job_lease,
+    finish_review_job,
+    fail_abandoned_review_jobs,
+)
+from app.history import history_buffer, record_review
+from app.http_client import close_http_client
+from app.routes.review import format_review
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def analyze_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the analysis a job asks for
+    
+    Args:
+        job (dict): Claimed job document
+    
+    Returns:
+        dict: Review response, same shape as POST /review/analyze
+    """
+    request = job["request"]
+    code = request["code"]
+    if request.get("incremental"):
+        analysis_result = await analyze_code_incremental(code, request["mode"])
+    else:
+        analysis_result = await analyze_code_cached(code, request["mode"])
+    review = format_review(analysis_result)
+    if job.get("sub"):
+        record_review(job["sub"], code, cache_key(code), request["language"], review)
+    return review
+
+async def _keep_lease(job_id: str, worker_id: str, task: asyncio.Task) -> None:
+    """Renew the job's lease while it runs; cancel the job if the lease is lost"""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            held = await renew_review_job_lease(job_id, worker_id, JOB_LEASE_SECONDS)
+        except Exception as e:
+            # Keep going; the lease only runs out if renewals keep failing
+            logger.warning(f"Could not renew lease of job {job_id}: {str(e)}")
+            continue
+        if not held:
+            logger.warning(f"Lost lease of job {job_id}, abandoning it")
+            task.cancel()
+            return
+
+async def run_job(job: Dict[str, Any], worker_id: str) -> None:
+    """Analyze a claimed job and store its outcome"""
+    job_id = job["_id"]
+    task = asyncio.ensure_future(analyze_job(job))
+    keeper = asyncio.ensure_future(_keep_lease(job_id, worker_id, task))
+    try:
+        review = await task
+    except asyncio.CancelledError:
+        if keeper.done() and not keeper.cancelled():
+            # Lost the lease: another worker owns the job now
+            return
+        raise
+    except Exception as e:
+        retry = job["attempts"] < JOB_MAX_ATTEMPTS
+        logger.error(f"Job {job_id} failed on attempt {job['attempts']}: {str(e)}")
+        await finish_review_job(job_id, worker_id, error=f"Code analysis failed: {str(e)}", retry=retry)
+        return
+    finally:
+        keeper.cancel()
+
+    if not await finish_review_job(job_id, worker_id, result=review):
+        logger.warning(f"Job {job_id} finished after its lease was lost; result discarded")
+
+async def job_loop(worker_id: str, stopping: asyncio.Event) -> None:
+    """Claim and run jobs one at a time until stopping is set"""
+    while not stopping.is_set():
+        try:
+            job = await claim_review_job(worker_id, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS)
+        except Exception as e:
+            logger.error(f"Could not claim a job: {str(e)}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(stopping.wait(), JOB_IDLE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        logger.info(f"{worker_id} running job {job['_id']} (attempt {job['attempts']})")
+        try:
+            await run_job(job, worker_id)
+        except Exception as e:
+            # Most likely MongoDB is unreachable; the lease expires and the job is retried
+            logger.error(f"Could not record outcome of job {job['_id']}: {str(e)}")
+
+async def sweep_abandoned_jobs(stopping: asyncio.Event) -> None:
+    """Periodically fail jobs that used up their attempts"""
+    while not stopping.is_set():
+        try:
+            failed = await fail_abandoned_review_jobs(JOB_MAX_ATTEMPTS)
+            if failed:
+                logger.warning(f"Failed {failed} abandoned jobs")
+        except Exception as e:
+            logger.error(f"Abandoned job sweep failed: {str(e)}")
+        try:
+            await asyncio.wait_for(stopping.wait(), JOB_LEASE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def main() -> None:
+    """
+    Work the review job queue until SIGINT or SIGTERM
+    
+    Runs JOB_WORKER_CONCURRENCY job loops sharing one analysis pool.
+    On shutdown, running jobs are finished before exiting; jobs of a
+    worker that dies are claimed again once their lease expires.
+    """
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Could not ensure MongoDB indexes: {str(e)}")
+    history_buffer.start()
+    await warm_up_pool()
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Review worker {prefix} started with {JOB_WORKER_CONCURRENCY} job loops")
+    try:
+        await asyncio.gather(
+            sweep_abandoned_jobs(stopping),
+            *[job_loop(f"{prefix}:{i}", stopping) for i in range(JOB_WORKER_CONCURRENCY)]
+        )
+    finally:
+        await history_buffer.stop()
+        shutdown_executor()
+        await close_http_client()
+        logger.info(f"Review worker {prefix} stopped")
+
+if __name__ == "__main__":
+    asyncio.run(main())
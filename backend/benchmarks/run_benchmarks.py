@@ -0,0 +1,242 @@
+# backend/benchmarks/run_benchmarks.py
+"""
+Offline throughput and latency benchmarks
+
+Run from the backend directory:
+
+    python -m benchmarks.run_benchmarks review --requests 500 --concurrency 16 --output review.json
+    python -m benchmarks.run_benchmarks preprocess --problems 50 --output preprocess.json
+    python -m benchmarks.run_benchmarks compare baseline.json review.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# The review benchmark runs the app in-process with no database behind it
+os.environ.setdefault("DATABASE_NAME", "benchmark")
+os.environ.setdefault("USE_LOCAL_DB", "true")
+os.environ.setdefault("ANALYSIS_CACHE_PERSISTENT", "false")
+
+from benchmarks.synthetic import generate_corpus, generate_codenet_tree
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    values = sorted(latencies_ms)
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "max": values[-1] if values else 0.0,
+    }
+
+def environment() -> Dict[str, Any]:
+    """Where and on what revision the benchmark ran"""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        revision = None
+    return {
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+async def bench_review(args) -> Dict[str, Any]:
+    """Load-test /review/analyze in-process at a fixed concurrency"""
+    import httpx
+    from app.main import app
+    from app.ai.worker_pool import warm_up_pool
+    
+    corpus = generate_corpus(args.corpus_size, defect_rate=args.defect_rate, seed=args.seed)
+    # Unless measuring cache hits, make every request's code unique
+    payloads = [
+        {"code": corpus[i % len(corpus)] + ("" if args.allow_cache_hits else f"\n# request {i}\n")}
+        for i in range(args.requests)
+    ]
+    await warm_up_pool()
+    
+    latencies: List[float] = []
+    errors = 0
+    rejected = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    
+    async def worker(number: int):
+        nonlocal errors, rejected
+        # Each worker is a separate client, so the per-user admission limit
+        # doesn't turn the benchmark's own concurrency into 429s
+        transport = httpx.ASGITransport(app=app, client=(f"10.0.{number // 256}.{number % 256}", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            while not queue.empty():
+                payload = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.post("/review/analyze", json=payload)
+                if response.status_code == 429:
+                    # Turned away by admission control; its latency isn't an analysis
+                    rejected += 1
+                elif response.status_code != 200:
+                    errors += 1
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(number) for number in range(args.concurrency)])
+    elapsed = time.perf_counter() - started
+    
+    return {
+        "benchmark": "review",
+        "params": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "corpus_size": args.corpus_size,
+            "defect_rate": args.defect_rate,
+            "allow_cache_hits": args.allow_cache_hits,
+            "seed": args.seed,
+        },
+        "latency_ms": latency_summary(latencies),
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "rejected": rejected,
+        "elapsed_seconds": elapsed,
+    }
+
+def bench_preprocess(args) -> Dict[str, Any]:
+    """
+    Time extract_python_files and prepare_dataset over a synthetic CodeNet tree,
+    for both an in-memory DataFrame and a packed corpus
+    """
+    from model_training.corpus_store import CorpusStore, build_corpus
+    from model_training.preprocess import extract_python_files, prepare_dataset
+    
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as corpus_dir:
+        files = generate_codenet_tree(root, args.problems, args.submissions, seed=args.seed)
+        
+        started = time.perf_counter()
+        df = extract_python_files(root, workers=args.workers)
+        extract_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        prepare_dataset(df)
+        prepare_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        build_corpus(root, corpus_dir, workers=args.workers)
+        corpus_build_seconds = time.perf_counter() - started
+        
+        store = CorpusStore(corpus_dir)
+        started = time.perf_counter()
+        prepare_dataset(store, workers=args.workers)
+        corpus_prepare_seconds = time.perf_counter() - started
+        corpus_metadata_bytes = int(store.metadata().memory_usage(deep=True).sum())
+        store.close()
+    
+    return {
+        "benchmark": "preprocess",
+        "params": {
+            "problems": args.problems,
+            "submissions": args.submissions,
+            "workers": args.workers,
+            "seed": args.seed,
+        },
+        "files": files,
+        "extract_seconds": extract_seconds,
+        "prepare_seconds": prepare_seconds,
+        "extract_files_per_second": files / extract_seconds if extract_seconds else 0.0,
+        "prepare_samples_per_second": len(df) / prepare_seconds if prepare_seconds else 0.0,
+        "corpus_build_seconds": corpus_build_seconds,
+        "corpus_prepare_seconds": corpus_prepare_seconds,
+        "corpus_prepare_samples_per_second": len(df) / corpus_prepare_seconds if corpus_prepare_seconds else 0.0,
+        "dataframe_bytes": int(df.memory_usage(deep=True).sum()),
+        "corpus_metadata_bytes": corpus_metadata_bytes,
+    }
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        if key == "params":
+            continue
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    """Print every numeric metric of two result files side by side"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        sys.exit("Can't compare results of different benchmarks")
+    
+    base_metrics, cand_metrics = _flatten(baseline["results"]), _flatten(candidate["results"])
+    print(f"{'metric':40} {'baseline':>14} {'candidate':>14} {'change':>9}")
+    for key in base_metrics:
+        if key not in cand_metrics:
+            continue
+        old, new = base_metrics[key], cand_metrics[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key:40} {old:14.3f} {new:14.3f} {change:>9}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    review = sub.add_parser("review", help="load-test /review/analyze")
+    review.add_argument("--requests", type=int, default=200)
+    review.add_argument("--concurrency", type=int, default=8)
+    review.add_argument("--corpus-size", type=int, default=50)
+    review.add_argument("--defect-rate", type=float, default=0.3)
+    review.add_argument("--allow-cache-hits", action="store_true",
+                        help="repeat corpus snippets verbatim so the result cache is exercised")
+    
+    preprocess = sub.add_parser("preprocess", help="time dataset extraction and labeling")
+    preprocess.add_argument("--problems", type=int, default=20)
+    preprocess.add_argument("--submissions", type=int, default=50)
+    preprocess.add_argument("--workers", type=int, default=None)
+    
+    for bench in (review, preprocess):
+        bench.add_argument("--seed", type=int, default=42)
+        bench.add_argument("--output", help="write results as JSON to this path")
+    
+    cmp = sub.add_parser("compare", help="compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+    
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.baseline, args.candidate)
+        return
+    
+    if args.command == "review":
+        results = asyncio.run(bench_review(args))
+    else:
+        results = bench_preprocess(args)
+    
+    report = {"benchmark": results.pop("benchmark"), "environment": environment(), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
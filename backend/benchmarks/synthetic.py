@@ -0,0 +1,76 @@
+# backend/benchmarks/synthetic.py
+import os
+import random
+from typing import List
+
+# Snippet building blocks, each a function body template; some carry a known defect
+CLEAN_BLOCKS = [
+    "def add_{n}(a, b):\n    return a + b\n",
+    "def mean_{n}(values):\n    if not values:\n        return 0\n    return sum(values) / len(values)\n",
+    "class Counter{n}:\n    def __init__(self):\n        self.count = 0\n\n    def increment(self):\n        self.count += 1\n        return self.count\n",
+    "def read_numbers_{n}(text):\n    numbers = []\n    for part in text.split(','):\n        numbers.append(int(part))\n    return numbers\n",
+]
+DEFECT_BLOCKS = {
+    "bare_except": "def parse_{n}(text):\n    try:\n        return int(text)\n    except:\n        return None\n",
+    "infinite_loop": "def spin_{n}():\n    while True:\n        pass\n",
+    "builtin_shadowing": "def shadow_{n}(items):\n    list = [x for x in items]\n    return list\n",
+    "unused_variable": "def unused_{n}(x):\n    temp = x * 2\n    return x\n",
+    "mutable_default": "def append_{n}(item, items=[]):\n    items.append(item)\n    return items\n",
+    "syntax_error": "def broken_{n}(x)\n    return x\n",
+}
+
+def generate_snippet(rng: random.Random, blocks: int, defect_rate: float) -> str:
+    """Build one snippet of roughly `blocks` definitions with a given share of defects"""
+    parts = []
+    for n in range(blocks):
+        if rng.random() < defect_rate:
+            parts.append(rng.choice(list(DEFECT_BLOCKS.values())).format(n=n))
+        else:
+            parts.append(rng.choice(CLEAN_BLOCKS).format(n=n))
+    return "\n".join(parts)
+
+def generate_corpus(
+    count: int,
+    sizes: List[int] = (1, 5, 25, 100),
+    defect_rate: float = 0.3,
+    seed: int = 42
+) -> List[str]:
+    """
+    Reproducible corpus of snippets of varying size and defect mix
+    
+    Args:
+        count: Number of snippets
+        sizes: Number of definitions per snippet, cycled through
+        defect_rate: Probability that a definition carries a defect
+        seed: Random seed
+        
+    Returns:
+        List of code snippets
+    """
+    rng = random.Random(seed)
+    return [generate_snippet(rng, sizes[i % len(sizes)], defect_rate) for i in range(count)]
+
+def generate_codenet_tree(
+    root: str,
+    problems: int = 20,
+    submissions_per_problem: int = 50,
+    seed: int = 42
+) -> int:
+    """
+    Write a CodeNet-shaped tree: one directory per problem with status.txt and .py submissions
+    
+    Returns:
+        Number of .py files written
+    """
+    rng = random.Random(seed)
+    written = 0
+    for p in range(problems):
+        problem_dir = os.path.join(root, f"p{p:05d}")
+        os.makedirs(problem_dir, exist_ok=True)
+        with open(os.path.join(problem_dir, "status.txt"), "w") as f:
+            f.write(rng.choice(["Accepted", "Wrong Answer", "Runtime Error"]))
+        for s in range(submissions_per_problem):
+            with open(os.path.join(problem_dir, f"s{s:06d}.py"), "w") as f:
+                f.write(generate_snippet(rng, rng.choice([1, 3, 10]), 0.3))
+            written += 1
+    return written
@@ -0,0 +1,281 @@
+import json
+import mmap
+import os
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+from model_training.dataset_store import write_json_atomic
+from model_training.preprocess import _read_files, add_derived_labels, iter_read_tasks, map_ordered
+from model_training.rules import check_code
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CORPUS_MANIFEST_FILE = 'corpus.json'
+CORPUS_FORMAT_VERSION = 1
+
+# A new pack file is started once the current one reaches this size
+PACK_MAX_BYTES = 1 << 30
+
+# Rows labeled by a worker process per task
+LABEL_ROWS_PER_TASK = 2048
+
+# Per-sample index arrays, one .npy file each: where the source lives in
+# the packs, its size in characters, and interned metadata as codes into
+# the manifest's problems/statuses/directories tables (-1 for no status)
+INDEX_ARRAYS = {
+    'pack': 'H',
+    'offset': 'Q',
+    'length': 'I',
+    'file_size': 'i',
+    'problem': 'i',
+    'status': 'h',
+    'directory': 'i',
+}
+
+def _index_path(corpus_dir: str, name: str) -> str:
+    return os.path.join(corpus_dir, f"index-{name}.npy")
+
+def _load_index(corpus_dir: str, name: str) -> np.ndarray:
+    try:
+        return np.load(_index_path(corpus_dir, name), mmap_mode='r')
+    except ValueError:
+        # numpy can't map an empty array
+        return np.load(_index_path(corpus_dir, name))
+
+def _intern(table: Dict[Any, int], value: Any) -> int:
+    code = table.get(value)
+    if code is None:
+        code = table[value] = len(table)
+    return code
+
+def build_corpus(
+    codenet_dir: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    pack_max_bytes: int = PACK_MAX_BYTES
+) -> Dict[str, Any]:
+    """
+    Pack every Python source of the dataset into a memory-mappable corpus
+    
+    Sources are appended as UTF-8 bytes to a few large pack files, and
+    each sample gets one entry in typed index arrays: pack, offset and
+    length of its source, plus problem, status and directory as codes
+    into small tables. File names are packed the same way. Nothing is
+    kept per sample as a Python object, so the corpus costs a few dozen
+    bytes of RAM per sample however large the dataset is, and readers
+    share the packs through the page cache.
+    
+    Args:
+        codenet_dir: Directory containing the CodeNetPy dataset
+        output_dir: Directory for the packs, index arrays and manifest
+        workers: Number of reader processes (defaults to CPU count)
+        pack_max_bytes: Size at which a new pack file is started
+    
+    Returns:
+        The corpus manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    index = {name: array(typecode) for name, typecode in INDEX_ARRAYS.items()}
+    name_offsets = array('Q', [0])
+    problems: Dict[str, int] = {}
+    statuses: Dict[str, int] = {}
+    directories: Dict[str, int] = {}
+    packs: List[str] = []
+    pack = None
+    pack_bytes = 0
+    
+    try:
+        with open(os.path.join(output_dir, 'names.bin'), 'wb') as names:
+            for records in map_ordered(_read_files, iter_read_tasks(codenet_dir), workers):
+                for record in records:
+                    raw = record['code'].encode('utf-8')
+                    if pack is None or (pack_bytes and pack_bytes + len(raw) > pack_max_bytes):
+                        if pack is not None:
+                            pack.close()
+                        packs.append(f"sources-{len(packs):05d}.bin")
+                        pack = open(os.path.join(output_dir, packs[-1]), 'wb')
+                        pack_bytes = 0
+                    pack.write(raw)
+                    
+                    directory, file_name = os.path.split(record['file_path'])
+                    name = file_name.encode('utf-8')
+                    names.write(name)
+                    name_offsets.append(name_offsets[-1] + len(name))
+                    
+                    index['pack'].append(len(packs) - 1)
+                    index['offset'].append(pack_bytes)
+                    index['length'].append(len(raw))
+                    index['file_size'].append(record['file_size'])
+                    index['problem'].append(_intern(problems, record['problem_id']))
+                    index['status'].append(-1 if record['status'] is None else _intern(statuses, record['status']))
+                    index['directory'].append(_intern(directories, directory))
+                    pack_bytes += len(raw)
+    finally:
+        if pack is not None:
+            pack.close()
+    
+    for name, column in index.items():
+        np.save(_index_path(output_dir, name), np.frombuffer(column, dtype=column.typecode))
+    np.save(_index_path(output_dir, 'name_offset'), np.frombuffer(name_offsets, dtype=name_offsets.typecode))
+    
+    manifest = {
+        'corpus_format_version': CORPUS_FORMAT_VERSION,
+        'source_dir': os.path.abspath(codenet_dir),
+        'samples': len(index['offset']),
+        'packs': packs,
+        'problems': list(problems),
+        'statuses': list(statuses),
+        'directories': list(directories),
+    }
+    write_json_atomic(os.path.join(output_dir, CORPUS_MANIFEST_FILE), manifest)
+    logger.info(f"Packed {manifest['samples']} sources into {len(packs)} pack files in {output_dir}")
+    return manifest
+
+def _map_file(path: str) -> Any:
+    """Read-only mapping of a file; empty files can't be mapped and read as b''"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class CorpusStore:
+    """
+    Read access to a corpus written by build_corpus
+    
+    Index arrays and packs are memory-mapped, so opening a store is
+    cheap and a source is only paged in when it is read. A store pickles
+    as its directory, so handing one to worker processes copies nothing;
+    each worker maps the same files and they share the page cache.
+    """
+    
+    def __init__(self, corpus_dir: str):
+        path = os.path.join(corpus_dir, CORPUS_MANIFEST_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No corpus manifest in {corpus_dir}")
+        with open(path, 'r') as f:
+            self.manifest = json.load(f)
+        self.corpus_dir = corpus_dir
+        self.problems: List[str] = self.manifest['problems']
+        self.statuses: List[str] = self.manifest['statuses']
+        self.directories: List[str] = self.manifest['directories']
+        self.index = {name: _load_index(corpus_dir, name) for name in INDEX_ARRAYS}
+        self._name_offsets = _load_index(corpus_dir, 'name_offset')
+        self._names = _map_file(os.path.join(corpus_dir, 'names.bin'))
+        self._packs: List[Any] = [None] * len(self.manifest['packs'])
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'corpus_dir': self.corpus_dir}
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state['corpus_dir'])
+    
+    def __len__(self) -> int:
+        return self.manifest['samples']
+    
+    def _pack(self, number: int) -> Any:
+        if self._packs[number] is None:
+            self._packs[number] = _map_file(os.path.join(self.corpus_dir, self.manifest['packs'][number]))
+        return self._packs[number]
+    
+    def source_bytes(self, row: int) -> memoryview:
+        """UTF-8 source of a sample, as a view into the mapped pack"""
+        offset = int(self.index['offset'][row])
+        return memoryview(self._pack(int(self.index['pack'][row])))[offset:offset + int(self.index['length'][row])]
+    
+    def source(self, row: int) -> str:
+        """Source code of a sample"""
+        return str(self.source_bytes(row), 'utf-8')
+    
+    def sources(self, rows: Optional[Iterable[int]] = None) -> Iterator[str]:
+        """Source code of the given samples (defaults to all), one at a time"""
+        for row in range(len(self)) if rows is None else rows:
+            yield self.source(row)
+    
+    def file_path(self, row: int) -> str:
+        """Path the sample was read from"""
+        start, end = int(self._name_offsets[row]), int(self._name_offsets[row + 1])
+        name = str(self._names[start:end], 'utf-8')
+        return os.path.join(self.directories[int(self.index['directory'][row])], name)
+    
+    def metadata(self, file_paths: bool = False) -> pd.DataFrame:
+        """
+        Sample metadata as a DataFrame indexed by row number
+        
+        problem_id and status are categoricals built straight from the
+        index codes. File paths are one string object per sample, so they
+        are only materialized when asked for.
+        
+        Args:
+            file_paths: Include a file_path column
+        
+        Returns:
+            DataFrame with problem_id, status, file_size and optionally file_path
+        """
+        df = pd.DataFrame({
+            'problem_id': pd.Categorical.from_codes(self.index['problem'], categories=self.problems),
+            'status': pd.Categorical.from_codes(self.index['status'], categories=self.statuses),
+            'file_size': np.asarray(self.index['file_size']),
+        })
+        if file_paths:
+            df.insert(0, 'file_path', [self.file_path(row) for row in range(len(self))])
+        return df
+    
+    def close(self) -> None:
+        for mapping in [self._names] + self._packs:
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+        self._packs = [None] * len(self._packs)
+
+# Stores opened by this worker process, by directory
+_worker_stores: Dict[str, CorpusStore] = {}
+
+def _label_rows(task: Tuple[str, int, int]) -> Tuple[List[List[str]], List[List[str]]]:
+    """Label a range of samples, reading them from the mapped corpus (runs in a worker process)"""
+    corpus_dir, start, stop = task
+    store = _worker_stores.get(corpus_dir)
+    if store is None:
+        store = _worker_stores[corpus_dir] = CorpusStore(corpus_dir)
+    syntax_errors, logical_errors = [], []
+    for row in range(start, stop):
+        report = check_code(store.source(row))
+        syntax_errors.append(report.syntax_errors)
+        logical_errors.append(report.logical_errors)
+    return syntax_errors, logical_errors
+
+def prepare_corpus(store: CorpusStore, workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Label every sample of a corpus across worker processes
+    
+    Workers are only sent row ranges; each reads the sources straight
+    from the memory-mapped packs.
+    
+    Args:
+        store: Corpus to label
+        workers: Number of labeling processes (defaults to CPU count)
+    
+    Returns:
+        Metadata and error labels, same columns as prepare_dataset except
+        code and file_path; the index is the row number in the store
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        (store.corpus_dir, start, min(start + LABEL_ROWS_PER_TASK, len(store)))
+        for start in range(0, len(store), LABEL_ROWS_PER_TASK)
+    ]
+    syntax_errors: List[List[str]] = []
+    logical_errors: List[List[str]] = []
+    for syntax, logical in map_ordered(_label_rows, tasks, workers):
+        syntax_errors.extend(syntax)
+        logical_errors.extend(logical)
+    
+    df = store.metadata()
+    df['syntax_errors'] = syntax_errors
+    df['has_syntax_error'] = np.array([len(errors) > 0 for errors in syntax_errors], dtype=bool)
+    df['logical_errors'] = logical_errors
+    df['has_logical_error'] = np.array([len(errors) > 0 for errors in logical_errors], dtype=bool)
+    return add_derived_labels(df)
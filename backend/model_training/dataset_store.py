@@ -0,0 +1,197 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
+import logging
+from model_training.preprocess import (
+    ERROR_TYPES,
+    encode_labels,
+    iter_chunks_with_progress,
+    read_and_label_files,
+)
+from model_training.rules import RULES, rule_bits
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+# Low-cardinality string columns stored as dictionary-encoded (categorical) columns
+DICTIONARY_COLUMNS = ('problem_id', 'status', 'syntax_error_msg', 'error_type')
+
+def _rules_signature() -> Dict[str, Dict[str, int]]:
+    """Version and mask bit of every labeling rule"""
+    bits = rule_bits()
+    return {rule_id: {'version': RULES[rule_id].version, 'bit': bits[rule_id]} for rule_id in RULES}
+
+def write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_manifest(output_dir: str) -> Optional[Dict[str, Any]]:
+    """Load a dataset manifest, or None if there isn't one"""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_shard(df: pd.DataFrame, path: str, compression: str = 'zstd') -> None:
+    """Write one shard atomically as a compressed Parquet file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    # Same column types in every shard, whatever categories a shard happens to contain
+    table = pa.table({
+        column: (
+            pa.array(df[column].astype(object), type=pa.string(), from_pandas=True).dictionary_encode()
+            if column in DICTIONARY_COLUMNS
+            else pa.Array.from_pandas(df[column])
+        )
+        for column in df.columns
+    })
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+
+def build_dataset(
+    codenet_dir: str,
+    output_dir: str,
+    shard_size: int = 50000,
+    workers: Optional[int] = None,
+    compression: str = 'zstd'
+) -> Dict[str, Any]:
+    """
+    Extract, label and write the dataset as sharded Parquet files
+    
+    Files are read and labeled in parallel, and each chunk is written as
+    one shard. The manifest is updated after every shard, so an
+    interrupted build resumes after the last completed shard. A manifest
+    from different settings or rule versions starts a fresh build.
+    
+    Args:
+        codenet_dir: Directory containing the CodeNetPy dataset
+        output_dir: Directory for the shards and manifest
+        shard_size: Target number of samples per shard
+        workers: Number of reader/labeler processes (defaults to CPU count)
+        compression: Parquet compression codec
+        
+    Returns:
+        The final manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    settings = {
+        'format_version': FORMAT_VERSION,
+        'source_dir': os.path.abspath(codenet_dir),
+        'shard_size': shard_size,
+        'compression': compression,
+        'rules': _rules_signature(),
+    }
+    
+    manifest = load_manifest(output_dir)
+    if manifest is None or any(manifest.get(key) != value for key, value in settings.items()):
+        if manifest is not None:
+            logger.info("Dataset settings or rules changed, starting a fresh build")
+        manifest = dict(settings, shards=[], tasks_done=0, complete=False)
+    elif manifest.get('complete'):
+        logger.info(f"Dataset in {output_dir} is already complete")
+        return manifest
+    else:
+        logger.info(f"Resuming build after {len(manifest['shards'])} shards")
+    
+    chunks = iter_chunks_with_progress(
+        codenet_dir,
+        chunk_size=shard_size,
+        workers=workers,
+        skip_tasks=manifest['tasks_done'],
+        read_func=read_and_label_files
+    )
+    for chunk, tasks_done in chunks:
+        shard_file = f"shard-{len(manifest['shards']):05d}.parquet"
+        write_shard(encode_labels(chunk), os.path.join(output_dir, shard_file), compression)
+        manifest['shards'].append({'file': shard_file, 'rows': len(chunk)})
+        manifest['tasks_done'] = tasks_done
+        write_json_atomic(os.path.join(output_dir, MANIFEST_FILE), manifest)
+        logger.info(f"Wrote {shard_file} ({len(chunk)} samples)")
+    
+    manifest['complete'] = True
+    write_json_atomic(os.path.join(output_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+def shard_paths(output_dir: str) -> List[str]:
+    """Paths of a dataset's shards, in order"""
+    return [path for path, _ in _shard_entries(output_dir)]
+
+def _shard_entries(output_dir: str) -> List[tuple]:
+    manifest = load_manifest(output_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No dataset manifest in {output_dir}")
+    return [
+        (os.path.join(output_dir, shard['file']), shard.get('deleted', []))
+        for shard in manifest['shards']
+    ]
+
+def _read_shard(path: str, columns: Optional[List[str]], deleted: List[str]):
+    """Read a shard as an Arrow table, leaving out rows marked deleted"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    
+    if not deleted:
+        return pq.read_table(path, columns=columns, memory_map=True)
+    read_columns = None if columns is None else list(dict.fromkeys(columns + ['file_path']))
+    table = pq.read_table(path, columns=read_columns, memory_map=True)
+    table = table.filter(pc.invert(pc.is_in(table['file_path'], value_set=pa.array(deleted))))
+    return table if columns is None else table.select(columns)
+
+def iter_dataset_shards(
+    output_dir: str,
+    columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a dataset one shard at a time
+    
+    Rows that an incremental build marked as deleted are skipped.
+    
+    Args:
+        output_dir: Directory written by build_dataset
+        columns: Columns to read (defaults to all); unread columns are never decoded
+        
+    Yields:
+        One DataFrame per shard
+    """
+    for path, deleted in _shard_entries(output_dir):
+        df = _read_shard(path, columns, deleted).to_pandas()
+        if 'error_type' in df:
+            df['error_type'] = df['error_type'].cat.set_categories(ERROR_TYPES)
+        yield df
+
+def read_dataset(output_dir: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a whole dataset, memory-mapping shard files
+    
+    Args:
+        output_dir: Directory written by build_dataset
+        columns: Columns to read (defaults to all)
+        
+    Returns:
+        DataFrame with the requested columns of every shard
+    """
+    import pyarrow as pa
+    
+    tables = [_read_shard(path, columns, deleted) for path, deleted in _shard_entries(output_dir)]
+    if not tables:
+        return pd.DataFrame(columns=columns or [])
+    # Shards have their own category dictionaries; unify them before converting
+    df = pa.concat_tables(tables).unify_dictionaries().to_pandas()
+    if 'error_type' in df:
+        df['error_type'] = df['error_type'].cat.set_categories(ERROR_TYPES)
+    return df
+
+def decode_logical_errors(mask: int, manifest: Dict[str, Any]) -> List[str]:
+    """Rule ids set in a logical_error_mask, using the bit layout recorded in the manifest"""
+    return [rule_id for rule_id, info in manifest['rules'].items() if mask & (1 << info['bit'])]
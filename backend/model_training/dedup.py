@@ -0,0 +1,229 @@
+import hashlib
+import io
+import tokenize
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+from model_training.preprocess import map_ordered
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# MinHash / LSH parameters: 32 bands of 4 rows put the similarity
+# threshold where a pair becomes a candidate at about (1/32)^(1/4) ~ 0.42,
+# and candidates are then checked against the estimated Jaccard similarity
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+
+def normalized_tokens(code: str) -> List[str]:
+    """
+    Token stream that ignores comments, blank lines and spacing
+    
+    Code that can't be tokenized falls back to whitespace-separated words.
+    """
+    tokens = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type in _SKIPPED_TOKENS:
+                continue
+            if tok.type in (tokenize.INDENT, tokenize.DEDENT, tokenize.NEWLINE):
+                # Keep block structure, not the exact whitespace
+                tokens.append(tokenize.tok_name[tok.type])
+            else:
+                tokens.append(tok.string)
+        return tokens
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code.split()
+
+def exact_hash(tokens: List[str]) -> str:
+    """Hash of a normalized token stream; equal for formatting-only differences"""
+    return hashlib.blake2b("\x1f".join(tokens).encode('utf-8'), digest_size=16).hexdigest()
+
+def _mod_mersenne(x: np.ndarray) -> np.ndarray:
+    """x mod 2^61 - 1 for x < 2^64, using 2^61 = 1 (mod 2^61 - 1)"""
+    x = (x & _MERSENNE_PRIME) + (x >> np.uint64(61))
+    return np.where(x >= _MERSENNE_PRIME, x - _MERSENNE_PRIME, x)
+
+def _mul_add_mod_mersenne(a: np.ndarray, x: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    (a * x + b) mod 2^61 - 1 for a, x, b < 2^61, without overflowing uint64
+    
+    a and x are split into 31-bit halves, so every partial product fits
+    in 62 bits, and the powers of two they are shifted by are folded
+    with 2^61 = 1 before they are added up.
+    """
+    low = np.uint64((1 << 31) - 1)
+    a_hi, a_lo = a >> np.uint64(31), a & low
+    x_hi, x_lo = x >> np.uint64(31), x & low
+    # a * x = a_hi*x_hi * 2^62 + mid * 2^31 + a_lo*x_lo, with 2^62 = 2
+    mid = a_hi * x_lo + a_lo * x_hi
+    mid_folded = (mid >> np.uint64(30)) + ((mid & np.uint64((1 << 30) - 1)) << np.uint64(31))
+    high = _mod_mersenne((a_hi * x_hi) << np.uint64(1))
+    product = _mod_mersenne(high + _mod_mersenne(mid_folded) + _mod_mersenne(a_lo * x_lo))
+    return _mod_mersenne(product + b)
+
+def minhash_signature(tokens: List[str]) -> np.ndarray:
+    """MinHash signature over token shingles"""
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    # (a * h + b) mod p for every permutation and shingle, then the minimum per permutation
+    permuted = _mul_add_mod_mersenne(_PERM_A[:, None], hashes[None, :], _PERM_B[:, None])
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+def _fingerprint_batch(codes: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Exact hashes and MinHash signatures for a batch (runs in a worker process)"""
+    hashes, signatures = [], np.empty((len(codes), NUM_PERM), dtype=np.uint32)
+    for i, code in enumerate(codes):
+        tokens = normalized_tokens(code)
+        hashes.append(exact_hash(tokens))
+        signatures[i] = minhash_signature(tokens)
+    return hashes, signatures
+
+class UnionFind:
+    """Disjoint sets over arbitrary hashable items"""
+
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+
+    def find(self, item: Hashable) -> Hashable:
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            root = item
+            while self.parent[root] != root:
+                root = self.parent[root]
+            # Path compression
+            while self.parent[item] != root:
+                self.parent[item], item = root, self.parent[item]
+            return root
+        return item
+
+    def union(self, a: Hashable, b: Hashable) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+def find_duplicates(
+    codes: Iterable[str],
+    threshold: float = 0.8,
+    workers: Optional[int] = None,
+    batch_size: int = 1000
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find exact and near-duplicate code samples
+    
+    Exact duplicates share a hash of their normalized token stream.
+    Near-duplicates are found with MinHash signatures and LSH banding, so
+    only samples that collide in some band are compared and memory grows
+    linearly with the number of samples.
+    
+    Args:
+        codes: Code samples
+        threshold: Minimum estimated Jaccard similarity for near-duplicates
+        workers: Number of worker processes for fingerprinting
+        batch_size: Samples per worker task
+        
+    Returns:
+        (exact hash per sample, duplicate cluster id per sample)
+    """
+    codes = list(codes)
+    batches = [codes[i:i + batch_size] for i in range(0, len(codes), batch_size)]
+    hashes: List[str] = []
+    signature_parts = []
+    for batch_hashes, batch_signatures in map_ordered(_fingerprint_batch, batches, workers or 1):
+        hashes.extend(batch_hashes)
+        signature_parts.append(batch_signatures)
+    signatures = np.vstack(signature_parts) if signature_parts else np.empty((0, NUM_PERM), dtype=np.uint32)
+    
+    clusters = UnionFind()
+    
+    # Exact duplicates
+    first_by_hash: Dict[str, int] = {}
+    for i, h in enumerate(hashes):
+        clusters.union(first_by_hash.setdefault(h, i), i)
+    
+    # Near duplicates: one representative per exact hash is enough
+    representatives = list(first_by_hash.values())
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        buckets: Dict[bytes, int] = {}
+        band_values = signatures[:, band * rows:(band + 1) * rows]
+        for i in representatives:
+            key = band_values[i].tobytes()
+            other = buckets.setdefault(key, i)
+            if other != i and clusters.find(other) != clusters.find(i):
+                similarity = np.mean(signatures[other] == signatures[i])
+                if similarity >= threshold:
+                    clusters.union(other, i)
+    
+    roots: Dict[int, int] = {}
+    cluster_ids = np.array([roots.setdefault(clusters.find(i), len(roots)) for i in range(len(codes))], dtype=np.int64)
+    return np.array(hashes, dtype=object), cluster_ids
+
+def deduplicate(
+    df: pd.DataFrame,
+    threshold: float = 0.8,
+    workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Drop exact duplicates and tag near-duplicate clusters
+    
+    Run between extract_python_files and split_dataset. The first sample
+    of each exact duplicate group is kept, and every remaining sample
+    gets a dup_cluster id shared with its near-duplicates, which
+    split_dataset uses to keep a cluster on one side of the split.
+    
+    Args:
+        df: DataFrame with a code column
+        threshold: Minimum estimated Jaccard similarity for near-duplicates
+        workers: Number of worker processes for fingerprinting
+        
+    Returns:
+        Deduplicated DataFrame with exact_hash and dup_cluster columns
+    """
+    hashes, cluster_ids = find_duplicates(df['code'], threshold=threshold, workers=workers)
+    df = df.assign(exact_hash=hashes, dup_cluster=cluster_ids)
+    before = len(df)
+    df = df.drop_duplicates(subset='exact_hash', keep='first').reset_index(drop=True)
+    logger.info(
+        f"Dropped {before - len(df)} exact duplicates; "
+        f"{df['dup_cluster'].nunique()} clusters remain over {len(df)} samples"
+    )
+    return df
+
+def split_groups(df: pd.DataFrame, group_columns: List[str]) -> np.ndarray:
+    """
+    Group id per row such that rows sharing a value in any group column share a group
+    
+    For example with ['problem_id', 'dup_cluster'], near-duplicates of
+    different problems pull both problems into one group.
+    """
+    groups = UnionFind()
+    columns = [df[column].to_numpy() for column in group_columns]
+    for row in range(len(df)):
+        first = (0, columns[0][row])
+        groups.find(first)
+        for index in range(1, len(columns)):
+            groups.union(first, (index, columns[index][row]))
+    roots: Dict[Hashable, int] = {}
+    return np.array(
+        [roots.setdefault(groups.find((0, columns[0][row])), len(roots)) for row in range(len(df))],
+        dtype=np.int64
+    )
@@ -0,0 +1,208 @@
+import ast
+import json
+import os
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import logging
+from model_training.dataset_store import load_manifest, write_json_atomic
+from model_training.dedup import normalized_tokens
+from model_training.preprocess import map_ordered
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURES_DIR = 'features'
+FEATURES_MANIFEST_FILE = 'features.json'
+FEATURES_FORMAT_VERSION = 1
+
+# Every concrete AST node class of the running Python, in a fixed order
+AST_NODE_TYPES = sorted(
+    name for name, obj in vars(ast).items()
+    if isinstance(obj, type) and issubclass(obj, ast.AST) and not obj.__subclasses__()
+)
+_AST_NODE_INDEX = {name: i for i, name in enumerate(AST_NODE_TYPES)}
+
+def token_ngrams(code: str, ngram_range: Tuple[int, int] = (1, 3)) -> List[str]:
+    """Token n-grams of a sample's normalized token stream"""
+    tokens = normalized_tokens(code)
+    low, high = ngram_range
+    return [
+        " ".join(tokens[i:i + n])
+        for n in range(low, high + 1)
+        for i in range(len(tokens) - n + 1)
+    ]
+
+def ast_node_counts(codes: List[str]) -> np.ndarray:
+    """
+    Count AST node types per sample
+    
+    Args:
+        codes: Code samples
+        
+    Returns:
+        int32 array of shape (len(codes), len(AST_NODE_TYPES)); rows for
+        code that doesn't parse are all zero
+    """
+    counts = np.zeros((len(codes), len(AST_NODE_TYPES)), dtype=np.int32)
+    for row, code in enumerate(codes):
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            column = _AST_NODE_INDEX.get(type(node).__name__)
+            if column is not None:
+                counts[row, column] += 1
+    return counts
+
+def hashed_ngram_matrix(codes: List[str], n_features: int, ngram_range: Tuple[int, int]):
+    """
+    Hashed token n-gram counts for a batch of samples
+    
+    Returns:
+        float32 CSR matrix of shape (len(codes), n_features)
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    
+    vectorizer = HashingVectorizer(
+        analyzer=partial(token_ngrams, ngram_range=ngram_range),
+        n_features=n_features,
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float32
+    )
+    return vectorizer.transform(codes)
+
+def _save_csr(matrix, prefix: str) -> None:
+    """Save CSR components as plain .npy files so they can be memory-mapped"""
+    matrix.sort_indices()
+    for part in ('data', 'indices', 'indptr'):
+        tmp_path = f"{prefix}_{part}.tmp.npy"
+        np.save(tmp_path, getattr(matrix, part))
+        os.replace(tmp_path, f"{prefix}_{part}.npy")
+
+def _shard_source(dataset_dir: str, shard: Dict[str, Any]) -> Dict[str, int]:
+    """What identifies a shard file's content: its row count, size and modification time"""
+    stat = os.stat(os.path.join(dataset_dir, shard['file']))
+    return {'rows': shard['rows'], 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _featurize_shard(
+    shard: Dict[str, Any],
+    dataset_dir: str,
+    n_features: int,
+    ngram_range: Tuple[int, int]
+) -> Dict[str, Any]:
+    """Compute and write the features of one dataset shard (runs in a worker process)"""
+    import pyarrow.parquet as pq
+    
+    codes = pq.read_table(os.path.join(dataset_dir, shard['file']), columns=['code']).column('code').to_pylist()
+    name = os.path.splitext(shard['file'])[0]
+    out_prefix = os.path.join(dataset_dir, FEATURES_DIR, name)
+    
+    _save_csr(hashed_ngram_matrix(codes, n_features, ngram_range), f"{out_prefix}_ngrams")
+    counts = ast_node_counts(codes)
+    tmp_path = f"{out_prefix}_ast.tmp.npy"
+    np.save(tmp_path, counts)
+    os.replace(tmp_path, f"{out_prefix}_ast.npy")
+    return {'shard': shard['file'], 'name': name, 'rows': len(codes)}
+
+def build_features(
+    dataset_dir: str,
+    n_features: int = 2 ** 18,
+    ngram_range: Tuple[int, int] = (1, 3),
+    workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compute training features for every shard of a dataset
+    
+    For each shard this writes hashed token n-gram counts as a CSR matrix
+    (data/indices/indptr .npy files) and AST node-type counts as a dense
+    int32 .npy array, row-aligned with the shard's rows. Shards are
+    featurized in parallel, a whole shard per vectorizer call. Shards
+    already featurized with the same settings are skipped, so new shards
+    from an incremental build only cost their own rows; a shard whose
+    file was rewritten since (different row count, size or modification
+    time) is featurized again.
+    
+    Args:
+        dataset_dir: Directory written by build_dataset or incremental_build
+        n_features: Width of the hashed n-gram space
+        ngram_range: Smallest and largest token n-gram length
+        workers: Number of worker processes (defaults to CPU count)
+        
+    Returns:
+        The features manifest
+    """
+    manifest = load_manifest(dataset_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No dataset manifest in {dataset_dir}")
+    os.makedirs(os.path.join(dataset_dir, FEATURES_DIR), exist_ok=True)
+    
+    settings = {
+        'format_version': FEATURES_FORMAT_VERSION,
+        'n_features': n_features,
+        'ngram_range': list(ngram_range),
+        'ast_node_types': AST_NODE_TYPES,
+    }
+    features_path = os.path.join(dataset_dir, FEATURES_DIR, FEATURES_MANIFEST_FILE)
+    features = None
+    if os.path.exists(features_path):
+        with open(features_path, 'r') as f:
+            features = json.load(f)
+    if features is None or any(features.get(key) != value for key, value in settings.items()):
+        features = dict(settings, shards={})
+    
+    sources = {shard['file']: _shard_source(dataset_dir, shard) for shard in manifest['shards']}
+    todo = [
+        shard for shard in manifest['shards']
+        if features['shards'].get(shard['file'], {}).get('source') != sources[shard['file']]
+    ]
+    featurize = partial(
+        _featurize_shard,
+        dataset_dir=dataset_dir,
+        n_features=n_features,
+        ngram_range=tuple(ngram_range)
+    )
+    for entry in map_ordered(featurize, todo, workers or os.cpu_count() or 1):
+        features['shards'][entry['shard']] = {
+            'name': entry['name'],
+            'rows': entry['rows'],
+            'source': sources[entry['shard']],
+        }
+        write_json_atomic(features_path, features)
+        logger.info(f"Featurized {entry['shard']} ({entry['rows']} samples)")
+    
+    write_json_atomic(features_path, features)
+    return features
+
+def load_shard_features(dataset_dir: str, shard_file: str):
+    """
+    Load one shard's features without copying them into memory
+    
+    Args:
+        dataset_dir: Dataset directory
+        shard_file: Shard file name from the dataset manifest
+        
+    Returns:
+        (CSR matrix of hashed n-grams, AST node-count array), both backed
+        by memory-mapped files and aligned with the shard's stored rows
+        (including rows an incremental build marked deleted)
+    """
+    from scipy.sparse import csr_matrix
+    
+    features_path = os.path.join(dataset_dir, FEATURES_DIR, FEATURES_MANIFEST_FILE)
+    with open(features_path, 'r') as f:
+        features = json.load(f)
+    entry = features['shards'][shard_file]
+    prefix = os.path.join(dataset_dir, FEATURES_DIR, entry['name'])
+    
+    parts = {part: np.load(f"{prefix}_ngrams_{part}.npy", mmap_mode='r') for part in ('data', 'indices', 'indptr')}
+    ngrams = csr_matrix(
+        (parts['data'], parts['indices'], parts['indptr']),
+        shape=(entry['rows'], features['n_features']),
+        copy=False
+    )
+    ast_counts = np.load(f"{prefix}_ast.npy", mmap_mode='r')
+    return ngrams, ast_counts
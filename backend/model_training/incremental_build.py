@@ -0,0 +1,375 @@
+import hashlib
+import itertools
+import os
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+import logging
+from model_training.dataset_store import (
+    MANIFEST_FILE,
+    load_manifest,
+    write_shard,
+    write_json_atomic,
+)
+from model_training.preprocess import (
+    FILES_PER_TASK,
+    add_derived_labels,
+    encode_labels,
+    iter_read_tasks,
+    label_fields,
+    map_ordered,
+)
+from model_training.rules import RULES, RuleEngine, findings_mask
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_FORMAT_VERSION = 1
+
+# A shard is rewritten without its deleted rows once they pass this share of it
+COMPACT_DELETED_FRACTION = 0.25
+
+def _plan_rules(previous: Dict[str, Dict[str, int]]) -> Tuple[Dict[str, Dict[str, int]], List[str], int]:
+    """
+    Work out which rules need re-running against existing rows
+    
+    Existing rules keep their mask bit so stored masks stay valid; new
+    rules get fresh bits.
+    
+    Returns:
+        (new rules signature, ids of rules to re-run, mask of bits to clear)
+    """
+    signature: Dict[str, Dict[str, int]] = {}
+    stale: List[str] = []
+    clear_mask = 0
+    next_bit = max([info['bit'] for info in previous.values()], default=-1) + 1
+    
+    for rule_id, rule_cls in RULES.items():
+        old = previous.get(rule_id)
+        if old is None:
+            signature[rule_id] = {'version': rule_cls.version, 'bit': next_bit}
+            next_bit += 1
+            stale.append(rule_id)
+        else:
+            signature[rule_id] = {'version': rule_cls.version, 'bit': old['bit']}
+            if old['version'] != rule_cls.version:
+                stale.append(rule_id)
+                clear_mask |= 1 << old['bit']
+    
+    for rule_id, info in previous.items():
+        if rule_id not in RULES:
+            clear_mask |= 1 << info['bit']
+    
+    return signature, stale, clear_mask
+
+def _fingerprint_and_label(
+    task: Tuple[str, str, Optional[str], List[str]],
+    bits: Dict[str, int]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Hash, read and label candidate files (runs in a worker process)
+    
+    Returns:
+        (fingerprints of every readable file, labeled records for files
+        that pass the size filter)
+    """
+    root, problem_id, status, files = task
+    fingerprints, records = [], []
+    for file in files:
+        file_path = os.path.join(root, file)
+        try:
+            stat = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            code = raw.decode('utf-8')
+        except Exception as e:
+            logger.warning(f"Error processing file {file_path}: {str(e)}")
+            continue
+        
+        fingerprints.append({
+            'file_path': file_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': hashlib.sha1(raw).hexdigest(),
+        })
+        
+        # Basic validation - exclude very small snippets
+        if len(code) < 10:
+            continue
+        
+        record = {
+            'file_path': file_path,
+            'problem_id': problem_id,
+            'code': code,
+            'status': status,
+            'file_size': len(code)
+        }
+        record.update(label_fields(code, bits))
+        records.append(record)
+    return fingerprints, records
+
+def _iter_candidate_tasks(
+    codenet_dir: str,
+    index: Dict[str, Dict[str, Any]],
+    seen: Set[str]
+) -> Iterator[Tuple[str, str, Optional[str], List[str]]]:
+    """
+    Yield read tasks for files that are new or whose size/mtime changed
+    
+    Every .py path found is added to seen, so deleted files can be
+    detected afterwards. Unchanged files are only stat()ed.
+    """
+    for root, problem_id, status, files in iter_read_tasks(codenet_dir):
+        candidates = []
+        for file in files:
+            file_path = os.path.join(root, file)
+            seen.add(file_path)
+            known = index.get(file_path)
+            if known is not None:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                if stat.st_size == known['size'] and stat.st_mtime_ns == known['mtime_ns']:
+                    continue
+            candidates.append(file)
+        for i in range(0, len(candidates), FILES_PER_TASK):
+            yield root, problem_id, status, candidates[i:i + FILES_PER_TASK]
+
+def _relabel_shard(
+    task: Tuple[str, str],
+    stale_rules: List[str],
+    bits: Dict[str, int],
+    clear_mask: int
+) -> None:
+    """Re-run only the stale rules over one shard, writing the result to a new file"""
+    import pyarrow.parquet as pq
+    
+    path, new_path = task
+    df = pq.read_table(path).to_pandas()
+    engine = RuleEngine(rule_ids=stale_rules)
+    new_bits = np.array(
+        [findings_mask(engine.check(code).findings, bits) for code in df['code']], dtype=np.uint32
+    )
+    keep = np.uint32(~clear_mask & 0xFFFFFFFF)
+    masks = (df['logical_error_mask'].to_numpy(dtype=np.uint32) & keep) | new_bits
+    df['logical_error_mask'] = masks
+    df['has_logical_error'] = masks != 0
+    write_shard(add_derived_labels(df), new_path)
+
+def _compact_shard(task: Tuple[str, str, List[str]]) -> int:
+    """
+    Write a shard's live rows to a new file
+    
+    Returns:
+        Number of rows kept; nothing is written when none are left
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    
+    path, new_path, deleted = task
+    table = pq.read_table(path)
+    table = table.filter(pc.invert(pc.is_in(table['file_path'], value_set=pa.array(deleted))))
+    if table.num_rows:
+        write_shard(table.to_pandas(), new_path)
+    return table.num_rows
+
+def incremental_build(
+    codenet_dir: str,
+    output_dir: str,
+    shard_size: int = 50000,
+    workers: Optional[int] = None,
+    compact_threshold: float = COMPACT_DELETED_FRACTION
+) -> Dict[str, Any]:
+    """
+    Bring a sharded dataset up to date with the source tree and rules
+    
+    Each source file's path, size, mtime and content hash are recorded
+    in a file index. A rebuild only reads files whose size or mtime
+    changed, only relabels files whose content hash changed, and writes
+    them to new shards. Rows they replace, and rows of deleted files,
+    are listed in the manifest as deleted and skipped by the readers;
+    a shard whose deleted share passes compact_threshold is rewritten
+    without them. Rules whose version changed are re-run, alone, over
+    existing rows. Existing shards are never modified: rewrites go to new
+    files that replace the old ones when the manifest is committed, so an
+    interrupted build leaves the previous dataset intact. The first run
+    over an empty output_dir builds the whole dataset.
+    
+    Args:
+        codenet_dir: Directory containing the CodeNetPy dataset
+        output_dir: Directory for the shards, file index and manifest
+        shard_size: Target number of samples per new shard
+        workers: Number of worker processes (defaults to CPU count)
+        compact_threshold: Share of deleted rows at which a shard is compacted
+        
+    Returns:
+        The updated manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    source_dir = os.path.abspath(codenet_dir)
+    
+    manifest = load_manifest(output_dir)
+    if (
+        manifest is None
+        or manifest.get('incremental_format_version') != INCREMENTAL_FORMAT_VERSION
+        or manifest.get('source_dir') != source_dir
+    ):
+        manifest = {
+            'incremental_format_version': INCREMENTAL_FORMAT_VERSION,
+            'source_dir': source_dir,
+            'rules': {},
+            'shards': [],
+            'file_index': None,
+            'generation': 0,
+        }
+    
+    # Previous fingerprints, by path
+    index: Dict[str, Dict[str, Any]] = {}
+    if manifest['file_index']:
+        index_df = pd.read_parquet(os.path.join(output_dir, manifest['file_index']))
+        index = index_df.set_index('file_path').to_dict('index')
+    
+    signature, stale_rules, clear_mask = _plan_rules(manifest['rules'])
+    bits = {rule_id: info['bit'] for rule_id, info in signature.items()}
+    
+    # Files written by this run are named after its generation, so they never clash with live ones
+    generation = manifest['generation'] + 1
+    shard_numbers = itertools.count()
+    
+    def new_shard_file() -> str:
+        return f"shard-{generation:05d}-{next(shard_numbers):05d}.parquet"
+    
+    # Committed shard file -> file replacing it (None if it is dropped)
+    replaced: Dict[str, Optional[str]] = {}
+    
+    # 1. Re-run changed rules over existing shards
+    if stale_rules and manifest['shards']:
+        logger.info(f"Re-running rules {', '.join(stale_rules)} over {len(manifest['shards'])} shards")
+        for shard in manifest['shards']:
+            replaced[shard['file']] = new_shard_file()
+        paths = [
+            (os.path.join(output_dir, old_file), os.path.join(output_dir, new_file))
+            for old_file, new_file in replaced.items()
+        ]
+        relabel = partial(_relabel_shard, stale_rules=stale_rules, bits=bits, clear_mask=clear_mask)
+        for _ in map_ordered(relabel, paths, workers):
+            pass
+    
+    # 2. Read, hash and label new or touched files
+    seen: Set[str] = set()
+    tasks = _iter_candidate_tasks(codenet_dir, index, seen)
+    scan = partial(_fingerprint_and_label, bits=bits)
+    pending: List[Dict[str, Any]] = []
+    new_shards: List[Dict[str, Any]] = []
+    # Shard file -> paths whose rows in it are superseded or deleted
+    superseded: Dict[str, List[str]] = {}
+    updated = 0
+    
+    def flush_shard():
+        shard_file = new_shard_file()
+        write_shard(encode_labels(pd.DataFrame(pending)), os.path.join(output_dir, shard_file))
+        new_shards.append({'file': shard_file, 'rows': len(pending), 'deleted': []})
+        for record in pending:
+            index[record['file_path']]['shard'] = shard_file
+        pending.clear()
+    
+    for fingerprints, records in map_ordered(scan, tasks, workers):
+        changed = set()
+        for fingerprint in fingerprints:
+            path = fingerprint['file_path']
+            known = index.get(path)
+            if known is not None and known['content_hash'] == fingerprint['content_hash']:
+                # Touched but identical: remember the new mtime, keep the row
+                known.update(size=fingerprint['size'], mtime_ns=fingerprint['mtime_ns'])
+                continue
+            if known is not None and known.get('shard'):
+                superseded.setdefault(known['shard'], []).append(path)
+            index[path] = dict(fingerprint, shard=None)
+            index[path].pop('file_path')
+            changed.add(path)
+        for record in records:
+            if record['file_path'] in changed:
+                pending.append(record)
+                updated += 1
+        if len(pending) >= shard_size:
+            flush_shard()
+    if pending:
+        flush_shard()
+    
+    # 3. Drop files that disappeared from the source tree
+    removed = [path for path in index if path not in seen]
+    for path in removed:
+        if index[path].get('shard'):
+            superseded.setdefault(index[path]['shard'], []).append(path)
+        del index[path]
+    
+    # Mark superseded rows as deleted in the shards that hold them
+    for shard in manifest['shards']:
+        shard.setdefault('deleted', []).extend(superseded.get(shard['file'], []))
+    
+    # 4. Compact shards that are mostly deleted rows
+    to_compact = [
+        shard for shard in manifest['shards']
+        if shard['deleted'] and len(shard['deleted']) >= compact_threshold * shard['rows']
+    ]
+    # Relabeled files that get compacted are never committed
+    intermediate = [replaced[shard['file']] for shard in to_compact if shard['file'] in replaced]
+    compact_tasks = []
+    for shard in to_compact:
+        source = replaced.get(shard['file'], shard['file'])
+        replaced[shard['file']] = new_shard_file()
+        compact_tasks.append((
+            os.path.join(output_dir, source),
+            os.path.join(output_dir, replaced[shard['file']]),
+            shard['deleted'],
+        ))
+    for shard, rows in zip(to_compact, map_ordered(_compact_shard, compact_tasks, workers)):
+        shard['rows'] = rows
+        shard['deleted'] = []
+        if rows == 0:
+            replaced[shard['file']] = None
+    for shard_file in intermediate:
+        os.remove(os.path.join(output_dir, shard_file))
+    
+    # Point the manifest and file index at the rewritten shards
+    shards = []
+    for shard in manifest['shards']:
+        if shard['file'] in replaced:
+            if replaced[shard['file']] is None:
+                continue
+            shard = dict(shard, file=replaced[shard['file']])
+        shards.append(shard)
+    for entry in index.values():
+        if entry.get('shard') in replaced:
+            entry['shard'] = replaced[entry['shard']]
+    
+    # 5. Commit: new file index first, then the manifest that points to it,
+    # then remove the files it no longer references
+    manifest['generation'] = generation
+    index_file = f"files-{manifest['generation']:05d}.parquet"
+    index_rows = [dict(entry, file_path=path) for path, entry in index.items()]
+    pd.DataFrame(
+        index_rows, columns=['file_path', 'size', 'mtime_ns', 'content_hash', 'shard']
+    ).to_parquet(os.path.join(output_dir, index_file), index=False)
+    old_index_file = manifest['file_index']
+    
+    manifest['shards'] = shards + new_shards
+    manifest['rules'] = signature
+    manifest['file_index'] = index_file
+    write_json_atomic(os.path.join(output_dir, MANIFEST_FILE), manifest)
+    if old_index_file:
+        os.remove(os.path.join(output_dir, old_index_file))
+    for shard_file in replaced:
+        os.remove(os.path.join(output_dir, shard_file))
+    
+    logger.info(
+        f"Incremental build: {updated} samples (re)labeled, {len(removed)} files removed, "
+        f"{len(new_shards)} new shards, {len(to_compact)} shards compacted, "
+        f"rules re-run: {stale_rules or 'none'}"
+    )
+    return manifest
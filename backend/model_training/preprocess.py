@@ -1,62 +1,201 @@
 import os
-import re
-import ast
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Tuple, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Tuple, Any, Callable, Iterable, Iterator, Optional
 import logging
+from model_training.rules import check_code, rule_bits, findings_mask
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_python_files(codenet_dir: str) -> pd.DataFrame:
+# Files handed to a worker process per task
+FILES_PER_TASK = 256
+
+def iter_read_tasks(codenet_dir: str) -> Iterator[Tuple[str, str, Optional[str], List[str]]]:
+    """
+    Walk the dataset in a stable order, yielding batches of files to read
+    
+    status.txt is read once per directory here and shared by every task
+    for that directory.
+    """
+    for root, dirs, files in os.walk(codenet_dir):
+        dirs.sort()
+        py_files = sorted(f for f in files if f.endswith('.py'))
+        if not py_files:
+            continue
+        
+        # Extract problem ID from directory structure if available
+        problem_id = os.path.basename(root)
+        
+        # Get status information if available (correct/incorrect)
+        status = None
+        status_file = os.path.join(root, 'status.txt')
+        if os.path.exists(status_file):
+            try:
+                with open(status_file, 'r') as f:
+                    status = f.read().strip()
+            except Exception as e:
+                logger.warning(f"Error reading {status_file}: {str(e)}")
+        
+        for i in range(0, len(py_files), FILES_PER_TASK):
+            yield root, problem_id, status, py_files[i:i + FILES_PER_TASK]
+
+def _read_files(task: Tuple[str, str, Optional[str], List[str]]) -> List[Dict[str, Any]]:
+    """Read one batch of files from a directory (runs in a worker process)"""
+    root, problem_id, status, files = task
+    records = []
+    for file in files:
+        file_path = os.path.join(root, file)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                code = f.read()
+        except Exception as e:
+            logger.warning(f"Error processing file {file_path}: {str(e)}")
+            continue
+        
+        # Basic validation - exclude very small snippets
+        if len(code) < 10:
+            continue
+        
+        records.append({
+            'file_path': file_path,
+            'problem_id': problem_id,
+            'code': code,
+            'status': status,
+            'file_size': len(code)
+        })
+    return records
+
+def label_fields(code: str, bits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Compact label fields for one sample
+    
+    Args:
+        code: Python code snippet
+        bits: Rule id to bit position (defaults to the registry order)
+        
+    Returns:
+        Syntax error line/message (-1/None if the code parses) and a
+        bitmask of the rules that fired
+    """
+    report = check_code(code)
+    return {
+        'syntax_error_line': report.syntax_error_line or -1,
+        'syntax_error_msg': report.syntax_error_msg,
+        'logical_error_mask': findings_mask(report.findings, bits or rule_bits()),
+    }
+
+def read_and_label_files(
+    task: Tuple[str, str, Optional[str], List[str]],
+    bits: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """Read one batch of files and label them in the same worker process"""
+    bits = bits or rule_bits()
+    records = _read_files(task)
+    for record in records:
+        record.update(label_fields(record['code'], bits))
+    return records
+
+def map_ordered(func, tasks: Iterable, workers: int) -> Iterator[Any]:
+    """
+    Apply func to tasks across a process pool, yielding results in task order
+    
+    At most 2 * workers tasks are in flight, so memory stays bounded no
+    matter how many tasks there are.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque = deque()
+        for task in tasks:
+            pending.append(executor.submit(func, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_chunks_with_progress(
+    codenet_dir: str,
+    chunk_size: int = 10000,
+    workers: Optional[int] = None,
+    skip_tasks: int = 0,
+    read_func: Callable[[Any], List[Dict[str, Any]]] = _read_files
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """
+    Stream chunks along with how many read tasks they account for
+    
+    Chunks always end on a task boundary, so a consumer that records the
+    task count of its last finished chunk can resume with skip_tasks
+    without re-reading anything before it.
+    
+    Args:
+        codenet_dir: Directory containing the CodeNetPy dataset
+        chunk_size: Target number of samples per chunk
+        workers: Number of reader processes (defaults to CPU count)
+        skip_tasks: Number of leading read tasks to skip
+        read_func: Module-level function turning a task into records
+        
+    Yields:
+        (DataFrame, total tasks consumed so far, including skipped ones)
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = islice(iter_read_tasks(codenet_dir), skip_tasks, None)
+    records: List[Dict[str, Any]] = []
+    tasks_done = skip_tasks
+    
+    for batch in map_ordered(read_func, tasks, workers):
+        records.extend(batch)
+        tasks_done += 1
+        if len(records) >= chunk_size:
+            yield pd.DataFrame(records), tasks_done
+            records = []
+    
+    if records:
+        yield pd.DataFrame(records), tasks_done
+
+def iter_python_file_chunks(
+    codenet_dir: str,
+    chunk_size: int = 10000,
+    workers: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream Python files from CodeNetPy dataset in bounded-size chunks
+    
+    Args:
+        codenet_dir: Directory containing the CodeNetPy dataset
+        chunk_size: Target number of samples per yielded DataFrame (a
+            chunk may exceed it by less than FILES_PER_TASK samples)
+        workers: Number of reader processes (defaults to CPU count)
+        
+    Yields:
+        DataFrames with code samples and metadata, in a stable order
+    """
+    for chunk, _ in iter_chunks_with_progress(codenet_dir, chunk_size, workers):
+        yield chunk
+
+def extract_python_files(codenet_dir: str, workers: Optional[int] = None) -> pd.DataFrame:
     """
     Extract Python files from CodeNetPy dataset
     
     Args:
         codenet_dir: Directory containing the CodeNetPy dataset
+        workers: Number of reader processes (defaults to CPU count)
         
     Returns:
         DataFrame with code samples and metadata
     """
-    data = []
-    
     try:
-        for root, _, files in os.walk(codenet_dir):
-            for file in files:
-                if file.endswith('.py'):
-                    file_path = os.path.join(root, file)
-                    
-                    # Extract problem ID from directory structure if available
-                    problem_id = os.path.basename(os.path.dirname(file_path))
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            code = f.read()
-                            
-                        # Basic validation - exclude very small snippets
-                        if len(code) < 10:
-                            continue
-                            
-                        # Get status information if available (correct/incorrect)
-                        status_file = os.path.join(os.path.dirname(file_path), 'status.txt')
-                        status = None
-                        if os.path.exists(status_file):
-                            with open(status_file, 'r') as f:
-                                status = f.read().strip()
-                        
-                        data.append({
-                            'file_path': file_path,
-                            'problem_id': problem_id,
-                            'code': code,
-                            'status': status,
-                            'file_size': len(code)
-                        })
-                        
-                    except Exception as e:
-                        logger.warning(f"Error processing file {file_path}: {str(e)}")
-        
-        return pd.DataFrame(data)
+        chunks = list(iter_python_file_chunks(codenet_dir, workers=workers))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
     
     except Exception as e:
         logger.error(f"Error extracting Python files: {str(e)}")
@@ -72,92 +211,161 @@ def analyze_syntax_errors(code: str) -> List[str]:
     Returns:
         List of syntax error messages
     """
-    errors = []
-    
-    try:
-        ast.parse(code)
-    except SyntaxError as e:
-        errors.append(f"Syntax error at line {e.lineno}, column {e.offset}: {e.msg}")
-    
-    return errors
+    return check_code(code).syntax_errors
 
 def identify_common_logical_errors(code: str) -> List[str]:
     """
     Identify common logical errors in Python code
     
+    Runs every rule registered in model_training.rules in a single AST
+    walk. Code that doesn't parse has no logical errors.
+    
     Args:
         code: Python code snippet
         
     Returns:
         List of logical error messages
     """
-    errors = []
-    
-    # Check for bare except
-    if re.search(r'except\s*:', code) and not re.search(r'except\s*Exception', code):
-        errors.append("Bare 'except:' blocks found. Consider handling specific exceptions.")
-    
-    # Check for potential infinite loops
-    if re.search(r'while\s+True:', code) and not re.search(r'break', code):
-        errors.append("Potential infinite loop: 'while True' without a 'break' statement.")
-    
-    # Check for variable shadowing of built-ins
-    if re.search(r'\b(str|list|dict|set|int|float|bool|tuple|type)\s*=', code):
-        errors.append("Overwriting built-in type names (str, list, etc.) can lead to unexpected behavior.")
-    
-    # Check for unused variables
-    variable_definitions = re.findall(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*=', code)
-    for var in variable_definitions:
-        if var != '_' and code.count(var) == 1:
-            errors.append(f"Variable '{var}' is defined but never used.")
-    
-    # Check for mutable default arguments
-    if re.search(r'def\s+\w+\s*\([^)]*=\s*\[\s*\][^)]*\):', code):
-        errors.append("Using mutable default arguments (empty list) can lead to unexpected behavior.")
-    
-    return errors
+    return check_code(code).logical_errors
 
-def prepare_dataset(df: pd.DataFrame) -> pd.DataFrame:
+def prepare_dataset(df, workers: Optional[int] = None) -> pd.DataFrame:
     """
     Prepare and label dataset for training
     
+    A CorpusStore (see model_training.corpus_store) is labeled across
+    worker processes that read the sources from its memory-mapped packs;
+    a DataFrame is labeled in this process.
+    
     Args:
-        df: DataFrame with code samples
+        df: DataFrame with code samples, or a CorpusStore
+        workers: Number of labeling processes for a CorpusStore (defaults
+            to CPU count)
         
     Returns:
         Processed DataFrame with error labels
     """
+    from model_training.corpus_store import CorpusStore, prepare_corpus
+    
+    if isinstance(df, CorpusStore):
+        return prepare_corpus(df, workers)
+    
+    # Parse each sample once and evaluate every rule in the same walk
+    reports = [check_code(code) for code in df['code']]
+    
     # Add syntactic and logical error columns
-    df['syntax_errors'] = df['code'].apply(analyze_syntax_errors)
+    df['syntax_errors'] = [report.syntax_errors for report in reports]
     df['has_syntax_error'] = df['syntax_errors'].apply(lambda x: len(x) > 0)
     
-    df['logical_errors'] = df['code'].apply(identify_common_logical_errors)
+    df['logical_errors'] = [report.logical_errors for report in reports]
     df['has_logical_error'] = df['logical_errors'].apply(lambda x: len(x) > 0)
     
+    return add_derived_labels(df)
+
+# Categories of the multi-class label, fixed so codes are stable across shards
+ERROR_TYPES = ['none', 'logical', 'syntax']
+
+def add_derived_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add binary and multi-class labels from has_syntax_error/has_logical_error
+    
+    Args:
+        df: DataFrame with boolean has_syntax_error and has_logical_error columns
+        
+    Returns:
+        The same DataFrame with has_error and a categorical error_type
+    """
+    syntax = df['has_syntax_error'].to_numpy(dtype=bool)
+    logical = df['has_logical_error'].to_numpy(dtype=bool)
+    
     # Create binary labels
-    df['has_error'] = df.apply(lambda row: row['has_syntax_error'] or row['has_logical_error'], axis=1)
+    df['has_error'] = syntax | logical
     
     # Create multi-class label
-    df['error_type'] = df.apply(
-        lambda row: 'syntax' if row['has_syntax_error'] else ('logical' if row['has_logical_error'] else 'none'), 
-        axis=1
-    )
+    codes = np.where(syntax, 2, np.where(logical, 1, 0)).astype(np.int8)
+    df['error_type'] = pd.Categorical.from_codes(codes, categories=ERROR_TYPES)
     
     return df
 
-def split_dataset(df: pd.DataFrame, test_size: float = 0.2) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def encode_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn the raw fields from label_fields into typed label columns
+    
+    Args:
+        df: DataFrame with syntax_error_line, syntax_error_msg and
+            logical_error_mask columns
+        
+    Returns:
+        The same DataFrame with compact, typed columns
+    """
+    df['syntax_error_line'] = df['syntax_error_line'].astype(np.int32)
+    df['syntax_error_msg'] = df['syntax_error_msg'].astype('category')
+    df['logical_error_mask'] = df['logical_error_mask'].astype(np.uint32)
+    df['has_syntax_error'] = df['syntax_error_msg'].notna().to_numpy()
+    df['has_logical_error'] = df['logical_error_mask'].to_numpy() != 0
+    df['problem_id'] = df['problem_id'].astype('category')
+    df['status'] = df['status'].astype('category')
+    df['file_size'] = df['file_size'].astype(np.int32)
+    return add_derived_labels(df)
+
+def split_dataset(
+    df: pd.DataFrame,
+    test_size: float = 0.2,
+    group_columns: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Split dataset into training and testing sets
     
+    Rows sharing a problem_id or a dup_cluster (from dedup.deduplicate)
+    always land on the same side, so duplicates can't leak between train
+    and test.
+    
     Args:
         df: DataFrame with labeled code samples
         test_size: Proportion of data to use for testing
+        group_columns: Columns whose values must not be split (defaults
+            to whichever of problem_id and dup_cluster are present; pass
+            [] for a plain stratified split). With fewer groups than
+            folds, rows are grouped by dup_cluster alone, and without
+            stratification when even those are too few; the split is
+            only ungrouped when there are fewer than two groups.
         
     Returns:
         Training and testing DataFrames
     """
-    from sklearn.model_selection import train_test_split
+    from sklearn.model_selection import GroupShuffleSplit, StratifiedGroupKFold, train_test_split
+    from model_training.dedup import split_groups
     
+    if group_columns is None:
+        group_columns = [column for column in ('problem_id', 'dup_cluster') if column in df]
+    
+    # One fold of a stratified group k-fold approximates the requested test size
+    n_splits = max(2, round(1 / test_size))
+    # Grouping by all columns first; if problems and near-duplicates
+    # pull almost everything into one group, by near-duplicate clusters alone
+    candidates = [group_columns] if group_columns else []
+    if 'dup_cluster' in group_columns and len(group_columns) > 1:
+        candidates.append(['dup_cluster'])
+    grouped = [(columns, split_groups(df, columns)) for columns in candidates]
+    counts = [len(np.unique(groups)) for _, groups in grouped]
+    
+    for (columns, groups), count in zip(grouped, counts):
+        if count >= n_splits:
+            if columns != group_columns:
+                logger.warning(f"Too few groups over {', '.join(group_columns)}; grouping by {', '.join(columns)}")
+            splitter = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=42)
+            train_idx, test_idx = next(splitter.split(df, df['error_type'], groups=groups))
+            return df.iloc[train_idx], df.iloc[test_idx]
+    
+    for (columns, groups), count in zip(grouped, counts):
+        if count >= 2:
+            # Too few groups for stratified folds; still keep every group on one side
+            logger.warning(f"Only {count} groups over {', '.join(columns)}; splitting them without stratification")
+            splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            train_idx, test_idx = next(splitter.split(df, groups=groups))
+            return df.iloc[train_idx], df.iloc[test_idx]
+    
+    if grouped:
+        logger.warning(f"Fewer than 2 groups over {', '.join(group_columns)}; falling back to an ungrouped split")
     # Use stratified sampling to maintain class balance
     train_df, test_df = train_test_split(
         df, 
@@ -165,5 +373,4 @@ def split_dataset(df: pd.DataFrame, test_size: float = 0.2) -> Tuple[pd.DataFram
         stratify=df['error_type'],
         random_state=42
     )
-    
-    return train_df, test_df
\ No newline at end of file
+    return train_df, test_df
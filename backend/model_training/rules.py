@@ -0,0 +1,278 @@
+import ast
+from typing import Dict, List, NamedTuple, Optional, Type
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUILTIN_TYPE_NAMES = {'str', 'list', 'dict', 'set', 'int', 'float', 'bool', 'tuple', 'type'}
+
+class Finding(NamedTuple):
+    """A single rule violation"""
+    rule_id: str
+    message: str
+    line: Optional[int]
+
+class RuleReport(NamedTuple):
+    """Result of checking one code sample"""
+    syntax_errors: List[str]
+    findings: List[Finding]
+    syntax_error_line: Optional[int] = None
+    syntax_error_msg: Optional[str] = None
+
+    @property
+    def logical_errors(self) -> List[str]:
+        return [finding.message for finding in self.findings]
+
+class Rule:
+    """
+    Base class for checks evaluated during the shared tree walk
+    
+    A rule lists the node types it wants in node_types. The walker calls
+    enter() before and leave() after visiting a node's children, then
+    finish() once the whole tree has been walked. Per-sample state lives
+    on the rule instance, which is created fresh for every sample.
+    
+    Bump version whenever a rule's output changes, so labels produced by
+    an older version can be recomputed.
+    """
+    rule_id = ""
+    version = 1
+    node_types: tuple = ()
+
+    def __init__(self):
+        self.findings: List[Finding] = []
+
+    def report(self, message: str, node: Optional[ast.AST] = None) -> None:
+        self.findings.append(Finding(self.rule_id, message, getattr(node, 'lineno', None)))
+
+    def enter(self, node: ast.AST) -> None:
+        pass
+
+    def leave(self, node: ast.AST) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+# Registered rules by id, in registration order
+RULES: Dict[str, Type[Rule]] = {}
+
+def register_rule(rule_cls: Type[Rule]) -> Type[Rule]:
+    """Class decorator adding a rule to the registry"""
+    if rule_cls.rule_id in RULES:
+        raise ValueError(f"Duplicate rule id: {rule_cls.rule_id}")
+    RULES[rule_cls.rule_id] = rule_cls
+    return rule_cls
+
+@register_rule
+class BareExceptRule(Rule):
+    rule_id = "bare-except"
+    node_types = (ast.ExceptHandler,)
+
+    def __init__(self):
+        super().__init__()
+        self.first_bare = None
+
+    def enter(self, node):
+        if node.type is None and self.first_bare is None:
+            self.first_bare = node
+
+    def finish(self):
+        if self.first_bare is not None:
+            self.report("Bare 'except:' blocks found. Consider handling specific exceptions.", self.first_bare)
+
+_LOOP_TYPES = (ast.While, ast.For, ast.AsyncFor)
+_SCOPE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+@register_rule
+class InfiniteLoopRule(Rule):
+    rule_id = "infinite-loop"
+    node_types = _LOOP_TYPES + _SCOPE_TYPES + (ast.Break,)
+
+    def __init__(self):
+        super().__init__()
+        # One entry per enclosing loop: [is 'while True', saw break]; None marks a scope boundary
+        self.loops: List[Optional[list]] = []
+        self.reported = False
+
+    def enter(self, node):
+        if isinstance(node, ast.Break):
+            if self.loops and self.loops[-1] is not None:
+                self.loops[-1][1] = True
+        elif isinstance(node, _SCOPE_TYPES):
+            self.loops.append(None)
+        else:
+            is_while_true = (
+                isinstance(node, ast.While)
+                and isinstance(node.test, ast.Constant)
+                and node.test.value is True
+            )
+            self.loops.append([is_while_true, False])
+
+    def leave(self, node):
+        if isinstance(node, ast.Break):
+            return
+        loop = self.loops.pop()
+        if loop is not None and loop[0] and not loop[1] and not self.reported:
+            self.reported = True
+            self.report("Potential infinite loop: 'while True' without a 'break' statement.", node)
+
+@register_rule
+class BuiltinShadowingRule(Rule):
+    rule_id = "builtin-shadowing"
+    node_types = (ast.Name,)
+
+    def __init__(self):
+        super().__init__()
+        self.reported = False
+
+    def enter(self, node):
+        if not self.reported and isinstance(node.ctx, ast.Store) and node.id in BUILTIN_TYPE_NAMES:
+            self.reported = True
+            self.report("Overwriting built-in type names (str, list, etc.) can lead to unexpected behavior.", node)
+
+@register_rule
+class UnusedVariableRule(Rule):
+    rule_id = "unused-variable"
+    node_types = (ast.Name,)
+
+    def __init__(self):
+        super().__init__()
+        self.assigned: Dict[str, ast.Name] = {}
+        self.loaded = set()
+
+    def enter(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loaded.add(node.id)
+        elif isinstance(node.ctx, ast.Store) and node.id != '_':
+            self.assigned.setdefault(node.id, node)
+
+    def finish(self):
+        for name, node in self.assigned.items():
+            if name not in self.loaded:
+                self.report(f"Variable '{name}' is defined but never used.", node)
+
+@register_rule
+class MutableDefaultRule(Rule):
+    rule_id = "mutable-default"
+    node_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+    def __init__(self):
+        super().__init__()
+        self.reported = False
+
+    @staticmethod
+    def _mutable_kind(node) -> Optional[str]:
+        if isinstance(node, ast.List):
+            return "empty list" if not node.elts else "list"
+        if isinstance(node, (ast.Dict, ast.DictComp)):
+            return "dict"
+        if isinstance(node, (ast.Set, ast.SetComp)):
+            return "set"
+        if isinstance(node, ast.ListComp):
+            return "list"
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('list', 'dict', 'set'):
+            return node.func.id
+        return None
+
+    def enter(self, node):
+        if self.reported:
+            return
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            kind = self._mutable_kind(default)
+            if kind:
+                self.reported = True
+                self.report(f"Using mutable default arguments ({kind}) can lead to unexpected behavior.", node)
+                return
+
+def rule_bits() -> Dict[str, int]:
+    """Bit position of each registered rule in a findings bitmask"""
+    return {rule_id: bit for bit, rule_id in enumerate(RULES)}
+
+def findings_mask(findings: List[Finding], bits: Dict[str, int]) -> int:
+    """Encode which rules fired as a bitmask"""
+    mask = 0
+    for finding in findings:
+        mask |= 1 << bits[finding.rule_id]
+    return mask
+
+class RuleEngine:
+    """
+    Evaluates a set of rules over a sample in one parse and one tree walk
+    
+    Args:
+        rule_ids: Ids of registered rules to run (defaults to all)
+    """
+
+    def __init__(self, rule_ids: Optional[List[str]] = None):
+        ids = list(RULES) if rule_ids is None else list(rule_ids)
+        unknown = [rule_id for rule_id in ids if rule_id not in RULES]
+        if unknown:
+            raise ValueError(f"Unknown rules: {', '.join(unknown)}")
+        self.rule_classes = [RULES[rule_id] for rule_id in ids]
+
+    @property
+    def versions(self) -> Dict[str, int]:
+        """Version of every rule this engine runs"""
+        return {rule_cls.rule_id: rule_cls.version for rule_cls in self.rule_classes}
+
+    def check(self, code: str) -> RuleReport:
+        """
+        Parse code once and run every rule over it
+        
+        Args:
+            code: Python code snippet
+            
+        Returns:
+            RuleReport with syntax errors, or rule findings if the code parses
+        """
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return RuleReport(
+                [f"Syntax error at line {e.lineno}, column {e.offset}: {e.msg}"], [], e.lineno, e.msg
+            )
+        except ValueError as e:
+            # e.g. source containing null bytes
+            return RuleReport([f"Syntax error: {str(e)}"], [], None, str(e))
+        except (MemoryError, RecursionError):
+            # The parser gives up on pathologically nested code, e.g. "-" * 200000 + "1"
+            msg = "code is nested too deeply to parse"
+            return RuleReport([f"Syntax error: {msg}"], [], None, msg)
+
+        rules = [rule_cls() for rule_cls in self.rule_classes]
+        dispatch: Dict[type, List[Rule]] = {}
+        for rule in rules:
+            for node_type in rule.node_types:
+                dispatch.setdefault(node_type, []).append(rule)
+
+        # Iterative walk so deeply nested code can't hit the recursion limit
+        stack = [(tree, False)]
+        while stack:
+            node, leaving = stack.pop()
+            interested = dispatch.get(type(node), ())
+            if leaving:
+                for rule in interested:
+                    rule.leave(node)
+                continue
+            for rule in interested:
+                rule.enter(node)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(list(ast.iter_child_nodes(node))))
+
+        findings: List[Finding] = []
+        for rule in rules:
+            rule.finish()
+            findings.extend(rule.findings)
+        return RuleReport([], findings)
+
+_default_engine: Optional[RuleEngine] = None
+
+def check_code(code: str) -> RuleReport:
+    """Run all registered rules over code"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = RuleEngine()
+    return _default_engine.check(code)
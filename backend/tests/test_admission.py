@@ -0,0 +1,69 @@
+# backend/tests/test_admission.py
+import json
+import os
+
+# app.config refuses to load without database settings
+os.environ.setdefault("DATABASE_NAME", "test")
+os.environ.setdefault("USE_LOCAL_DB", "true")
+
+from fastapi import Body, FastAPI
+from fastapi.testclient import TestClient
+
+from app.admission import BodySizeLimitMiddleware
+
+
+def make_client(max_bytes: int = 1000) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, path_prefix="/review", max_bytes=max_bytes)
+
+    @app.post("/review/echo")
+    async def echo(payload: dict = Body(...)):
+        return {"size": len(payload["code"])}
+
+    return TestClient(app)
+
+
+def chunked(payload: dict, chunk_size: int = 256):
+    data = json.dumps(payload).encode()
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def test_chunked_body_over_limit_gets_413():
+    client = make_client()
+    response = client.post(
+        "/review/echo",
+        content=chunked({"code": "x" * 5000}),
+        headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 413
+    assert "at most 1000 bytes" in response.json()["detail"]
+
+
+def test_chunked_body_under_limit_reaches_app():
+    client = make_client()
+    response = client.post(
+        "/review/echo",
+        content=chunked({"code": "x" * 500}),
+        headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"size": 500}
+
+
+def test_content_length_over_limit_gets_413():
+    client = make_client()
+    response = client.post("/review/echo", json={"code": "x" * 5000})
+    assert response.status_code == 413
+
+
+def test_paths_outside_prefix_are_not_limited():
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, path_prefix="/review", max_bytes=10)
+
+    @app.post("/auth/echo")
+    async def echo(payload: dict = Body(...)):
+        return {"size": len(payload["code"])}
+
+    response = TestClient(app).post("/auth/echo", json={"code": "x" * 100})
+    assert response.status_code == 200
@@ -0,0 +1,55 @@
+# backend/tests/test_history.py
+import asyncio
+import os
+
+# app.config refuses to load without database settings
+os.environ.setdefault("DATABASE_NAME", "test")
+os.environ.setdefault("USE_LOCAL_DB", "true")
+
+from app import history
+from app.history import HistoryBuffer
+
+
+def entry(code: str) -> dict:
+    return {"sub": "user", "code": code, "code_hash": "hash", "language": "python", "review": {}}
+
+
+def test_buffer_drops_oldest_entries_past_byte_limit():
+    buffer = HistoryBuffer(max_entries=100, max_bytes=5000)
+    for _ in range(5):
+        buffer.add(entry("x" * 2000))
+    stats = buffer.stats()
+    assert stats["pending"] == 2
+    assert stats["pending_bytes"] <= 5000
+    assert stats["dropped"] == 3
+
+
+def test_buffer_drops_oldest_entries_past_entry_limit():
+    buffer = HistoryBuffer(max_entries=3, max_bytes=1 << 20)
+    for index in range(5):
+        buffer.add(entry(str(index)))
+    assert [e["code"] for e, _ in buffer._pending] == ["2", "3", "4"]
+    assert buffer.stats()["dropped"] == 2
+
+
+def test_entry_larger_than_limit_is_dropped():
+    buffer = HistoryBuffer(max_entries=100, max_bytes=1000)
+    buffer.add(entry("x" * 2000))
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["dropped"] == 1
+
+
+def test_failed_flush_keeps_byte_bound(monkeypatch):
+    async def failing_insert(batch):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(history, "insert_review_history", failing_insert)
+    buffer = HistoryBuffer(max_entries=100, max_bytes=5000)
+    buffer.add(entry("a" * 2000))
+    buffer.add(entry("b" * 2000))
+    asyncio.run(buffer.flush())
+    assert buffer.stats()["pending"] == 2
+    assert buffer.stats()["failed_flushes"] == 1
+    buffer.add(entry("c" * 2000))
+    assert [e["code"][0] for e, _ in buffer._pending] == ["b", "c"]
+    assert buffer.stats()["pending_bytes"] == 4000 + 2 * len("{}")
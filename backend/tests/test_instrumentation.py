@@ -0,0 +1,53 @@
+# backend/tests/test_instrumentation.py
+import os
+
+# app.config refuses to load without database settings
+os.environ.setdefault("DATABASE_NAME", "test")
+os.environ.setdefault("USE_LOCAL_DB", "true")
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.instrumentation import MetricsMiddleware
+from app.metrics import render_metrics
+
+
+def make_client() -> TestClient:
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @router.post("/analyze")
+    async def analyze():
+        return {}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router, prefix="/metrics-test")
+    return TestClient(app)
+
+
+def route_labels() -> set:
+    return {
+        line.split('route="', 1)[1].split('"', 1)[0]
+        for line in render_metrics().splitlines()
+        if line.startswith("http_request_duration_seconds_count") and 'route="' in line
+    }
+
+
+def test_routes_are_labeled_with_router_prefix():
+    client = make_client()
+    client.post("/metrics-test/analyze")
+    client.get("/metrics-test/items/7")
+    labels = route_labels()
+    assert "/metrics-test/analyze" in labels
+    assert "/metrics-test/items/{item_id}" in labels
+    assert "/analyze" not in labels
+    assert "/items/{item_id}" not in labels
+
+
+def test_unmatched_requests_share_one_label():
+    make_client().get("/metrics-test/missing")
+    assert "<unmatched>" in route_labels()
@@ -1,8 +1,13 @@
 "use client";
 
 import { loginWithGitHub, logout, getUser } from "@/utils/auth";
-import { analyzeCode, getSupportedLanguages } from "@/utils/api";
-import { useState, useEffect } from "react";
+import {
+  analyzeCode,
+  getSupportedLanguages,
+  openLiveReview,
+  LiveReviewSession,
+} from "@/utils/api";
+import { useState, useEffect, useRef } from "react";
 import { useRouter } from "next/navigation";
 
 interface Language {
@@ -39,6 +44,7 @@ export default function Home() {
   const [languages, setLanguages] = useState<Language[]>([]);
   const [languagesLoading, setLanguagesLoading] = useState(false);
   const [analysisError, setAnalysisError] = useState<string | null>(null);
+  const liveSession = useRef<LiveReviewSession | null>(null);
 
   useEffect(() => {
     const checkUserAuth = () => {
@@ -93,6 +99,31 @@ export default function Home() {
     handleAuthCallback();
   }, []);
 
+  // Quick live checks while typing; the Analyze button runs the full review
+  useEffect(() => {
+    if (!user) return;
+    const session = openLiveReview(
+      (_version, review) => {
+        setAnalysisError(null);
+        setReviewResult(review);
+      },
+      (_version, detail) => console.warn("Live review:", detail),
+      localStorage.getItem("authToken")
+    );
+    liveSession.current = session;
+    return () => {
+      session.close();
+      liveSession.current = null;
+    };
+  }, [user]);
+
+  const handleCodeChange = (code: string) => {
+    setCodeSnippet(code);
+    if (code.trim() && selectedLanguage === "python") {
+      liveSession.current?.update(code);
+    }
+  };
+
   const handleCodeSubmit = async () => {
     if (!codeSnippet.trim()) return;
 
@@ -220,7 +251,7 @@ export default function Home() {
               className="w-full p-3 border rounded-lg font-mono text-sm h-64"
               placeholder="Paste your Python code snippet here..."
               value={codeSnippet}
-              onChange={(e) => setCodeSnippet(e.target.value)}
+              onChange={(e) => handleCodeChange(e.target.value)}
             ></textarea>
 
             <button
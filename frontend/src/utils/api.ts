@@ -1,11 +1,18 @@
 const API_URL = "http://127.0.0.1:8000";
 
-export const analyzeCode = async (code: string, language: string) => {
+// "fast" for checks while typing, "standard" (default) or "deep" for a full review
+export type AnalysisMode = "fast" | "standard" | "deep";
+
+export const analyzeCode = async (
+  code: string,
+  language: string,
+  mode: AnalysisMode = "standard"
+) => {
   try {
     const response = await fetch(`${API_URL}/review/analyze`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ code, language }),
+      body: JSON.stringify({ code, language, mode }),
     });
 
     if (!response.ok) {
@@ -19,6 +26,87 @@ export const analyzeCode = async (code: string, language: string) => {
   }
 };
 
+// Streams analysis stages (syntax, logic, quality, fixes, complete) as NDJSON frames
+export const analyzeCodeStream = async (
+  code: string,
+  language: string,
+  onFrame: (frame: any) => void,
+  mode: AnalysisMode = "standard"
+) => {
+  const response = await fetch(`${API_URL}/review/analyze`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "application/x-ndjson",
+    },
+    body: JSON.stringify({ code, language, mode }),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP error! Status: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let newline;
+    while ((newline = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) onFrame(JSON.parse(line));
+    }
+  }
+};
+
+export interface LiveReviewSession {
+  update: (code: string, mode?: AnalysisMode) => number;
+  close: () => void;
+}
+
+// Opens a live review channel: send every edit, get a review for the latest version once typing pauses
+export const openLiveReview = (
+  onResult: (version: number, review: any) => void,
+  onError: (version: number | null, detail: string) => void,
+  token?: string | null
+): LiveReviewSession => {
+  const url = new URL(`${API_URL.replace(/^http/, "ws")}/review/live`);
+  if (token) url.searchParams.set("token", token);
+  const socket = new WebSocket(url.toString());
+  let version = 0;
+  let queued: string | null = null;
+
+  socket.onopen = () => {
+    if (queued) socket.send(queued);
+    queued = null;
+  };
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    // Results for versions the user has already replaced are ignored
+    if (message.type === "result" && message.version === version) {
+      onResult(message.version, message.review);
+    } else if (message.type === "error" || message.type === "busy") {
+      onError(message.version ?? null, message.detail);
+    }
+  };
+
+  return {
+    update: (code: string, mode: AnalysisMode = "fast") => {
+      version += 1;
+      const message = JSON.stringify({ type: "update", version, code, mode });
+      if (socket.readyState === WebSocket.OPEN) socket.send(message);
+      else queued = message;
+      return version;
+    },
+    close: () => socket.close(),
+  };
+};
+
 export const getSupportedLanguages = async () => {
   try {
     const response = await fetch(`${API_URL}/review/supported-languages`);